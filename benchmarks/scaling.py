@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# Sweeps the number of observations, of permutations and of simulations of
+# `simulate` over log-spaced grids (one axis at a time, the others at their
+# base value) for every engine, and reports the time and the peak memory of
+# every point, the empirical scaling exponent of every axis (the slope of
+# log time against log axis), and the value of the axis from which the
+# cost growing with it exceeds the fixed cost (eg. the number of
+# observations from which the arithmetic of a permutation outweighs its
+# Python overhead)
+#
+#     python -m benchmarks.scaling --csv scaling.csv --json scaling.json
+
+import argparse
+import csv
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from core import UnpairedOneSidedPermutationTestPowerSimulator
+from core.backend import available_backends
+
+_AXES = (
+    'number_of_observations',
+    'number_of_permutations',
+    'number_of_simulations'
+)
+
+
+class Measurement(NamedTuple):
+    engine: str
+    axis: str
+    value: int
+    number_of_simulations: int
+    number_of_permutations: int
+    number_of_observations: int
+    seconds: float
+    peak_bytes: int
+
+
+class Fit(NamedTuple):
+    # `exponent` is the slope of log seconds against log value, and
+    # `fixed` + `per_unit` * value the affine fit of the seconds, thus
+    # `crossover` (`fixed` / `per_unit`, inf if not positive) the value
+    # from which the cost growing with the axis exceeds the fixed cost
+    engine: str
+    axis: str
+    exponent: float
+    fixed: float
+    per_unit: float
+    crossover: float
+
+
+def engines(names: Optional[Sequence[str]] = None) -> Dict[
+    str,
+    Callable[[], UnpairedOneSidedPermutationTestPowerSimulator]
+]:
+    # the sequential simulator, the counter-based simulator and the
+    # simulator of every available backend, or those in `names`
+    make = UnpairedOneSidedPermutationTestPowerSimulator.make
+    makers = {
+        'sequential': lambda: make(seed=0, number_of_threads=1),
+        'counter-based': lambda: make(
+            seed=0,
+            number_of_threads=1,
+            counter_based=True
+        )
+    }
+    for backend in available_backends():
+        makers[f'backend:{backend}'] = (
+            lambda backend=backend: make(
+                seed=0,
+                number_of_threads=1,
+                backend=backend
+            )
+        )
+    if names is None:
+        # the reference backend is too slow for the default grids
+        return {
+            name: maker for name, maker in makers.items()
+            if name != 'backend:reference'
+        }
+    unknown = set(names) - set(makers)
+    if unknown:
+        msg = (
+            f'engines must be among {", ".join(makers)}, '
+            f'were [{", ".join(sorted(unknown))}]'
+        )
+        raise ValueError(msg)
+    return {name: makers[name] for name in names}
+
+
+def grid(low: int, high: int, points: int) -> List[int]:
+    # `points` log-spaced integers from `low` to `high` (fewer if some
+    # round to the same integer)
+    return sorted(set(
+        int(round(value)) for value in np.geomspace(low, high, points)
+    ))
+
+
+def measure(
+        engine: str,
+        make: Callable[[], UnpairedOneSidedPermutationTestPowerSimulator],
+        axis: str,
+        value: int,
+        base: dict,
+        repeats: int
+) -> Measurement:
+    # the best time of `repeats` runs after a warm-up (eg. compilation),
+    # then the peak memory traced on another run (tracing slows it)
+    parameters = dict(base, **{axis: value})
+    simulator = make()
+    arguments = dict(parameters, means=(0.5, 0.), scale=1., alpha=0.05)
+    simulator.simulate(**dict(arguments, number_of_simulations=1))
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        simulator.simulate(**arguments)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        simulator.simulate(**arguments)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(
+        engine,
+        axis,
+        value,
+        parameters['number_of_simulations'],
+        parameters['number_of_permutations'],
+        parameters['number_of_observations'],
+        min(timings),
+        peak
+    )
+
+
+def fit(measurements: Sequence[Measurement]) -> Fit:
+    # will raise if the measurements are not of a single engine and axis
+    # with at least two values
+    keys = {(m.engine, m.axis) for m in measurements}
+    values = np.array([m.value for m in measurements], dtype=np.float_)
+    if len(keys) != 1 or np.unique(values).size < 2:
+        msg = 'measurements must be of one engine and axis with two values'
+        raise ValueError(msg)
+    seconds = np.array([m.seconds for m in measurements])
+    exponent = np.polyfit(np.log(values), np.log(seconds), 1)[0]
+    per_unit, fixed = np.polyfit(values, seconds, 1)
+    engine, axis = keys.pop()
+    return Fit(
+        engine,
+        axis,
+        float(exponent),
+        float(fixed),
+        float(per_unit),
+        float(fixed / per_unit) if fixed > 0. and per_unit > 0.
+        else float('inf')
+    )
+
+
+def write_csv(path: str, measurements: Sequence[Measurement]):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(Measurement._fields)
+        writer.writerows(measurements)
+
+
+def write_json(
+        path: str,
+        measurements: Sequence[Measurement],
+        fits: Sequence[Fit]
+):
+    with open(path, 'w') as file:
+        json.dump(
+            {
+                'measurements': [m._asdict() for m in measurements],
+                'fits': [
+                    dict(
+                        f._asdict(),
+                        crossover=None if np.isinf(f.crossover)
+                        else f.crossover
+                    )
+                    for f in fits
+                ]
+            },
+            file,
+            indent=2
+        )
+
+
+def main(arguments: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(
+        description='scaling of simulate along every axis'
+    )
+    parser.add_argument('--engines', nargs='+', default=None)
+    parser.add_argument('--simulations', type=int, nargs=2, default=[8, 256])
+    parser.add_argument(
+        '--permutations',
+        type=int,
+        nargs=2,
+        default=[50, 3200]
+    )
+    parser.add_argument('--observations', type=int, nargs=2, default=[5, 640])
+    parser.add_argument('--points', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=2)
+    parser.add_argument('--csv', default=None)
+    parser.add_argument('--json', default=None)
+    parsed = parser.parse_args(arguments)
+    ranges = {
+        'number_of_simulations': parsed.simulations,
+        'number_of_permutations': parsed.permutations,
+        'number_of_observations': parsed.observations
+    }
+    # the base value of every axis is the geometric middle of its range
+    base = {
+        axis: int(round(np.sqrt(low * high)))
+        for axis, (low, high) in ranges.items()
+    }
+    measurements: List[Measurement] = []
+    fits: List[Fit] = []
+    print(
+        f'{"engine":<24} {"axis":<24} {"exponent":>8} {"fixed s":>10} '
+        f'{"s/unit":>10} {"crossover":>10} {"peak MiB":>9}'
+    )
+    for engine, make in engines(parsed.engines).items():
+        for axis in _AXES:
+            swept = [
+                measure(engine, make, axis, value, base, parsed.repeats)
+                for value in grid(*ranges[axis], parsed.points)
+            ]
+            measurements.extend(swept)
+            fitted = fit(swept)
+            fits.append(fitted)
+            print(
+                f'{engine:<24} {axis:<24} {fitted.exponent:>8.3f} '
+                f'{fitted.fixed:>10.3g} {fitted.per_unit:>10.3g} '
+                f'{fitted.crossover:>10.3g} '
+                f'{max(m.peak_bytes for m in swept) / 2 ** 20:>9.2f}'
+            )
+    if parsed.csv is not None:
+        write_csv(parsed.csv, measurements)
+    if parsed.json is not None:
+        write_json(parsed.json, measurements, fits)
+
+
+if __name__ == '__main__':
+    main()
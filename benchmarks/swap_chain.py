@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Compares the p-values of the swap chain permutation sampler with those
+# of independent shuffles on the same samples, ie. the distance between
+# their distributions (two-sample Kolmogorov-Smirnov statistic), their
+# mean absolute difference, and the time per permutation, and measures the
+# correlation of consecutive permutations of the chain (about
+# 1 - (n1 + n2) / (n1 n2) to the thinning, at most 0.1 by default)
+#
+#     python -m benchmarks.swap_chain --observations 1000
+
+import argparse
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from numpy.random import PCG64
+
+from core.permutation import OneSidedPermutationTestPValueCalculator
+from core.permutation import ParallelOneSidedPermutationTestPValueCalculator
+from core.permutation import SwapChainTwoSamplePermutator
+from core.vector import Vector
+
+
+def _ks_statistic(a: np.ndarray, b: np.ndarray) -> float:
+    # largest distance between the empirical distribution functions
+    points = np.concatenate([a, b])
+    return float(np.max(np.abs(
+        np.searchsorted(np.sort(a), points, side='right') / a.size
+        - np.searchsorted(np.sort(b), points, side='right') / b.size
+    )))
+
+
+def _p_values(
+        calculate: Callable[[int, Tuple[Vector, Vector]], float],
+        permutations: int,
+        datasets: List[Tuple[Vector, Vector]]
+) -> Tuple[np.ndarray, float]:
+    start = time.perf_counter()
+    p_values = np.array([
+        calculate(permutations, samples) for samples in datasets
+    ])
+    return p_values, time.perf_counter() - start
+
+
+def _correlation(
+        thinning: Optional[int],
+        permutations: int,
+        datasets: List[Tuple[Vector, Vector]],
+        seed: int
+) -> float:
+    # mean correlation of consecutive statistics of the chain
+    permutator = SwapChainTwoSamplePermutator(
+        PCG64(seed=seed),
+        thinning=thinning
+    )
+    correlations = []
+    for samples in datasets:
+        _, permuted = permutator.permute(permutations, samples)
+        correlations.append(
+            np.corrcoef(permuted.data[:-1], permuted.data[1:])[0, 1]
+        )
+    return float(np.mean(correlations))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='swap chain against independent shuffles'
+    )
+    parser.add_argument('--datasets', type=int, default=200)
+    parser.add_argument('--permutations', type=int, default=1000)
+    parser.add_argument('--observations', type=int, default=200)
+    parser.add_argument('--effect', type=float, default=0.)
+    parser.add_argument('--seed', type=int, default=1234)
+    arguments = parser.parse_args()
+    generator = np.random.default_rng(arguments.seed)
+    datasets = [
+        (
+            Vector(generator.normal(
+                loc=arguments.effect,
+                size=arguments.observations
+            )),
+            Vector(generator.normal(size=arguments.observations))
+        )
+        for _ in range(arguments.datasets)
+    ]
+    shuffle = ParallelOneSidedPermutationTestPValueCalculator.make(
+        seed=arguments.seed,
+        number_of_threads=1
+    )
+    shuffle.calculate(1, datasets[0])  # compiles!
+    reference, elapsed = _p_values(
+        shuffle.calculate,
+        arguments.permutations,
+        datasets
+    )
+    total = arguments.datasets * arguments.permutations
+    print(
+        f'{"sampler":<12} {"thinning":>8} {"ks":>8} {"mean |dp|":>10} '
+        f'{"corr":>8} {"us/perm":>8}'
+    )
+    print(
+        f'{"shuffle":<12} {"-":>8} {0.:>8.4f} {0.:>10.4f} {0.:>8.4f} '
+        f'{1e6 * elapsed / total:>8.3f}'
+    )
+    thinnings: List[Optional[int]] = [1, None, arguments.observations]
+    for thinning in thinnings:
+        calculator = OneSidedPermutationTestPValueCalculator.make_swap_chain(
+            PCG64(seed=arguments.seed),
+            thinning=thinning
+        )
+        calculator.calculate(1, datasets[0])  # compiles!
+        p_values, elapsed = _p_values(
+            calculator.calculate,
+            arguments.permutations,
+            datasets
+        )
+        correlation = _correlation(
+            thinning,
+            arguments.permutations,
+            datasets,
+            arguments.seed
+        )
+        print(
+            f'{"swap chain":<12} '
+            f'{thinning or "default":>8} '
+            f'{_ks_statistic(p_values, reference):>8.4f} '
+            f'{np.mean(np.abs(p_values - reference)):>10.4f} '
+            f'{correlation:>8.4f} '
+            f'{1e6 * elapsed / total:>8.3f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Measures the throughput of `simulate` against the number of threads for
+# the counter-based simulator, whose permutation tests are Python loops
+# holding the GIL, and for the simulator of a backend, whose compiled
+# kernels release it, thus the speedup the threads actually bring (at
+# most the number of cores)
+#
+#     python -m benchmarks.threads --threads 1 2 4 8
+
+import argparse
+import os
+import time
+import warnings
+from typing import Callable, Dict, Sequence
+
+from core import UnpairedOneSidedPermutationTestPowerSimulator
+from core.backend import available_backends
+
+
+def engines(backend: str) -> Dict[
+    str,
+    Callable[[int], UnpairedOneSidedPermutationTestPowerSimulator]
+]:
+    # the simulators of every engine on a given number of threads
+    make = UnpairedOneSidedPermutationTestPowerSimulator.make
+    return {
+        'counter-based': lambda number_of_threads: make(
+            seed=0,
+            counter_based=True,
+            number_of_threads=number_of_threads
+        ),
+        f'backend:{backend}': lambda number_of_threads: make(
+            seed=0,
+            backend=backend,
+            number_of_threads=number_of_threads
+        )
+    }
+
+
+def measure(
+        make: Callable[[int], UnpairedOneSidedPermutationTestPowerSimulator],
+        threads: Sequence[int],
+        parameters: dict,
+        repeats: int
+) -> Dict[int, float]:
+    # the shortest of `repeats` timings of every number of threads, after
+    # a warm-up (eg. compilation)
+    timings = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # measured here!
+        for number_of_threads in threads:
+            simulator = make(number_of_threads)
+            simulator.simulate(**parameters)
+            seconds = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                simulator.simulate(**parameters)
+                seconds.append(time.perf_counter() - start)
+            timings[number_of_threads] = min(seconds)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='throughput of the simulator against the threads'
+    )
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument(
+        '--backend',
+        choices=available_backends(),
+        default='auto'
+    )
+    parser.add_argument('--simulations', type=int, default=256)
+    parser.add_argument('--permutations', type=int, default=1000)
+    parser.add_argument('--observations', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    arguments = parser.parse_args()
+    parameters = dict(
+        number_of_simulations=arguments.simulations,
+        number_of_permutations=arguments.permutations,
+        number_of_observations=arguments.observations,
+        means=(0.5, 0.),
+        scale=1.,
+        alpha=0.05
+    )
+    print(f'{os.cpu_count() or 1} cores')
+    print(f'{"engine":<20} {"threads":>7} {"seconds":>8} {"speedup":>8}')
+    for name, make in engines(arguments.backend).items():
+        timings = measure(
+            make,
+            arguments.threads,
+            parameters,
+            arguments.repeats
+        )
+        reference = timings[arguments.threads[0]]
+        for number_of_threads, seconds in timings.items():
+            print(
+                f'{name:<20} {number_of_threads:>7} {seconds:>8.3f} '
+                f'{reference / seconds:>8.2f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Quantifies the variance reduction of the sampling schemes of the
+# simulator, ie. how many fewer simulations reach the precision of
+# independent sampling
+#
+#     python -m benchmarks.variance_reduction --replications 200
+
+import argparse
+import time
+
+import numpy as np
+
+from core import UnpairedOneSidedPermutationTestPowerSimulator
+
+
+def _replicate(
+        sampling: str,
+        replications: int,
+        number_of_threads: int,
+        parameters: dict
+) -> np.ndarray:
+    return np.array([
+        UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=seed,
+            counter_based=True,  # independent sampling on threads!
+            number_of_threads=number_of_threads,
+            sampling=sampling
+        ).simulate(**parameters)
+        for seed in range(replications)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='variance reduction of the sampling schemes'
+    )
+    parser.add_argument('--replications', type=int, default=100)
+    parser.add_argument('--simulations', type=int, default=200)
+    parser.add_argument('--permutations', type=int, default=200)
+    parser.add_argument('--observations', type=int, default=20)
+    parser.add_argument('--effect', type=float, default=0.5)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--threads', type=int, default=1)
+    arguments = parser.parse_args()
+    parameters = dict(
+        number_of_simulations=arguments.simulations,
+        number_of_permutations=arguments.permutations,
+        number_of_observations=arguments.observations,
+        means=(arguments.effect, 0.),
+        scale=1.,
+        alpha=arguments.alpha
+    )
+    print(
+        f'{"sampling":<12} {"power":>8} {"std":>8} '
+        f'{"efficiency":>10} {"seconds":>8}'
+    )
+    reference = None
+    for sampling in ('independent', 'antithetic', 'halton'):
+        start = time.perf_counter()
+        estimates = _replicate(
+            sampling,
+            arguments.replications,
+            arguments.threads,
+            parameters
+        )
+        elapsed = time.perf_counter() - start
+        variance = np.var(estimates, ddof=1)
+        reference = variance if reference is None else reference
+        # efficiency > 1 means fewer simulations for the same precision
+        print(
+            f'{sampling:<12} {np.mean(estimates):>8.4f} '
+            f'{np.sqrt(variance):>8.4f} {reference / variance:>10.2f} '
+            f'{elapsed:>8.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# Calibrates the simulator on the current machine and writes the fastest
+# configuration to its profile, loaded by
+# `UnpairedOneSidedPermutationTestPowerSimulator.make(profile=True)`
+# afterwards
+#
+#     python -m core.autotune [--path PATH] [--quick] [--dry-run]
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .backend import AutoPermutationBackend
+from .backend import BackendPolicy
+from .backend import resolve_backend
+from .core import KernelSimulationFactory
+from .core import UnpairedOneSidedPermutationTestPowerSimulator
+from .jit import NUMBA_AVAILABLE
+from .profile import TuningProfile
+from .profile import current_machine
+from .profile import profile_path
+from .profile import save_profile
+from .random import IndependentNormalSampling
+from .random import PhiloxStreams
+
+_NEVER = 2 ** 62  # a threshold of work never reached
+
+
+def calibrate_policy(
+        *,
+        works: Sequence[int],
+        number_of_cores: int,
+        number_of_observations: int = 100,
+        repeats: int = 3
+) -> BackendPolicy:
+    # the thresholds of the backends from the fastest backend on tests of
+    # `works` permutations times observations
+    # `small_work` is the smallest work from which a compiled backend is
+    # always the fastest, and `large_work` the smallest work from which
+    # the parallel backend is always the fastest
+    if not NUMBA_AVAILABLE:
+        return BackendPolicy()
+    names = ['numpy', 'numba']
+    if number_of_cores > 1:
+        names.append('numba-parallel')
+    generator = np.random.default_rng(0)
+    centered = generator.normal(size=number_of_observations)
+    centered -= np.mean(centered)
+    size = number_of_observations // 2
+    fastest: List[Tuple[int, str]] = []
+    for work in sorted(works):
+        uniforms = generator.random(
+            (max(1, work // number_of_observations), size)
+        )
+        timings = {
+            name: _best_time(
+                lambda: resolve_backend(name).count(
+                    centered,
+                    size,
+                    uniforms,
+                    0.
+                ),
+                repeats
+            )
+            for name in names
+        }
+        fastest.append((work, min(timings, key=timings.get)))
+    return BackendPolicy(
+        _threshold(fastest, ('numba', 'numba-parallel')),
+        _threshold(fastest, ('numba-parallel',))
+    )
+
+
+def calibrate_threads(
+        *,
+        candidates: Sequence[int],
+        policy: BackendPolicy,
+        parameters: dict,
+        repeats: int = 1
+) -> Tuple[int, Dict[int, float]]:
+    # the number of threads (0 for the sequential simulator) of the
+    # fastest simulations, and the timings of every candidate
+    timings = {
+        number_of_threads: _best_time(
+            lambda: _make_simulator(number_of_threads, policy).simulate(
+                **parameters
+            ),
+            repeats
+        )
+        for number_of_threads in candidates
+    }
+    return min(timings, key=timings.get), timings
+
+
+def calibrate_chunk_size(
+        *,
+        candidates: Sequence[int],
+        number_of_threads: int,
+        policy: BackendPolicy,
+        parameters: dict,
+        slack: float = 0.1,
+        repeats: int = 1
+) -> Tuple[int, Dict[int, float]]:
+    # the smallest chunk size of `simulate_async` within `slack` of the
+    # fastest one (smaller chunks react faster to cancellation), and the
+    # timings of every candidate
+    simulator = _make_simulator(number_of_threads, policy)
+
+    def simulate(chunk_size: int) -> Callable[[], float]:
+        return lambda: asyncio.run(
+            simulator.simulate_async(**parameters, chunk_size=chunk_size)
+        )
+
+    timings = {
+        chunk_size: _best_time(simulate(chunk_size), repeats)
+        for chunk_size in candidates
+    }
+    best = min(timings.values())
+    return min(
+        chunk_size for chunk_size, seconds in timings.items()
+        if seconds <= (1. + slack) * best
+    ), timings
+
+
+def autotune(*, quick: bool = False) -> TuningProfile:
+    # calibrates the backends, then the threads, then the chunk size
+    cores = os.cpu_count() or 1
+    parameters = dict(
+        number_of_simulations=64 if quick else 256,
+        number_of_permutations=200 if quick else 500,
+        number_of_observations=50,
+        means=(0.5, 0.),
+        scale=1.,
+        alpha=0.05
+    )
+    policy = calibrate_policy(
+        works=[2 ** k for k in range(10, 20 if quick else 24)],
+        number_of_cores=cores
+    )
+    threads = [0] + [
+        number_of_threads
+        for number_of_threads in (1, 2, 4, 8, 16, 32, 64)
+        if number_of_threads <= cores
+    ]
+    number_of_threads, _ = calibrate_threads(
+        candidates=threads,
+        policy=policy,
+        parameters=parameters
+    )
+    chunk_size, _ = calibrate_chunk_size(
+        candidates=(16, 64, 256),
+        number_of_threads=number_of_threads,
+        policy=policy,
+        parameters=parameters
+    )
+    return TuningProfile(
+        max(1, number_of_threads),
+        None if number_of_threads == 0 else 'auto',
+        chunk_size,
+        policy,
+        current_machine()
+    )
+
+
+def _make_simulator(
+        number_of_threads: int,
+        policy: BackendPolicy
+) -> UnpairedOneSidedPermutationTestPowerSimulator:
+    # the sequential simulator if `number_of_threads` is 0, otherwise the
+    # simulator of the 'auto' backend on `number_of_threads` threads
+    if number_of_threads == 0:
+        return UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=0,
+            number_of_threads=1
+        )
+    streams = PhiloxStreams(0)
+    return UnpairedOneSidedPermutationTestPowerSimulator(
+        KernelSimulationFactory(
+            streams,
+            IndependentNormalSampling(streams),
+            AutoPermutationBackend(
+                number_of_cores=max(
+                    1,
+                    (os.cpu_count() or 1) // number_of_threads
+                ),
+                policy=policy
+            )
+        ),
+        number_of_threads=number_of_threads
+    )
+
+
+def _best_time(function: Callable[[], object], repeats: int) -> float:
+    # the shortest of `repeats` timings after a warm-up (eg. compilation)
+    function()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _threshold(fastest: List[Tuple[int, str]], names: Tuple[str, ...]) -> int:
+    # the smallest work from which the fastest backend is in `names`
+    threshold = _NEVER
+    for work, name in reversed(fastest):
+        if name not in names:
+            break
+        threshold = work
+    return threshold
+
+
+def main(arguments: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(
+        description='calibrates the simulator on the current machine'
+    )
+    parser.add_argument('--path', default=None)
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--dry-run', action='store_true')
+    parsed = parser.parse_args(arguments)
+    profile = autotune(quick=parsed.quick)
+    for key, value in profile.to_dict().items():
+        print(f'{key:<18} {value}')
+    if not parsed.dry_run:
+        path = save_profile(profile, parsed.path)
+        print(f'profile written to {path}')
+    else:
+        print(f'profile not written to {parsed.path or profile_path()}')
+
+
+if __name__ == '__main__':
+    main()
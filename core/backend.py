@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+
+import os
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .jit import NUMBA_AVAILABLE
+from .jit import get_num_threads
+from .jit import njit
+from .jit import prange
+from .jit import python_function
+from .trace import current_tracer
+from .ttest import t_statistic_from_sums
+
+
+class IPermutationBackend:
+    # Strategy counting the permutations of a permutation test on two
+    # samples, with the unpaired t-test statistic assuming similar
+    # variances, whose statistic is greater (or less) than the observed
+    # statistic
+    # every backend draws the same permutations from the same uniforms:
+    # the i-th permutation takes as first sample the first `size`
+    # observations after a partial Fisher-Yates shuffle of `size` steps
+    # on `centered`, driven by the i-th row of `uniforms`
+
+    @property
+    def name(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def is_compiled(self) -> bool:
+        # whether the backend runs compiled kernels, otherwise the
+        # statistics around it (eg. the observed one) are computed by the
+        # Python functions of the kernels, thus nothing is compiled
+        # optional! override if the backend compiles
+        return False
+
+    def select(
+            self,
+            number_of_observations: int,
+            number_of_permutations: int
+    ) -> "IPermutationBackend":
+        # the backend counting the permutations of a test of this size
+        # optional! override to select another backend by the size
+        return self
+
+    def count(
+            self,
+            centered: np.ndarray,
+            size: int,
+            uniforms: np.ndarray,
+            observed: float
+    ) -> Tuple[int, int, int]:
+        # the number of permutations whose statistic is greater than
+        # `observed`, the number of those whose statistic is less, and the
+        # number of permutations whose statistic could be computed
+        raise NotImplementedError
+
+
+class ReferencePermutationBackend(IPermutationBackend):
+    # Scalar Python loops, slow but free of any compilation, the reference
+    # of the other backends
+
+    @property
+    def name(self) -> str:
+        return 'reference'
+
+    def count(
+            self,
+            centered: np.ndarray,
+            size: int,
+            uniforms: np.ndarray,
+            observed: float
+    ) -> Tuple[int, int, int]:
+        return _count_exceedances(centered, size, uniforms, observed)
+
+
+class NumpyPermutationBackend(IPermutationBackend):
+    # Vectorized across the permutations, free of any compilation, thus
+    # faster than the compiled backends on small problems
+
+    _ELEMENTS_PER_CHUNK = 2 ** 18  # bounds the memory of a chunk
+
+    @property
+    def name(self) -> str:
+        return 'numpy'
+
+    def count(
+            self,
+            centered: np.ndarray,
+            size: int,
+            uniforms: np.ndarray,
+            observed: float
+    ) -> Tuple[int, int, int]:
+        chunk_size = max(1, self._ELEMENTS_PER_CHUNK // max(1, centered.size))
+        greater, less, valid = 0, 0, 0
+        for start in range(0, uniforms.shape[0], chunk_size):
+            statistics = self._calculate_statistics(
+                centered,
+                size,
+                uniforms[start:start + chunk_size]
+            )
+            computed = statistics[~np.isnan(statistics)]
+            greater += int(np.count_nonzero(computed > observed))
+            less += int(np.count_nonzero(computed < observed))
+            valid += computed.size
+        return greater, less, valid
+
+    @staticmethod
+    def _calculate_statistics(
+            centered: np.ndarray,
+            size: int,
+            uniforms: np.ndarray
+    ) -> np.ndarray:
+        size_b = centered.size - size
+        if size <= 0 or size_b <= 0 or centered.size <= 2:
+            return np.full((uniforms.shape[0],), np.nan)
+        rows = np.arange(uniforms.shape[0])
+        permuted = np.tile(centered, (uniforms.shape[0], 1))
+        for k in range(size):
+            j = k + (uniforms[:, k] * (centered.size - k)).astype(np.intp)
+            swapped = permuted[rows, j]
+            permuted[rows, j] = permuted[:, k]
+            permuted[:, k] = swapped
+        a = permuted[:, :size]
+        sum_a = np.sum(a, axis=1)
+        sum_b = np.sum(centered) - sum_a
+        sum_of_squares_a = np.sum(a * a, axis=1)
+        variance = (
+                (sum_of_squares_a - sum_a * sum_a / size)
+                + (
+                        np.sum(centered * centered)
+                        - sum_of_squares_a
+                        - sum_b * sum_b / size_b
+                )
+        ) / (centered.size - 2)
+        variance[variance <= 0.] = np.nan  # cannot be computed!
+        return (
+                (sum_a / size - sum_b / size_b)
+                / np.sqrt(variance * (1. / size + 1. / size_b))
+        )
+
+
+class NumbaPermutationBackend(IPermutationBackend):
+    # Compiled serial kernel releasing the GIL
+
+    @property
+    def name(self) -> str:
+        return 'numba'
+
+    @property
+    def is_compiled(self) -> bool:
+        return True
+
+    def count(
+            self,
+            centered: np.ndarray,
+            size: int,
+            uniforms: np.ndarray,
+            observed: float
+    ) -> Tuple[int, int, int]:
+        with _first_call_span(_count_exceedances_compiled, self.name):
+            return _count_exceedances_compiled(
+                centered,
+                size,
+                uniforms,
+                observed
+            )
+
+
+class NumbaParallelPermutationBackend(IPermutationBackend):
+    # Compiled kernel splitting the permutations across the cores
+
+    @property
+    def name(self) -> str:
+        return 'numba-parallel'
+
+    @property
+    def is_compiled(self) -> bool:
+        return True
+
+    def count(
+            self,
+            centered: np.ndarray,
+            size: int,
+            uniforms: np.ndarray,
+            observed: float
+    ) -> Tuple[int, int, int]:
+        with _first_call_span(_count_exceedances_in_parallel, self.name):
+            return _count_exceedances_in_parallel(
+                centered,
+                size,
+                uniforms,
+                observed,
+                min(get_num_threads(), max(1, uniforms.shape[0]))
+            )
+
+
+class BackendPolicy(NamedTuple):
+    # Thresholds of the automatic selection of a backend on the work of a
+    # test, ie. the number of permutations times the number of
+    # observations: below `small_work` the numpy backend avoids the
+    # compiled kernels, from `large_work` the parallel kernel is used if
+    # many cores are available
+    small_work: int = 2 ** 15
+    large_work: int = 2 ** 22
+
+
+class AutoPermutationBackend(IPermutationBackend):
+    # Selects a backend by the size of every test, see `BackendPolicy`,
+    # falling back to the numpy backend if numba is not available
+
+    def __init__(
+            self,
+            *,
+            number_of_cores: int,
+            policy: BackendPolicy = BackendPolicy()
+    ):
+        self._number_of_cores = number_of_cores
+        self._policy = policy
+
+    @property
+    def name(self) -> str:
+        return 'auto'
+
+    @property
+    def is_compiled(self) -> bool:
+        # of the largest tests, see `select`
+        return NUMBA_AVAILABLE
+
+    @property
+    def number_of_cores(self) -> int:
+        # for testing!
+        return self._number_of_cores
+
+    @property
+    def policy(self) -> BackendPolicy:
+        # for testing!
+        return self._policy
+
+    def select(
+            self,
+            number_of_observations: int,
+            number_of_permutations: int
+    ) -> IPermutationBackend:
+        # will raise as `IPermutationBackend.select`
+        work = number_of_observations * number_of_permutations
+        if not NUMBA_AVAILABLE or work < self._policy.small_work:
+            return _BACKENDS['numpy']
+        if self._number_of_cores > 1 and work >= self._policy.large_work:
+            return _BACKENDS['numba-parallel']
+        return _BACKENDS['numba']
+
+    def count(
+            self,
+            centered: np.ndarray,
+            size: int,
+            uniforms: np.ndarray,
+            observed: float
+    ) -> Tuple[int, int, int]:
+        # the selection is on the size of this call only, see `select`
+        return self.select(centered.size, uniforms.shape[0]).count(
+            centered,
+            size,
+            uniforms,
+            observed
+        )
+
+
+_BACKENDS: Dict[str, IPermutationBackend] = {
+    backend.name: backend
+    for backend in (
+        ReferencePermutationBackend(),
+        NumpyPermutationBackend(),
+        NumbaPermutationBackend(),
+        NumbaParallelPermutationBackend()
+    )
+}
+
+_COMPILED = ('numba', 'numba-parallel')
+
+
+def available_backends() -> Tuple[str, ...]:
+    # the names accepted by `resolve_backend`
+    return ('auto',) + tuple(
+        name for name in _BACKENDS
+        if NUMBA_AVAILABLE or name not in _COMPILED
+    )
+
+
+def register_backend(backend: IPermutationBackend):
+    # will raise if a backend of the same name is registered
+    if backend.name in _BACKENDS or backend.name == 'auto':
+        msg = f'backend is already registered, was [{backend.name}]'
+        raise ValueError(msg)
+    _BACKENDS[backend.name] = backend
+
+
+def resolve_backend(
+        name: str,
+        *,
+        number_of_cores: Optional[int] = None,
+        policy: BackendPolicy = BackendPolicy()
+) -> IPermutationBackend:
+    # will raise if `name` is not one of `available_backends()`
+    # `number_of_cores` (all the cores if None) and `policy` are those of
+    # the automatic selection if `name` is 'auto'
+    if name not in available_backends():
+        msg = (
+            f'backend must be one of {", ".join(available_backends())}, '
+            f'was [{name}]'
+        )
+        raise ValueError(msg)
+    if name == 'auto':
+        return AutoPermutationBackend(
+            number_of_cores=number_of_cores or os.cpu_count() or 1,
+            policy=policy
+        )
+    return _BACKENDS[name]
+
+
+def _count_exceedances(
+        centered: np.ndarray,
+        size: int,
+        uniforms: np.ndarray,
+        observed: float
+) -> Tuple[int, int, int]:
+    # the kernel of `IPermutationBackend.count` in plain Python, ie. with
+    # the Python functions of the compiled helpers
+    shuffle = python_function(_shuffle_first_sample)
+    statistic = python_function(t_statistic_from_sums)
+    permuted = centered.copy()
+    total = np.sum(permuted)
+    total_of_squares = np.sum(permuted * permuted)
+    swaps = np.empty((size,), dtype=np.intp)
+    greater = 0
+    less = 0
+    valid = 0
+    for i in range(uniforms.shape[0]):
+        sum_a, sum_of_squares_a = shuffle(permuted, size, uniforms[i], swaps)
+        value = statistic(
+            sum_a,
+            sum_of_squares_a,
+            total,
+            total_of_squares,
+            size,
+            permuted.size - size
+        )
+        if not np.isnan(value):
+            valid += 1
+            if value > observed:
+                greater += 1
+            elif value < observed:
+                less += 1
+    return greater, less, valid
+
+
+def _first_call_span(kernel: Callable, name: str) -> ContextManager:
+    # a compilation span of the current tracer around the first call of
+    # the compiled `kernel`, which compiles it or loads it from the cache,
+    # or nothing
+    tracer = current_tracer()
+    if tracer.is_enabled and NUMBA_AVAILABLE and not kernel.signatures:
+        return tracer.span(name, category='compilation')
+    return nullcontext()
+
+
+@njit(cache=True, nogil=True)
+def _count_exceedances_compiled(
+        centered: np.ndarray,
+        size: int,
+        uniforms: np.ndarray,
+        observed: float
+) -> Tuple[int, int, int]:
+    # as `_count_exceedances`, compiled
+    permuted = centered.copy()
+    total = np.sum(permuted)
+    total_of_squares = np.sum(permuted * permuted)
+    swaps = np.empty((size,), dtype=np.intp)
+    greater = 0
+    less = 0
+    valid = 0
+    for i in range(uniforms.shape[0]):
+        sum_a, sum_of_squares_a = _shuffle_first_sample(
+            permuted,
+            size,
+            uniforms[i],
+            swaps
+        )
+        value = t_statistic_from_sums(
+            sum_a,
+            sum_of_squares_a,
+            total,
+            total_of_squares,
+            size,
+            permuted.size - size
+        )
+        if not np.isnan(value):
+            valid += 1
+            if value > observed:
+                greater += 1
+            elif value < observed:
+                less += 1
+    return greater, less, valid
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _count_exceedances_in_parallel(
+        centered: np.ndarray,
+        size: int,
+        uniforms: np.ndarray,
+        observed: float,
+        number_of_chunks: int
+) -> Tuple[int, int, int]:
+    # as `_count_exceedances`, where the permutations are split in
+    # `number_of_chunks` contiguous chunks (one per thread), and every
+    # chunk shuffles its own copy of `centered`
+    total = np.sum(centered)
+    total_of_squares = np.sum(centered * centered)
+    number_of_permutations = uniforms.shape[0]
+    greater = 0
+    less = 0
+    valid = 0
+    for chunk in prange(number_of_chunks):
+        permuted = centered.copy()
+        swaps = np.empty((size,), dtype=np.intp)
+        start = chunk * number_of_permutations // number_of_chunks
+        stop = (chunk + 1) * number_of_permutations // number_of_chunks
+        for i in range(start, stop):
+            sum_a, sum_of_squares_a = _shuffle_first_sample(
+                permuted,
+                size,
+                uniforms[i],
+                swaps
+            )
+            value = t_statistic_from_sums(
+                sum_a,
+                sum_of_squares_a,
+                total,
+                total_of_squares,
+                size,
+                permuted.size - size
+            )
+            if not np.isnan(value):
+                valid += 1
+                if value > observed:
+                    greater += 1
+                elif value < observed:
+                    less += 1
+    return greater, less, valid
+
+
+@njit(cache=True, nogil=True)
+def _shuffle_first_sample(
+        permuted: np.ndarray,
+        size: int,
+        uniforms: np.ndarray,
+        swaps: np.ndarray
+) -> Tuple[float, float]:
+    # the sum and sum of squares of the first sample of the permutation
+    # drawn by `uniforms`, leaving `permuted` unchanged
+    sum_a = 0.
+    sum_of_squares_a = 0.
+    for k in range(size):
+        j = k + int(uniforms[k] * (permuted.size - k))
+        swaps[k] = j
+        permuted[k], permuted[j] = permuted[j], permuted[k]
+        sum_a += permuted[k]
+        sum_of_squares_a += permuted[k] * permuted[k]
+    for k in range(size - 1, -1, -1):  # undoes the shuffle!
+        j = swaps[k]
+        permuted[k], permuted[j] = permuted[j], permuted[k]
+    return sum_a, sum_of_squares_a
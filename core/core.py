@@ -1,80 +1,342 @@
 # -*- coding: utf-8 -*-
 # TODO tests
 
-from typing import Tuple
+import asyncio
+import os
+import time
+import warnings
+from concurrent.futures import Executor, ThreadPoolExecutor
+from math import inf, isfinite, sqrt
+from statistics import NormalDist
+from threading import Event, Lock
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from typing import Union
 
 import numpy as np
 from numpy.random import PCG64
 
+from .backend import BackendPolicy
+from .backend import IPermutationBackend
+from .backend import resolve_backend
+from .permutation import ALTERNATIVES
 from .permutation import IOneSidedPermutationTestPValueCalculator
+from .permutation import MultipleStatisticsPermutationTestPValueCalculator
 from .permutation import OneSidedPermutationTestPValueCalculator
+from .permutation import ParallelOneSidedPermutationTestPValueCalculator
+from .permutation import rejection_probabilities
+from .pipeline import PipelineUtilization
+from .pipeline import SimulationPipeline
+from .profile import TuningProfile
+from .profile import load_profile
+from .random import AntitheticNormalSampling
 from .random import INormalRandomGenerator
+from .random import INormalSampling
+from .random import IRandomPermutator
+from .random import IndependentNormalSampling
 from .random import NumpyNormalGenerator
 from .random import NumpyRandomPermutator
+from .random import PhiloxRandomPermutator
+from .random import PhiloxStreams
+from .random import ScrambledHaltonNormalSampling
+from .random import ScrambledHaltonSequence
+from .rank import RankSumPValueCalculator
+from .storage import SimulationStore
+from .trace import current_tracer
+from .ttest import ITwoSampleTTestStatisticCalculator
 from .ttest import UnpairedSimilarVarTTestStatisticCalculator
 from .vector import Vector
 
 
 class UnpairedOneSidedPermutationTestPowerSimulator:
     # Calculates power of one-sided permutation test on unpaired
-    # samples with equal variance and equal number of observations
+    # samples with equal variance, and equal numbers of observations
+    # unless given as a pair
+
+    _STORED_CHUNK_SIZE = 2 ** 16
 
     @classmethod
     def make(
             cls,
             *,
-            seed: int
+            seed: int,
+            counter_based: bool = False,
+            number_of_threads: Optional[int] = None,
+            sampling: str = 'independent',
+            approximation: str = 'never',
+            tolerance: float = 1e-3,
+            number_of_generators: int = 0,
+            backend: Optional[str] = None,
+            statistic: str = 't-test',
+            profile: bool = False
     ) -> "UnpairedOneSidedPermutationTestPowerSimulator":
         # public constructor!
-        # will raise if `seed` is negative
+        # will raise if `seed` is negative,
+        # if `number_of_threads` is not strictly positive, or greater than
+        # one without counter-based streams,
+        # if `sampling` or `statistic` is unknown,
+        # if `number_of_generators` is negative,
+        # if `backend` is not None nor one of `available_backends()`,
+        # if `profile` and the profile of the machine is invalid (see
+        # `load_profile`),
+        # if `approximation` or `tolerance` is invalid (see
+        # `OneSidedPermutationTestPValueCalculator.make`),
+        # or if `approximation` is not 'never' and the permutation tests
+        # are done by a backend or the statistic is 'rank-sum'
+        # if `counter_based`, every simulation and permutation draws from
+        # its own counter-based stream, thus the result of any simulation
+        # does not depend on the order in which the simulations are done
+        # if `number_of_threads` is greater than one, the simulations are
+        # split across a pool of threads, which needs counter-based streams
+        # (`counter_based`, a sampling other than 'independent', generators,
+        # a backend or the rank-sum statistic), thus the number of threads
+        # never selects the engine, and does not change the result
+        # only the kernels of a backend release the GIL: without a backend,
+        # the permutations are drawn and tested by Python loops holding
+        # it, thus more threads barely add throughput (see
+        # benchmarks/threads.py), which warns
+        # `sampling` draws the samples of the simulations independently
+        # ('independent'), by antithetic pairs ('antithetic'), or from a
+        # randomized low-discrepancy sequence ('halton'), the latter two
+        # reduce the variance of the estimate and imply counter-based
+        # streams
+        # `approximation` replaces the permutations by an approximation of
+        # the p-value when large samples make it accurate, see
+        # `OneSidedPermutationTestPValueCalculator.make`
+        # if `number_of_generators` is strictly positive, the samples are
+        # drawn by `number_of_generators` threads while
+        # `number_of_threads` threads test them, through a bounded queue
+        # (see `SimulationPipeline`), which implies counter-based streams
+        # if `backend` is not None, the permutation tests are done by a
+        # backend (see core/backend.py), eg. compiled kernels releasing the
+        # GIL, which implies counter-based streams
+        # if `profile`, the profile of the machine written by
+        # `python -m core.autotune` (see `load_profile`), if any, tunes the
+        # knobs which do not change the result: the number of threads if
+        # `number_of_threads` is None and `backend` is not None (1
+        # otherwise, the threads being calibrated on the kernels), the
+        # chunk size of `simulate_async`, and the policy of the 'auto'
+        # backend, thus never the engine
+        # `statistic` is the statistic of the permutation tests, the t-test
+        # statistic ('t-test') or the rank-sum statistic ('rank-sum'),
+        # whose exact p-values are computed from a null distribution
+        # depending on the number of observations only (see
+        # core/rank.py), thus without any permutation, nor backend, and
+        # with counter-based streams
         cls._raise_if_is_negative(seed)
+        cls._raise_if_statistic_is_unknown(statistic)
+        cls._raise_if_sampling_is_unknown(sampling)
+        tuning = load_profile() if profile else None
+        is_counter_based = (
+                counter_based
+                or sampling != 'independent'
+                or number_of_generators > 0
+                or backend is not None
+                or statistic == 'rank-sum'
+        )
+        if number_of_threads is None:
+            number_of_threads = (
+                tuning.number_of_threads
+                if tuning is not None and backend is not None else 1
+            )
+        cls._raise_if_number_of_threads_is_not_strictly_positive(
+            number_of_threads
+        )
+        if not is_counter_based:
+            cls._raise_if_threads_are_not_counter_based(number_of_threads)
+        cls._warn_if_threads_hold_the_gil(number_of_threads, backend)
+        cls._raise_if_backend_approximates(backend, approximation)
+        cls._raise_if_rank_sum_is_not_exact(statistic, backend, approximation)
+        cls._raise_if_number_of_generators_is_negative(number_of_generators)
+        pipeline = None if number_of_generators == 0 else SimulationPipeline(
+            number_of_generators=number_of_generators,
+            number_of_testers=number_of_threads
+        )
+        if statistic == 'rank-sum':
+            return cls(
+                RankSumSimulationFactory(
+                    cls._make_sampling(sampling, PhiloxStreams(seed)),
+                    RankSumPValueCalculator.make()
+                ),
+                number_of_threads=number_of_threads,
+                pipeline=pipeline,
+                chunk_size=cls._chunk_size_of(tuning)
+            )
+        if backend is not None:
+            streams = PhiloxStreams(seed)
+            return cls(
+                KernelSimulationFactory(
+                    streams,
+                    cls._make_sampling(sampling, streams),
+                    resolve_backend(
+                        backend,
+                        number_of_cores=max(
+                            1,
+                            (os.cpu_count() or 1) // number_of_threads
+                        ),
+                        policy=(
+                            BackendPolicy() if tuning is None
+                            else tuning.policy
+                        )
+                    )
+                ),
+                number_of_threads=number_of_threads,
+                pipeline=pipeline,
+                chunk_size=cls._chunk_size_of(tuning)
+            )
+        if (
+                counter_based
+                or sampling != 'independent'
+                or pipeline is not None
+        ):
+            streams = PhiloxStreams(seed)
+            return cls(
+                CounterBasedSimulationFactory(
+                    streams,
+                    UnpairedSimilarVarTTestStatisticCalculator.make(),
+                    cls._make_sampling(sampling, streams),
+                    approximation=approximation,
+                    tolerance=tolerance
+                ),
+                number_of_threads=number_of_threads,
+                pipeline=pipeline,
+                chunk_size=cls._chunk_size_of(tuning)
+            )
         generator = PCG64(seed=seed)
+        permutator = NumpyRandomPermutator(generator)
         return cls(
-            OneSidedPermutationTestPValueCalculator.make(
-                UnpairedSimilarVarTTestStatisticCalculator.make(),
-                NumpyRandomPermutator(generator)
+            SequentialSimulationFactory(
+                OneSidedPermutationTestPValueCalculator.make(
+                    UnpairedSimilarVarTTestStatisticCalculator.make(),
+                    permutator,
+                    approximation=approximation,
+                    tolerance=tolerance
+                ),
+                NumpyNormalGenerator(generator),
+                permutator
             ),
-            NumpyNormalGenerator(generator)
+            chunk_size=cls._chunk_size_of(tuning)
         )
 
+    @staticmethod
+    def _chunk_size_of(profile: Optional[TuningProfile]) -> int:
+        return 64 if profile is None else profile.chunk_size
+
+    @staticmethod
+    def _make_sampling(
+            sampling: str,
+            streams: PhiloxStreams
+    ) -> INormalSampling:
+        if sampling == 'antithetic':
+            return AntitheticNormalSampling(streams)
+        if sampling == 'halton':
+            return ScrambledHaltonNormalSampling(
+                ScrambledHaltonSequence(streams.seed)
+            )
+        return IndependentNormalSampling(streams)
+
     def __init__(
             self,
-            calculator: IOneSidedPermutationTestPValueCalculator,
-            generator: INormalRandomGenerator
+            factory: "ISimulationFactory",
+            *,
+            number_of_threads: int = 1,
+            pipeline: Optional[SimulationPipeline] = None,
+            chunk_size: int = 64
     ):
         # private!
-        self._calculator = calculator
-        self._generator = generator
+        # will raise if `number_of_threads` is greater than one or
+        # `pipeline` is not None, and the components of `factory` are
+        # shared between simulations
+        # the simulations are done by `pipeline` if not None, which
+        # supersedes `number_of_threads`
+        # `chunk_size` is the default of `simulate_async`
+        self._raise_if_threads_share_components(
+            factory,
+            number_of_threads,
+            pipeline
+        )
+        self._factory = factory
+        self._number_of_threads = number_of_threads
+        self._pipeline = pipeline
+        self._chunk_size = chunk_size
+        self._utilization: Optional[PipelineUtilization] = None
+        self._lock = Lock()  # runs may share a stateful generator!
+        self._runs: Dict[tuple, "_CoalescedRun"] = {}
 
     @property
-    def calculator(self) -> IOneSidedPermutationTestPValueCalculator:
+    def factory(self) -> "ISimulationFactory":
         # for testing!
-        return self._calculator
+        return self._factory
 
     @property
-    def generator(self) -> INormalRandomGenerator:
+    def number_of_threads(self) -> int:
         # for testing!
-        return self._generator
+        return self._number_of_threads
+
+    @property
+    def chunk_size(self) -> int:
+        # for testing!
+        return self._chunk_size
+
+    @property
+    def pipeline(self) -> Optional[SimulationPipeline]:
+        # for testing!
+        return self._pipeline
+
+    @property
+    def utilization(self) -> Optional[PipelineUtilization]:
+        # utilization of the stages of the pipeline by the latest
+        # simulations, None if the simulations are not pipelined or before
+        # any simulation
+        return self._utilization
 
     def simulate(
             self,
             *,
             number_of_simulations: int,
             number_of_permutations: int,
-            number_of_observations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
             means: Tuple[float, float],
             scale: float,
-            alpha: float
+            alpha: float,
+            path: Optional[str] = None,
+            statistics: bool = False
     ) -> float:
         # will raise if `number_of_simulations` or `number_of_permutations`
         # is not strictly positive,
-        # if `number_of_observations` is not at least two (ie. 2),
+        # if `number_of_observations` (or any of its pair) is not at least
+        # two (ie. 2),
         # if `alpha` is not in [0, 1],
         # if any mean in `means` or `scale` is not finite,
         # or if `scale` is negative
+        # both samples have `number_of_observations` observations, or the
+        # first and the second of its pair
+        # if `path`, the p-values (and the observed statistics if
+        # `statistics`) of the simulations are written to a memory-mapped
+        # .npy file at `path` as they are computed instead of being kept in
+        # memory, see `SimulationStore` to read them afterwards, every
+        # argument being checked before the file is created
         self._raise_if_is_not_strictly_positive(number_of_simulations)
+        self._raise_if_number_of_permutations_is_not_strictly_positive(
+            number_of_permutations
+        )
         self._raise_if_is_not_at_least_two(number_of_observations)
+        self._raise_if_normal_parameters_are_invalid(means, scale)
         self._raise_if_is_not_between_zero_and_one(alpha)
+        if path is not None:
+            store = SimulationStore.create(
+                path,
+                number_of_simulations,
+                statistics=statistics
+            )
+            self._do_stored_simulations(
+                store,
+                number_of_permutations,
+                number_of_observations,
+                means,
+                scale
+            )
+            with current_tracer().span('power', category='reduction'):
+                return store.power(alpha)
         simulated = self._do_simulations(
             number_of_simulations,
             number_of_permutations,
@@ -82,48 +344,643 @@ class UnpairedOneSidedPermutationTestPowerSimulator:
             means,
             scale
         )
+        with current_tracer().span('power', category='reduction'):
+            return np.mean(simulated < alpha)
+
+    def simulate_range(
+            self,
+            *,
+            start: int,
+            stop: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float
+    ) -> np.ndarray:
+        # will raise as `simulate`, if `start` is negative or `stop` is not
+        # greater than `start`, or if the simulations are not addressable
+        # (see `ISimulationFactory.is_addressable`)
+        # the p-values of the simulations [start, stop) of `simulate`, thus
+        # disjoint ranges may be simulated anywhere and concatenated
+        self._raise_if_range_is_invalid(start, stop)
+        self._raise_if_is_not_at_least_two(number_of_observations)
+        self._raise_if_is_not_addressable(self._factory)
+        simulated = np.empty((stop - start,), dtype=np.float_)
+        with self._lock:
+            self._fill_simulations(
+                simulated,
+                start,
+                number_of_permutations,
+                number_of_observations,
+                means,
+                scale
+            )
+        return simulated
+
+    def simulate_smoothed(
+            self,
+            *,
+            number_of_simulations: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            alpha: float
+    ) -> "SmoothedPowerEstimate":
+        # will raise as `simulate`
+        # does the simulations of `simulate`, but replaces the rejection of
+        # every simulation by the probability that its test on all the
+        # permutations rejects, given the number of drawn permutations
+        # exceeding its observed statistic, see `rejection_probabilities`,
+        # thus removing the noise of the permutations from the estimate
+        # the counts of exceeding and of valid permutations are those of
+        # the tests (see `PermutationTestResult`), except for p-values
+        # computed without permutations (approximated or exact), whose
+        # count is recovered from the p-value rounded to the nearest
+        # multiple of 1 / `number_of_permutations`
+        # the standard error is that of the mean of the probabilities,
+        # thus ignores the uncertainty of their fitted empirical Bayes
+        # prior
+        self._raise_if_is_not_strictly_positive(number_of_simulations)
+        self._raise_if_is_not_at_least_two(number_of_observations)
+        self._raise_if_is_not_between_zero_and_one(alpha)
+        simulated = self._do_simulations(
+            number_of_simulations,
+            number_of_permutations,
+            number_of_observations,
+            means,
+            scale,
+            rows=_SimulationRows(
+                3,
+                self._factory.create,
+                lambda calculator, *arguments: calculator.test(
+                    *arguments
+                )[1:]  # the p-value, greater and permutations!
+            )
+        )
+        p_values, greater, permutations = simulated.T
+        drawn = permutations > 0
+        greater = np.where(
+            drawn,
+            greater,
+            np.clip(
+                np.rint(p_values * number_of_permutations),
+                0,
+                number_of_permutations
+            )
+        )
+        smoothed = rejection_probabilities(
+            greater,
+            np.where(drawn, permutations, number_of_permutations),
+            alpha
+        )
+        rejected = (p_values < alpha).astype(np.float_)
+        variance = np.var(smoothed)
+        indicator_variance = np.var(rejected)
+        return SmoothedPowerEstimate(
+            float(np.mean(smoothed)),
+            sqrt(variance / number_of_simulations),
+            float(np.mean(rejected)),
+            sqrt(indicator_variance / number_of_simulations),
+            indicator_variance / variance if variance > 0.
+            else (inf if indicator_variance > 0. else 1.)
+        )
+
+    def simulate_alternatives(
+            self,
+            *,
+            number_of_simulations: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            alpha: float,
+            alternatives: Sequence[str] = ALTERNATIVES
+    ) -> Dict[str, float]:
+        # will raise as `simulate`, if `alternatives` is empty or has an
+        # alternative not in `ALTERNATIVES`, or if the permutation tests
+        # are done by a backend (which counts the greater permutations
+        # only)
+        # does the simulations of `simulate`, but tests every simulation
+        # against the alternatives from the same permutations (see
+        # `AlternativesTestResult`), and returns the power of each, thus
+        # the power of 'greater' is the result of `simulate`
+        self._raise_if_is_not_strictly_positive(number_of_simulations)
+        self._raise_if_is_not_at_least_two(number_of_observations)
+        self._raise_if_is_not_between_zero_and_one(alpha)
+        self._raise_if_alternatives_are_unknown(alternatives)
+        simulated = self._do_simulations(
+            number_of_simulations,
+            number_of_permutations,
+            number_of_observations,
+            means,
+            scale,
+            rows=_SimulationRows(
+                len(ALTERNATIVES),
+                self._factory.create,
+                lambda calculator, *arguments: calculator.test_alternatives(
+                    *arguments
+                ).p_values
+            )
+        )
+        return {
+            alternative: float(np.mean(
+                simulated[:, ALTERNATIVES.index(alternative)] < alpha
+            ))
+            for alternative in alternatives
+        }
+
+    def simulate_statistics(
+            self,
+            *,
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator],
+            number_of_simulations: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            alpha: float
+    ) -> Tuple[float, ...]:
+        # will raise as `simulate`, if `calculators` is empty, or if no
+        # permutation is drawn (ie. with the rank-sum statistic)
+        # does the simulations of `simulate`, but tests every simulation
+        # with the statistic of every calculator on the same permutations
+        # (see `MultipleStatisticsPermutationTestPValueCalculator`), and
+        # returns the power of each, in the order of `calculators`, thus
+        # the powers are paired, and the power of the t-test statistic
+        # is the result of `simulate` without approximations nor backend
+        # (whose kernels draw other permutations)
+        # with samples of equal sizes, the t-test statistics, with or
+        # without similar variances, and the difference in means order the
+        # permutations alike, thus have the same power, which differs with
+        # a pair of distinct sizes in `number_of_observations`
+        self._raise_if_is_not_strictly_positive(number_of_simulations)
+        self._raise_if_is_not_at_least_two(number_of_observations)
+        self._raise_if_is_not_between_zero_and_one(alpha)
+        self._raise_if_calculators_are_empty(calculators)
+        simulated = self._do_simulations(
+            number_of_simulations,
+            number_of_permutations,
+            number_of_observations,
+            means,
+            scale,
+            rows=_SimulationRows(
+                len(calculators),
+                lambda simulation: self._factory.create_multiple(
+                    simulation,
+                    calculators
+                ),
+                lambda calculator, *arguments: calculator.calculate(
+                    *arguments
+                )
+            )
+        )
+        return tuple(float(power) for power in np.mean(simulated < alpha, 0))
+
+    def simulate_anytime(
+            self,
+            *,
+            number_of_simulations: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            alpha: float,
+            time_budget: Optional[float] = None,
+            deadline: Optional[float] = None,
+            confidence: float = 0.95
+    ) -> "AnytimePowerEstimate":
+        # will raise as `simulate`, if not exactly one of `time_budget`
+        # (in seconds) and `deadline` (on the clock of `time.monotonic`) is
+        # given, if `time_budget` is negative, or if `confidence` is not in
+        # (0, 1)
+        # does at most `number_of_simulations` simulations, by chunks whose
+        # size adapts to the measured time per simulation, and stops before
+        # a chunk would end after the deadline (at least one simulation is
+        # done), thus the estimate improves with the time given
+        # with counter-based streams, the completed simulations are the
+        # first ones of `simulate`
+        self._raise_if_is_not_strictly_positive(number_of_simulations)
+        self._raise_if_is_not_at_least_two(number_of_observations)
+        self._raise_if_is_not_between_zero_and_one(alpha)
+        self._raise_if_confidence_is_not_in_open_unit_interval(confidence)
+        deadline = self._resolve_deadline(time_budget, deadline)
+        completed = 0
+        rejected = 0
+        chunk_size = self._number_of_threads
+        with self._lock:
+            started = time.monotonic()
+            while completed < number_of_simulations and chunk_size > 0:
+                simulated = np.empty(
+                    (min(chunk_size, number_of_simulations - completed),),
+                    dtype=np.float_
+                )
+                self._fill_simulations(
+                    simulated,
+                    completed,
+                    number_of_permutations,
+                    number_of_observations,
+                    means,
+                    scale
+                )
+                completed += simulated.size
+                rejected += int(np.count_nonzero(simulated < alpha))
+                now = time.monotonic()
+                per_simulation = (now - started) / completed
+                chunk_size = min(
+                    2 * chunk_size,
+                    int((deadline - now) / per_simulation)
+                    if per_simulation > 0. else 2 * chunk_size
+                )
+        return AnytimePowerEstimate(
+            rejected / completed,
+            completed,
+            wilson_interval(rejected, completed, confidence)
+        )
+
+    async def simulate_async(
+            self,
+            *,
+            number_of_simulations: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            alpha: float,
+            executor: Optional[Executor] = None,
+            chunk_size: Optional[int] = None,
+            progress: Optional[Callable[[int, int], None]] = None
+    ) -> float:
+        # will raise as `simulate`, or if `chunk_size` is not strictly
+        # positive
+        # the simulations are run on `executor` (the default executor of
+        # the running loop if None), which must share memory with the loop
+        # (ie. a thread pool), and are checked for cancellation between
+        # chunks of `chunk_size` simulations (the chunk size of the
+        # simulator if None, see `make`)
+        # `progress` is called on the loop with the number of completed
+        # simulations and `number_of_simulations` after each chunk
+        # identical concurrent requests (regardless of `alpha`) share a
+        # single computation, which is only cancelled once every request
+        # awaiting it is cancelled
+        self._raise_if_is_not_strictly_positive(number_of_simulations)
+        self._raise_if_number_of_permutations_is_not_strictly_positive(
+            number_of_permutations
+        )
+        self._raise_if_is_not_at_least_two(number_of_observations)
+        self._raise_if_normal_parameters_are_invalid(means, scale)
+        self._raise_if_is_not_between_zero_and_one(alpha)
+        chunk_size = self._chunk_size if chunk_size is None else chunk_size
+        self._raise_if_chunk_size_is_not_strictly_positive(chunk_size)
+        key = (
+            number_of_simulations,
+            number_of_permutations,
+            self._sizes_of(number_of_observations),
+            tuple(means),
+            scale
+        )
+        run = self._runs.get(key)
+        if run is None:
+            run = self._start_run(key, executor, chunk_size)
+        run.join(progress)
+        try:
+            simulated = await asyncio.shield(run.future)
+        finally:
+            # `progress` is not called anymore once its request is over
+            if run.leave(progress):  # cancelled!
+                self._forget_run(key, run)
         return np.mean(simulated < alpha)
 
+    def _start_run(
+            self,
+            key: tuple,
+            executor: Optional[Executor],
+            chunk_size: int
+    ) -> "_CoalescedRun":
+        loop = asyncio.get_running_loop()
+        run = _CoalescedRun(loop)
+        run.future = loop.run_in_executor(
+            executor,
+            self._do_simulations_until_cancelled,
+            *key,
+            chunk_size,
+            run
+        )
+        run.future.add_done_callback(lambda _: self._forget_run(key, run))
+        self._runs[key] = run
+        return run
+
+    def _forget_run(self, key: tuple, run: "_CoalescedRun"):
+        if self._runs.get(key) is run:
+            del self._runs[key]
+
+    def _do_simulations_until_cancelled(
+            self,
+            number_of_simulations: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            chunk_size: int,
+            run: "_CoalescedRun"
+    ) -> Optional[np.ndarray]:
+        # returns None if cancelled, nobody is awaiting the result then
+        simulated = np.empty((number_of_simulations,), dtype=np.float_)
+        with self._lock, current_tracer().span(
+                'simulate',
+                category='simulate',
+                number_of_simulations=number_of_simulations,
+                number_of_permutations=number_of_permutations,
+                number_of_observations=number_of_observations
+        ):
+            for start in range(0, simulated.size, chunk_size):
+                if run.cancelled.is_set():
+                    return None
+                stop = min(start + chunk_size, simulated.size)
+                self._fill_simulations(
+                    simulated[start:stop],
+                    start,
+                    number_of_permutations,
+                    number_of_observations,
+                    means,
+                    scale
+                )
+                run.report(stop, simulated.size)
+        return simulated
+
     def _do_simulations(
             self,
             number_of_simulations: int,
             number_of_permutations: int,
-            number_of_observations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
             means: Tuple[float, float],
-            scale: float
+            scale: float,
+            *,
+            rows: Optional["_SimulationRows"] = None
     ) -> np.ndarray:
-        simulated = np.empty((number_of_simulations,), dtype=np.float_)
-        for i in range(simulated.size):
-            samples = self._generate_samples(
+        # the p-values of the simulations, or their rows of p-values if
+        # `rows` is not None
+        simulated = np.empty(
+            (number_of_simulations,) if rows is None
+            else (number_of_simulations, rows.size),
+            dtype=np.float_
+        )
+        with self._lock, current_tracer().span(
+                'simulate',
+                category='simulate',
+                number_of_simulations=number_of_simulations,
+                number_of_permutations=number_of_permutations,
+                number_of_observations=number_of_observations
+        ):
+            self._fill_simulations(
+                simulated,
+                0,
+                number_of_permutations,
                 number_of_observations,
                 means,
-                scale
+                scale,
+                rows=rows
             )
-            simulated[i] = self._calculator.calculate(
+        return simulated
+
+    def _do_stored_simulations(
+            self,
+            store: SimulationStore,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float
+    ):
+        # the chunks bound the memory used besides the memory-mapped file
+        with self._lock, current_tracer().span(
+                'simulate',
+                category='simulate',
+                number_of_simulations=store.size,
+                number_of_permutations=number_of_permutations,
+                number_of_observations=number_of_observations
+        ):
+            for start in range(0, store.size, self._STORED_CHUNK_SIZE):
+                stop = min(start + self._STORED_CHUNK_SIZE, store.size)
+                self._fill_simulations(
+                    store.p_values[start:stop],
+                    start,
+                    number_of_permutations,
+                    number_of_observations,
+                    means,
+                    scale,
+                    statistics=(
+                        None if store.statistics is None
+                        else store.statistics[start:stop]
+                    )
+                )
+                store.flush()
+
+    def _fill_simulations(
+            self,
+            simulated: np.ndarray,
+            start: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            *,
+            statistics: Optional[np.ndarray] = None,
+            rows: Optional["_SimulationRows"] = None
+    ):
+        # fills `simulated` with the p-values of the simulations
+        # [start, start + len(simulated)), or with their rows of p-values
+        # (see `_SimulationRows`) if `rows` is not None, and `statistics`
+        # with their observed statistics if not None
+        if self._pipeline is not None:
+            self._fill_simulations_pipelined(
+                simulated,
+                start,
+                number_of_permutations,
+                number_of_observations,
+                means,
+                scale,
+                statistics,
+                rows
+            )
+            return
+        if self._number_of_threads == 1:
+            self._fill_simulations_serially(
+                simulated,
+                start,
+                number_of_permutations,
+                number_of_observations,
+                means,
+                scale,
+                statistics,
+                rows
+            )
+            return
+        # a few chunks per thread to balance the load
+        chunk_size = -(-len(simulated) // (4 * self._number_of_threads))
+        with ThreadPoolExecutor(self._number_of_threads) as executor:
+            futures = [
+                executor.submit(
+                    self._fill_simulations_serially,
+                    simulated[offset:offset + chunk_size],
+                    start + offset,
+                    number_of_permutations,
+                    number_of_observations,
+                    means,
+                    scale,
+                    None if statistics is None
+                    else statistics[offset:offset + chunk_size],
+                    rows
+                )
+                for offset in range(0, len(simulated), chunk_size)
+            ]
+            for future in futures:
+                future.result()  # raises!
+
+    def _fill_simulations_serially(
+            self,
+            simulated: np.ndarray,
+            start: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            statistics: Optional[np.ndarray],
+            rows: Optional["_SimulationRows"]
+    ):
+        create = self._factory.create if rows is None else rows.create
+        tracer = current_tracer()
+        with tracer.span(
+                'chunk',
+                category='chunk',
+                start=start,
+                stop=start + len(simulated)
+        ):
+            for i in range(len(simulated)):
+                with tracer.span('generate', category='generation'):
+                    calculator, generator = create(start + i)
+                    samples = self._generate_samples(
+                        generator,
+                        number_of_observations,
+                        means,
+                        scale
+                    )
+                with tracer.span('test', category='permutation'):
+                    self._record(
+                        calculator,
+                        number_of_permutations,
+                        samples,
+                        i,
+                        simulated,
+                        statistics,
+                        rows
+                    )
+
+    def _fill_simulations_pipelined(
+            self,
+            simulated: np.ndarray,
+            start: int,
+            number_of_permutations: int,
+            number_of_observations: Union[int, Tuple[int, int]],
+            means: Tuple[float, float],
+            scale: float,
+            statistics: Optional[np.ndarray],
+            rows: Optional["_SimulationRows"]
+    ):
+        create = self._factory.create if rows is None else rows.create
+        tracer = current_tracer()
+
+        def generate(simulation: int) -> tuple:
+            with tracer.span('generate', category='generation'):
+                calculator, generator = create(simulation)
+                return calculator, self._generate_samples(
+                    generator,
+                    number_of_observations,
+                    means,
+                    scale
+                )
+
+        def test(simulation: int, item: tuple):
+            calculator, samples = item
+            with tracer.span('test', category='permutation'):
+                self._record(
+                    calculator,
+                    number_of_permutations,
+                    samples,
+                    simulation - start,
+                    simulated,
+                    statistics,
+                    rows
+                )
+
+        self._utilization = self._pipeline.run(
+            start,
+            start + len(simulated),
+            generate,
+            test
+        )
+
+    @staticmethod
+    def _record(
+            calculator: IOneSidedPermutationTestPValueCalculator,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector],
+            i: int,
+            simulated: np.ndarray,
+            statistics: Optional[np.ndarray],
+            rows: Optional["_SimulationRows"]
+    ):
+        # tests `samples` into the i-th element of `simulated` (and of
+        # `statistics` if not None), see `_fill_simulations`
+        if rows is not None:
+            simulated[i] = rows.test(
+                calculator,
                 number_of_permutations,
                 samples
             )
-        return simulated
+        elif statistics is None:
+            simulated[i] = calculator.calculate(
+                number_of_permutations,
+                samples
+            )
+        else:
+            result = calculator.test(number_of_permutations, samples)
+            simulated[i], statistics[i] = result.p_value, result.statistic
 
+    @staticmethod
     def _generate_samples(
-            self,
-            number_of_observations: int,
+            generator: INormalRandomGenerator,
+            number_of_observations: Union[int, Tuple[int, int]],
             means: Tuple[float, float],
             scale: float
     ) -> Tuple[Vector, Vector]:
+        size_a, size_b = (
+            UnpairedOneSidedPermutationTestPowerSimulator._sizes_of(
+                number_of_observations
+            )
+        )
         return (
-            self._generator.generate(
-                size=number_of_observations,
+            generator.generate(
+                size=size_a,
                 mean=means[0],
                 scale=scale
             ),
-            self._generator.generate(
-                size=number_of_observations,
+            generator.generate(
+                size=size_b,
                 mean=means[1],
                 scale=scale
             )
         )
 
+    @staticmethod
+    def _sizes_of(
+            number_of_observations: Union[int, Tuple[int, int]]
+    ) -> Tuple[int, int]:
+        # the sizes of both samples
+        if isinstance(number_of_observations, (int, np.integer)):
+            return number_of_observations, number_of_observations
+        size_a, size_b = number_of_observations
+        return size_a, size_b
+
     @staticmethod
     def _raise_if_is_negative(seed: int):
         if seed < 0:
@@ -140,8 +997,34 @@ class UnpairedOneSidedPermutationTestPowerSimulator:
             raise ValueError(msg)
 
     @staticmethod
-    def _raise_if_is_not_at_least_two(number_of_observations: int):
-        if number_of_observations <= 1:
+    def _raise_if_number_of_permutations_is_not_strictly_positive(
+            number_of_permutations: int
+    ):
+        if number_of_permutations <= 0:
+            msg = (
+                f'number_of_permutations must be strictly positive, '
+                f'was [{number_of_permutations}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_normal_parameters_are_invalid(
+            means: Tuple[float, float],
+            scale: float
+    ):
+        if len(means) != 2 or not all(isfinite(mean) for mean in means):
+            msg = f'means must be two finite means, was [{means}]'
+            raise ValueError(msg)
+        if not 0. <= scale < inf:
+            msg = f'scale must be finite and non-negative, was [{scale}]'
+            raise ValueError(msg)
+
+    @classmethod
+    def _raise_if_is_not_at_least_two(
+            cls,
+            number_of_observations: Union[int, Tuple[int, int]]
+    ):
+        if min(cls._sizes_of(number_of_observations)) <= 1:
             msg = (
                 f'number_of_observations must be at least 2, '
                 f'was [{number_of_observations}]'
@@ -153,3 +1036,563 @@ class UnpairedOneSidedPermutationTestPowerSimulator:
         if not 0. <= alpha <= 1.:
             msg = f'alpha must be in [0, 1], was [{alpha}]'
             raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_number_of_threads_is_not_strictly_positive(
+            number_of_threads: int
+    ):
+        if number_of_threads <= 0:
+            msg = (
+                f'number_of_threads must be strictly positive, '
+                f'was [{number_of_threads}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_threads_are_not_counter_based(number_of_threads: int):
+        if number_of_threads > 1:
+            msg = (
+                f'cannot split simulations across threads without '
+                f'counter-based streams, number_of_threads must be 1, '
+                f'was [{number_of_threads}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _warn_if_threads_hold_the_gil(
+            number_of_threads: int,
+            backend: Optional[str]
+    ):
+        if number_of_threads > 1 and backend is None:
+            msg = (
+                f'without a backend, the permutation tests hold the GIL, '
+                f'thus number_of_threads [{number_of_threads}] barely adds '
+                f'throughput, use eg. backend=\'auto\''
+            )
+            warnings.warn(msg, RuntimeWarning, stacklevel=3)
+
+    @staticmethod
+    def _raise_if_backend_approximates(
+            backend: Optional[str],
+            approximation: str
+    ):
+        if backend is not None and approximation != 'never':
+            msg = (
+                f'cannot approximate p-values with a backend, '
+                f'approximation must be never, was [{approximation}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_sampling_is_unknown(sampling: str):
+        if sampling not in ('independent', 'antithetic', 'halton'):
+            msg = (
+                f'sampling must be one of independent, antithetic or '
+                f'halton, was [{sampling}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_calculators_are_empty(
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator]
+    ):
+        if len(calculators) == 0:
+            msg = 'calculators must be non-empty'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_alternatives_are_unknown(alternatives: Sequence[str]):
+        if not alternatives or not set(alternatives) <= set(ALTERNATIVES):
+            msg = (
+                f'alternatives must be among {", ".join(ALTERNATIVES)}, '
+                f'were [{", ".join(alternatives)}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_statistic_is_unknown(statistic: str):
+        if statistic not in ('t-test', 'rank-sum'):
+            msg = (
+                f'statistic must be one of t-test or rank-sum, '
+                f'was [{statistic}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_rank_sum_is_not_exact(
+            statistic: str,
+            backend: Optional[str],
+            approximation: str
+    ):
+        if statistic == 'rank-sum' and (
+                backend is not None or approximation != 'never'
+        ):
+            msg = (
+                'cannot test the rank-sum statistic with a backend or '
+                'approximations, its p-values are exact'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_number_of_generators_is_negative(
+            number_of_generators: int
+    ):
+        if number_of_generators < 0:
+            msg = (
+                f'number_of_generators must be non-negative, '
+                f'was [{number_of_generators}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_threads_share_components(
+            factory: "ISimulationFactory",
+            number_of_threads: int,
+            pipeline: Optional[SimulationPipeline]
+    ):
+        if (
+                (number_of_threads > 1 or pipeline is not None)
+                and not factory.is_addressable
+        ):
+            msg = (
+                'cannot split simulations across threads, the components '
+                'of the factory are shared between simulations'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_range_is_invalid(start: int, stop: int):
+        if start < 0 or stop <= start:
+            msg = (
+                f'range must be non-empty and non-negative, '
+                f'was [{start}, {stop})'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_is_not_addressable(factory: "ISimulationFactory"):
+        if not factory.is_addressable:
+            msg = (
+                'cannot simulate a range of simulations, the components '
+                'of the factory are shared between simulations'
+            )
+            raise ValueError(msg)
+
+    @classmethod
+    def _resolve_deadline(
+            cls,
+            time_budget: Optional[float],
+            deadline: Optional[float]
+    ) -> float:
+        if (time_budget is None) == (deadline is None):
+            msg = 'expecting exactly one of time_budget and deadline'
+            raise ValueError(msg)
+        if deadline is None:
+            cls._raise_if_time_budget_is_negative(time_budget)
+            return time.monotonic() + time_budget
+        return deadline
+
+    @staticmethod
+    def _raise_if_time_budget_is_negative(time_budget: float):
+        if not time_budget >= 0.:
+            msg = f'time_budget must be non-negative, was [{time_budget}]'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_confidence_is_not_in_open_unit_interval(confidence: float):
+        if not 0. < confidence < 1.:
+            msg = f'confidence must be in (0, 1), was [{confidence}]'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_chunk_size_is_not_strictly_positive(chunk_size: int):
+        if chunk_size <= 0:
+            msg = f'chunk_size must be strictly positive, was [{chunk_size}]'
+            raise ValueError(msg)
+
+
+class AnytimePowerEstimate(NamedTuple):
+    # Power estimated from the simulations completed before a deadline,
+    # with its (Wilson score) confidence interval
+    power: float
+    number_of_simulations: int
+    confidence_interval: Tuple[float, float]
+
+
+class SmoothedPowerEstimate(NamedTuple):
+    # Power estimated from the probabilities of rejection of the
+    # simulations, with its standard error (given the fitted prior of the
+    # probabilities, see `simulate_smoothed`), the power estimated from their
+    # rejections (as `simulate`), with its standard error, and the ratio
+    # of the variances of the latter and of the former, ie. how many times
+    # more simulations the rejections need for the same precision
+    power: float
+    standard_error: float
+    indicator_power: float
+    indicator_standard_error: float
+    variance_reduction: float
+
+
+def wilson_interval(
+        successes: int,
+        trials: int,
+        confidence: float
+) -> Tuple[float, float]:
+    # Wilson score interval of a binomial proportion
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.)
+    proportion = successes / trials
+    denominator = 1. + z * z / trials
+    center = (proportion + z * z / (2. * trials)) / denominator
+    half_width = (
+            z
+            * sqrt(
+                proportion * (1. - proportion) / trials
+                + z * z / (4. * trials * trials)
+            )
+            / denominator
+    )
+    return max(0., center - half_width), min(1., center + half_width)
+
+
+SimulationComponents = Tuple[
+    IOneSidedPermutationTestPValueCalculator,
+    INormalRandomGenerator
+]
+
+MultipleStatisticsSimulationComponents = Tuple[
+    MultipleStatisticsPermutationTestPValueCalculator,
+    INormalRandomGenerator
+]
+
+
+class _SimulationRows(NamedTuple):
+    # Simulations recording a row of `size` p-values each, with the
+    # components of `create` and the p-values of `test` (given the
+    # calculator, the number of permutations and the samples)
+    size: int
+    create: Callable[[int], tuple]
+    test: Callable[..., Sequence[float]]
+
+
+class ISimulationFactory:
+
+    @property
+    def is_addressable(self) -> bool:
+        # whether the components of a simulation depend on its index only,
+        # ie. whether simulations may be done in any order or concurrently
+        raise NotImplementedError
+
+    def create(
+            self,
+            simulation: int
+    ) -> "SimulationComponents":
+        raise NotImplementedError
+
+    def create_multiple(
+            self,
+            simulation: int,
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator]
+    ) -> "MultipleStatisticsSimulationComponents":
+        # components testing the statistics of `calculators` on the same
+        # permutations, and drawing the samples of `create`
+        # optional! override if the permutations are drawn by a random
+        # permutator
+        msg = (
+            f'cannot test several statistics with {type(self).__name__}, '
+            f'its permutations are not drawn by a random permutator'
+        )
+        raise ValueError(msg)
+
+
+class SequentialSimulationFactory(ISimulationFactory):
+    # Shares the same components between all simulations, thus the
+    # result of a simulation depends on all the previous ones
+
+    def __init__(
+            self,
+            calculator: IOneSidedPermutationTestPValueCalculator,
+            generator: INormalRandomGenerator,
+            permutator: Optional[IRandomPermutator] = None
+    ):
+        # `permutator` draws the permutations of `create_multiple`, thus
+        # does not support it if None
+        self._calculator = calculator
+        self._generator = generator
+        self._permutator = permutator
+
+    @property
+    def is_addressable(self) -> bool:
+        return False
+
+    @property
+    def calculator(self) -> IOneSidedPermutationTestPValueCalculator:
+        # for testing!
+        return self._calculator
+
+    @property
+    def generator(self) -> INormalRandomGenerator:
+        # for testing!
+        return self._generator
+
+    def create(
+            self,
+            simulation: int
+    ) -> "SimulationComponents":
+        return self._calculator, self._generator
+
+    def create_multiple(
+            self,
+            simulation: int,
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator]
+    ) -> "MultipleStatisticsSimulationComponents":
+        if self._permutator is None:
+            return super().create_multiple(simulation, calculators)
+        return (
+            MultipleStatisticsPermutationTestPValueCalculator.make(
+                calculators,
+                self._permutator
+            ),
+            self._generator
+        )
+
+
+class CounterBasedSimulationFactory(ISimulationFactory):
+    # Makes components drawing from the counter-based streams of the
+    # simulation, thus the result of a simulation depends on its index
+    # only
+
+    def __init__(
+            self,
+            streams: PhiloxStreams,
+            calculator: ITwoSampleTTestStatisticCalculator,
+            sampling: INormalSampling,
+            *,
+            approximation: str = 'never',
+            tolerance: float = 1e-3
+    ):
+        # will raise as `OneSidedPermutationTestPValueCalculator.make`
+        self._raise_if_approximation_is_unknown(approximation)
+        self._raise_if_tolerance_is_not_strictly_positive(tolerance)
+        if approximation != 'never':
+            self._raise_if_statistic_is_not_increasing_in_first_sum(
+                calculator
+            )
+        self._streams = streams
+        self._calculator = calculator
+        self._sampling = sampling
+        self._approximation = approximation
+        self._tolerance = tolerance
+
+    @property
+    def is_addressable(self) -> bool:
+        return True
+
+    @property
+    def streams(self) -> PhiloxStreams:
+        # for testing!
+        return self._streams
+
+    @property
+    def sampling(self) -> INormalSampling:
+        # for testing!
+        return self._sampling
+
+    @property
+    def calculator(self) -> ITwoSampleTTestStatisticCalculator:
+        # for testing!
+        return self._calculator
+
+    def create(
+            self,
+            simulation: int
+    ) -> "SimulationComponents":
+        return (
+            OneSidedPermutationTestPValueCalculator.make(
+                self._calculator,
+                PhiloxRandomPermutator(self._streams, simulation),
+                approximation=self._approximation,
+                tolerance=self._tolerance
+            ),
+            self._sampling.generator(simulation)
+        )
+
+    def create_multiple(
+            self,
+            simulation: int,
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator]
+    ) -> "MultipleStatisticsSimulationComponents":
+        return (
+            MultipleStatisticsPermutationTestPValueCalculator.make(
+                calculators,
+                PhiloxRandomPermutator(self._streams, simulation)
+            ),
+            self._sampling.generator(simulation)
+        )
+
+    @staticmethod
+    def _raise_if_approximation_is_unknown(approximation: str):
+        if approximation not in ('never', 'always', 'auto'):
+            msg = (
+                f'approximation must be one of never, always or auto, '
+                f'was [{approximation}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_tolerance_is_not_strictly_positive(tolerance: float):
+        if not tolerance > 0.:
+            msg = f'tolerance must be strictly positive, was [{tolerance}]'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_statistic_is_not_increasing_in_first_sum(
+            calculator: ITwoSampleTTestStatisticCalculator
+    ):
+        if not calculator.is_increasing_in_first_sum:
+            msg = (
+                'cannot approximate the p-value, the statistic is not '
+                'increasing in the sum of the first sample'
+            )
+            raise ValueError(msg)
+
+
+class KernelSimulationFactory(ISimulationFactory):
+    # Makes components drawing from the counter-based streams of the
+    # simulation, whose permutation tests are done by the kernels of a
+    # backend (see core/backend.py), eg. compiled kernels releasing the
+    # GIL, thus suited to threads
+
+    def __init__(
+            self,
+            streams: PhiloxStreams,
+            sampling: INormalSampling,
+            backend: IPermutationBackend
+    ):
+        self._streams = streams
+        self._sampling = sampling
+        self._backend = backend
+
+    @property
+    def is_addressable(self) -> bool:
+        return True
+
+    @property
+    def streams(self) -> PhiloxStreams:
+        # for testing!
+        return self._streams
+
+    @property
+    def sampling(self) -> INormalSampling:
+        # for testing!
+        return self._sampling
+
+    @property
+    def backend(self) -> IPermutationBackend:
+        # for testing!
+        return self._backend
+
+    def create(self, simulation: int) -> "SimulationComponents":
+        return (
+            ParallelOneSidedPermutationTestPValueCalculator(
+                self._streams,
+                simulation=simulation,
+                number_of_threads=1,  # threads split the simulations!
+                backend=self._backend
+            ),
+            self._sampling.generator(simulation)
+        )
+
+    def create_multiple(
+            self,
+            simulation: int,
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator]
+    ) -> "MultipleStatisticsSimulationComponents":
+        # the permutations are drawn by a random permutator on the streams
+        # of the simulation, as `CounterBasedSimulationFactory`, not by
+        # the kernels of the backend, thus differ from those of `create`
+        return (
+            MultipleStatisticsPermutationTestPValueCalculator.make(
+                calculators,
+                PhiloxRandomPermutator(self._streams, simulation)
+            ),
+            self._sampling.generator(simulation)
+        )
+
+
+class RankSumSimulationFactory(ISimulationFactory):
+    # Makes components drawing the samples from the counter-based streams
+    # of the simulation, whose exact rank-sum p-values are computed from
+    # the cached null distribution (see core/rank.py), thus the result of
+    # a simulation depends on its index only, and no permutation is drawn
+
+    def __init__(
+            self,
+            sampling: INormalSampling,
+            calculator: RankSumPValueCalculator
+    ):
+        self._sampling = sampling
+        self._calculator = calculator  # stateless, thus shared!
+
+    @property
+    def is_addressable(self) -> bool:
+        return True
+
+    @property
+    def sampling(self) -> INormalSampling:
+        # for testing!
+        return self._sampling
+
+    @property
+    def calculator(self) -> RankSumPValueCalculator:
+        # for testing!
+        return self._calculator
+
+    def create(self, simulation: int) -> "SimulationComponents":
+        return self._calculator, self._sampling.generator(simulation)
+
+
+class _CoalescedRun:
+    # Computation shared by identical concurrent `simulate_async` requests
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._waiters = 0
+        self._callbacks: List[Callable[[int, int], None]] = []
+        self.cancelled = Event()
+        self.future: Optional[asyncio.Future] = None
+
+    def join(self, progress: Optional[Callable[[int, int], None]]):
+        self._waiters += 1
+        if progress is not None:
+            self._callbacks.append(progress)
+
+    def leave(self, progress: Optional[Callable[[int, int], None]]) -> bool:
+        # returns True if the computation was cancelled, ie. if nobody
+        # is awaiting it anymore
+        self._waiters -= 1
+        if progress is not None:
+            self._callbacks.remove(progress)
+        if self._waiters == 0 and not self.future.done():
+            self.cancelled.set()
+            return True
+        return False
+
+    def report(self, completed: int, total: int):
+        # called from the executor!
+        for callback in tuple(self._callbacks):
+            self._loop.call_soon_threadsafe(
+                self._call,
+                callback,
+                completed,
+                total
+            )
+
+    def _call(
+            self,
+            callback: Callable[[int, int], None],
+            completed: int,
+            total: int
+    ):
+        # on the loop, the request of `callback` may have left meanwhile
+        if callback in self._callbacks:
+            callback(completed, total)
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+# Power curves over a grid of points (numbers of observations and means)
+# with a budget of simulations allocated adaptively: every point starts
+# with a few simulations, then the budget goes, a batch at a time, to the
+# unresolved point whose confidence interval is the widest relative to the
+# precision target, or, given a decision threshold, the widest relative to
+# its distance to the threshold
+# a point is resolved once the half-width of its interval is below the
+# precision target, or once its interval excludes the threshold, thus the
+# points of power near 0 or 1 (or far from the threshold) stop early, and
+# the informative ones get the simulations
+# the threshold is checked after every batch of a point, ie. at every look,
+# thus, to keep the probability that a point is resolved on the wrong side
+# of the threshold below 1 - confidence across its looks (Bonferroni over
+# the looks), its k-th look excludes the threshold with an interval at
+# 1 - (1 - confidence) * 6 / (pi^2 k^2), the errors of the looks summing to
+# at most 1 - confidence however many they are, while the reported
+# intervals are at `confidence` (they are not sequentially valid)
+# the simulations of a point continue those already done (see
+# `simulate_range`), thus the estimate of a point of n simulations is the
+# estimate of `simulate` with n simulations
+
+from math import ceil, pi
+from statistics import NormalDist
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .core import UnpairedOneSidedPermutationTestPowerSimulator
+from .core import wilson_interval
+
+
+class GridPoint(NamedTuple):
+    number_of_observations: int
+    means: Tuple[float, float]
+
+
+class GridPointEstimate(NamedTuple):
+    # Power of a point estimated from its simulations, with its (Wilson
+    # score) confidence interval, and whether the point is resolved
+    point: GridPoint
+    power: float
+    number_of_simulations: int
+    confidence_interval: Tuple[float, float]
+    is_resolved: bool
+
+    @property
+    def half_width(self) -> float:
+        low, high = self.confidence_interval
+        return (high - low) / 2.
+
+
+class PowerCurve(NamedTuple):
+    # Estimates of the points of a grid, in the order of the grid, the
+    # total number of simulations, and the number of rounds of allocation
+    estimates: Tuple[GridPointEstimate, ...]
+    number_of_simulations: int
+    rounds: int
+
+    @property
+    def is_resolved(self) -> bool:
+        return all(estimate.is_resolved for estimate in self.estimates)
+
+
+class AdaptivePowerGrid:
+    # Allocates a budget of simulations across the points of a grid, see
+    # above
+
+    def __init__(
+            self,
+            simulator: UnpairedOneSidedPermutationTestPowerSimulator,
+            *,
+            points: Sequence[GridPoint],
+            number_of_permutations: int,
+            scale: float,
+            alpha: float,
+            precision: float = 0.02,
+            threshold: Optional[float] = None,
+            confidence: float = 0.95,
+            initial: int = 32
+    ):
+        # will raise if `points` is empty, if `alpha` is not in [0, 1], if
+        # `precision` is not in
+        # (0, 0.5), if `threshold` is not None nor in (0, 1), if
+        # `confidence` is not in (0, 1), or if `initial` is not strictly
+        # positive
+        # the simulator must be addressable, eg. counter-based (see
+        # `simulate_range`), which `run` checks
+        # `precision` is the target half-width of the confidence intervals
+        # at `confidence`, and `initial` the number of simulations of
+        # every point before any allocation
+        self._raise_if_points_are_empty(points)
+        UnpairedOneSidedPermutationTestPowerSimulator \
+            ._raise_if_is_not_between_zero_and_one(alpha)
+        self._raise_if_is_not_in_open_interval(
+            precision,
+            0.,
+            0.5,
+            name='precision'
+        )
+        if threshold is not None:
+            self._raise_if_is_not_in_open_interval(
+                threshold,
+                0.,
+                1.,
+                name='threshold'
+            )
+        self._raise_if_is_not_in_open_interval(
+            confidence,
+            0.,
+            1.,
+            name='confidence'
+        )
+        self._raise_if_initial_is_not_strictly_positive(initial)
+        self._simulator = simulator
+        self._points = tuple(points)
+        self._number_of_permutations = number_of_permutations
+        self._scale = scale
+        self._alpha = alpha
+        self._precision = precision
+        self._threshold = threshold
+        self._confidence = confidence
+        self._initial = initial
+        self._z = NormalDist().inv_cdf(0.5 + confidence / 2.)
+
+    @property
+    def points(self) -> Tuple[GridPoint, ...]:
+        return self._points
+
+    def run(self, *, budget: int) -> PowerCurve:
+        # will raise if `budget` is less than the initial simulations of
+        # every point, or as `simulate_range`
+        # stops once every point is resolved, or once the budget is spent
+        self._raise_if_budget_is_too_small(budget)
+        rejected = [0] * len(self._points)
+        completed = [0] * len(self._points)
+        looks = [0] * len(self._points)
+        for i in range(len(self._points)):
+            self._simulate(i, self._initial, rejected, completed, looks)
+        rounds = 0
+        while sum(completed) < budget:
+            estimates = self._estimate(rejected, completed, looks)
+            unresolved = [
+                i for i, estimate in enumerate(estimates)
+                if not estimate.is_resolved
+            ]
+            if not unresolved:
+                break
+            i = max(unresolved, key=lambda j: self._priority(estimates[j]))
+            self._simulate(
+                i,
+                min(
+                    self._batch_size(estimates[i]),
+                    budget - sum(completed)
+                ),
+                rejected,
+                completed,
+                looks
+            )
+            rounds += 1
+        return PowerCurve(
+            tuple(self._estimate(rejected, completed, looks)),
+            sum(completed),
+            rounds
+        )
+
+    def _simulate(
+            self,
+            i: int,
+            number_of_simulations: int,
+            rejected: List[int],
+            completed: List[int],
+            looks: List[int]
+    ):
+        # the next `number_of_simulations` simulations of the i-th point
+        point = self._points[i]
+        simulated = self._simulator.simulate_range(
+            start=completed[i],
+            stop=completed[i] + number_of_simulations,
+            number_of_permutations=self._number_of_permutations,
+            number_of_observations=point.number_of_observations,
+            means=point.means,
+            scale=self._scale
+        )
+        rejected[i] += int((simulated < self._alpha).sum())
+        completed[i] += number_of_simulations
+        looks[i] += 1
+
+    def _estimate(
+            self,
+            rejected: List[int],
+            completed: List[int],
+            looks: List[int]
+    ) -> List[GridPointEstimate]:
+        estimates = []
+        for point, successes, trials, k in zip(
+                self._points,
+                rejected,
+                completed,
+                looks
+        ):
+            low, high = wilson_interval(successes, trials, self._confidence)
+            estimates.append(GridPointEstimate(
+                point,
+                successes / trials,
+                trials,
+                (low, high),
+                (high - low) / 2. <= self._precision
+                or self._excludes_threshold(successes, trials, k)
+            ))
+        return estimates
+
+    def _excludes_threshold(self, successes: int, trials: int, k: int) -> bool:
+        # at the k-th look, see above
+        if self._threshold is None:
+            return False
+        error = (1. - self._confidence) * 6. / (pi * pi * k * k)
+        low, high = wilson_interval(successes, trials, 1. - error)
+        return not low <= self._threshold <= high
+
+    def _priority(self, estimate: GridPointEstimate) -> float:
+        # the half-width relative to the precision, or to the distance to
+        # the threshold (at least the precision) if any
+        if self._threshold is None:
+            return estimate.half_width / self._precision
+        return estimate.half_width / max(
+            self._precision,
+            abs(estimate.power - self._threshold)
+        )
+
+    def _batch_size(self, estimate: GridPointEstimate) -> int:
+        # the simulations missing for the precision target at the center
+        # of the interval, at least `initial`, and at most as many as done,
+        # thus the number of simulations of a point at most doubles per
+        # round, which bounds the overshoot of a noisy center
+        low, high = estimate.confidence_interval
+        center = (low + high) / 2.
+        needed = ceil(
+            self._z * self._z * center * (1. - center)
+            / (self._precision * self._precision)
+        )
+        return max(
+            self._initial,
+            min(needed - estimate.number_of_simulations,
+                estimate.number_of_simulations)
+        )
+
+    @staticmethod
+    def _raise_if_points_are_empty(points: Sequence[GridPoint]):
+        if len(points) == 0:
+            msg = 'points must be non-empty'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_is_not_in_open_interval(
+            value: float,
+            low: float,
+            high: float,
+            *,
+            name: str
+    ):
+        if not low < value < high:
+            msg = f'{name} must be in ({low}, {high}), was [{value}]'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_initial_is_not_strictly_positive(initial: int):
+        if initial <= 0:
+            msg = f'initial must be strictly positive, was [{initial}]'
+            raise ValueError(msg)
+
+    def _raise_if_budget_is_too_small(self, budget: int):
+        if budget < self._initial * len(self._points):
+            msg = (
+                f'budget must be at least {self._initial} simulations per '
+                f'point, ie. {self._initial * len(self._points)}, '
+                f'was [{budget}]'
+            )
+            raise ValueError(msg)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# numba is optional: without it, the kernels decorated by `njit` run as
+# plain Python functions (slowly), `prange` is `range` and there is a single
+# thread
+
+from typing import Callable
+
+try:
+    from numba import get_num_threads, njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover, depends on the environment
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def get_num_threads() -> int:
+        return 1
+
+    def njit(*args, **kwargs) -> Callable:
+        # supports both `@njit` and `@njit(...)`
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+
+def python_function(function: Callable) -> Callable:
+    # the Python function of a compiled function (itself without numba),
+    # which runs without compiling it
+    return getattr(function, 'py_func', function)
+
+
+__all__ = [
+    'NUMBA_AVAILABLE',
+    'get_num_threads',
+    'njit',
+    'prange',
+    'python_function'
+]
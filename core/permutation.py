@@ -1,15 +1,65 @@
 # -*- coding: utf-8 -*-
 # TODO tests
 
-from typing import Tuple
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from math import ceil, erfc, exp, inf, log, nan, pi, sqrt
+from threading import Lock
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
 
 import numpy as np
+from numpy.random import BitGenerator, Generator
 
+from .backend import IPermutationBackend
+from .backend import resolve_backend
+from .jit import njit
+from .jit import python_function
 from .random import IRandomPermutator
+from .random import PhiloxStreams
+from .trace import current_tracer
 from .ttest import ITwoSampleTTestStatisticCalculator
+from .ttest import t_statistic_from_sums
 from .vector import Vector
 
 
+class PermutationTestResult(NamedTuple):
+    # Outcome of a one-sided permutation test, ie. the observed statistic,
+    # the p-value, the number of permutations whose statistic is greater
+    # than the observed one, and the number of permutations whose
+    # statistic could be computed (both are 0 if the p-value was
+    # approximated, or computed exactly, without permutations)
+    statistic: float
+    p_value: float
+    greater: int
+    permutations: int
+
+
+ALTERNATIVES = ('greater', 'less', 'two-sided')
+
+
+class AlternativesTestResult(NamedTuple):
+    # Outcome of a permutation test against every alternative from the
+    # same permutations, ie. the observed statistic, the p-values of the
+    # alternatives in `ALTERNATIVES` order: the first sample is greater
+    # (the p-value of `PermutationTestResult`), less (the fraction of
+    # permutations whose statistic is less than the observed one), or
+    # either (twice the smaller one-sided p-value, at most one, thus
+    # whatever the center of the statistic), and the number of
+    # permutations whose statistic could be computed (0 as in
+    # `PermutationTestResult`)
+    statistic: float
+    greater: float
+    less: float
+    two_sided: float
+    permutations: int
+
+    @property
+    def p_values(self) -> Tuple[float, float, float]:
+        return self.greater, self.less, self.two_sided
+
+
 class IOneSidedPermutationTestPValueCalculator:
 
     def calculate(
@@ -19,6 +69,28 @@ class IOneSidedPermutationTestPValueCalculator:
     ) -> float:
         raise NotImplementedError
 
+    def test(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> PermutationTestResult:
+        raise NotImplementedError
+
+    def test_alternatives(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> AlternativesTestResult:
+        # will raise as `test`, or if the calculator only counts the
+        # permutations exceeding the observed statistic
+        # optional! override if the other tail is known from the same pass
+        msg = (
+            f'cannot test the alternatives with '
+            f'{type(self).__name__}, it counts the greater permutations '
+            f'only'
+        )
+        raise ValueError(msg)
+
 
 class OneSidedPermutationTestPValueCalculator(
     IOneSidedPermutationTestPValueCalculator
@@ -30,25 +102,79 @@ class OneSidedPermutationTestPValueCalculator(
     def make(
             cls,
             calculator: ITwoSampleTTestStatisticCalculator,
-            permutator: IRandomPermutator
+            permutator: IRandomPermutator,
+            *,
+            approximation: str = 'never',
+            tolerance: float = 1e-3
     ) -> "OneSidedPermutationTestPValueCalculator":
         # public constructor!
+        # will raise if `approximation` is unknown, if `tolerance` is not
+        # strictly positive, or if `approximation` is not 'never' and the
+        # statistic of `calculator` is not increasing in the sum of the
+        # first sample
+        # `approximation` is 'never' (the permutations are drawn), 'always'
+        # (the p-value is approximated from the exact permutation moments,
+        # see `EdgeworthPValueApproximator`, if there are at least four
+        # observations), or 'auto' (the p-value is approximated if the
+        # estimated error of the approximation is below `tolerance`)
+        cls._raise_if_approximation_is_unknown(approximation)
+        cls._raise_if_tolerance_is_not_strictly_positive(tolerance)
+        if approximation != 'never':
+            cls._raise_if_statistic_is_not_increasing_in_first_sum(
+                calculator
+            )
         return cls(
             TwoSamplePermutator(
                 calculator,
                 permutator
+            ),
+            None if approximation == 'never'
+            else EdgeworthPValueApproximator(calculator),
+            tolerance=inf if approximation == 'always' else tolerance
+        )
+
+    @classmethod
+    def make_swap_chain(
+            cls,
+            generator: BitGenerator,
+            *,
+            burn_in: Optional[int] = None,
+            thinning: Optional[int] = None
+    ) -> "OneSidedPermutationTestPValueCalculator":
+        # public constructor!
+        # will raise as `SwapChainTwoSamplePermutator`
+        # the permutations are drawn by a swap chain with the unpaired
+        # t-test statistic assuming similar variances
+        return cls(
+            SwapChainTwoSamplePermutator(
+                generator,
+                burn_in=burn_in,
+                thinning=thinning
             )
         )
 
-    def __init__(self, permutator: "ITwoSamplePermutator"):
+    def __init__(
+            self,
+            permutator: "ITwoSamplePermutator",
+            approximator: Optional["EdgeworthPValueApproximator"] = None,
+            *,
+            tolerance: float = inf
+    ):
         # private!
         self._permutator = permutator
+        self._approximator = approximator
+        self._tolerance = tolerance
 
     @property
     def permutator(self) -> "ITwoSamplePermutator":
         # for testing!
         return self._permutator
 
+    @property
+    def approximator(self) -> Optional["EdgeworthPValueApproximator"]:
+        # for testing!
+        return self._approximator
+
     def calculate(
             self,
             number_of_permutations: int,
@@ -59,11 +185,806 @@ class OneSidedPermutationTestPValueCalculator(
         # (ie. the test denominator is zero or any sample is empty),
         # or if it is impossible to compute the test statistic for all
         # permutations (unlikely)
+        return self.test(number_of_permutations, samples).p_value
+
+    def test(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> PermutationTestResult:
+        # will raise as `calculate`
+        approximation = self._approximate(number_of_permutations, samples)
+        if approximation is not None:
+            return PermutationTestResult(
+                approximation.statistic,
+                approximation.p_value,
+                0,
+                0
+            )
+        observed, permuted = self._permutator.permute(
+            number_of_permutations,
+            samples
+        )
+        greater = int(np.count_nonzero(permuted.data > observed))
+        return PermutationTestResult(
+            observed,
+            greater / permuted.size,
+            greater,
+            permuted.size
+        )
+
+    def test_alternatives(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> AlternativesTestResult:
+        # will raise as `calculate`
+        # both tails are counted on the same permuted statistics, or
+        # approximated by the same (continuous) approximation
+        approximation = self._approximate(number_of_permutations, samples)
+        if approximation is not None:
+            return alternatives_from_tails(
+                approximation.statistic,
+                approximation.p_value,
+                1. - approximation.p_value,
+                0
+            )
         observed, permuted = self._permutator.permute(
             number_of_permutations,
             samples
         )
-        return np.mean(permuted.data > observed)
+        return alternatives_from_tails(
+            observed,
+            np.count_nonzero(permuted.data > observed) / permuted.size,
+            np.count_nonzero(permuted.data < observed) / permuted.size,
+            permuted.size
+        )
+
+    def _approximate(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> Optional["EdgeworthApproximation"]:
+        # will raise as `calculate`
+        # the approximation of the p-value, if any and if its estimated
+        # error is below the tolerance, otherwise the permutations are drawn
+        if self._approximator is None:
+            return None
+        _raise_if_number_of_permutations_is_not_strictly_positive(
+            number_of_permutations
+        )
+        approximation = self._approximator.approximate(samples)
+        if approximation.error < self._tolerance:
+            return approximation
+        return None
+
+    @staticmethod
+    def _raise_if_approximation_is_unknown(approximation: str):
+        if approximation not in ('never', 'always', 'auto'):
+            msg = (
+                f'approximation must be one of never, always or auto, '
+                f'was [{approximation}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_tolerance_is_not_strictly_positive(tolerance: float):
+        if not tolerance > 0.:
+            msg = f'tolerance must be strictly positive, was [{tolerance}]'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_statistic_is_not_increasing_in_first_sum(
+            calculator: ITwoSampleTTestStatisticCalculator
+    ):
+        if not calculator.is_increasing_in_first_sum:
+            msg = (
+                'cannot approximate the p-value, the statistic is not '
+                'increasing in the sum of the first sample'
+            )
+            raise ValueError(msg)
+
+
+class EdgeworthApproximation(NamedTuple):
+    # Approximation of the p-value of a one-sided permutation test, with
+    # the estimated error of the approximation (inf if it could not be
+    # computed), and the skewness and excess kurtosis of the permutation
+    # distribution of the sum of the first sample
+    statistic: float
+    p_value: float
+    error: float
+    skewness: float
+    excess_kurtosis: float
+
+
+class EdgeworthPValueApproximator:
+    # Approximates the p-value of a one-sided permutation test on two
+    # samples in O(n), for statistics increasing in the sum of the first
+    # sample (as the t-test statistic assuming similar variances)
+    # the p-value is then the probability that the sum of a random subset
+    # of the pooled observations exceeds the observed sum, approximated by
+    # the Edgeworth expansion (to the second order) of its exact
+    # permutation cumulants, ie. of sampling without replacement
+    # the error of the approximation is estimated by the largest magnitude
+    # of its second-order terms, the remainder being of a higher order
+
+    _MAXIMUM_OF_SECOND_ORDER_TERMS = (0.5505878394850495, 2.307105929549313)
+
+    def __init__(self, calculator: ITwoSampleTTestStatisticCalculator):
+        self._calculator = calculator
+
+    @property
+    def calculator(self) -> ITwoSampleTTestStatisticCalculator:
+        # for testing!
+        return self._calculator
+
+    def approximate(
+            self,
+            samples: Tuple[Vector, Vector]
+    ) -> EdgeworthApproximation:
+        # will raise if it is impossible to compute the test statistic for
+        # `samples`
+        statistic = self._calculator.calculate(samples)
+        concatenated = Vector.concatenate(samples).data
+        size, total = samples[0].size, concatenated.size
+        if total < 4:  # the fourth cumulant is undefined!
+            return EdgeworthApproximation(statistic, nan, inf, nan, nan)
+        deviations = concatenated - np.mean(concatenated)
+        variance, skewness, excess_kurtosis = self._calculate_cumulants(
+            deviations,
+            size
+        )
+        z = np.sum(deviations[:size]) / sqrt(variance)
+        density = exp(-z * z / 2.) / sqrt(2. * pi)
+        tail = 0.5 * erfc(z / sqrt(2.)) + density * (
+                skewness / 6. * (z * z - 1.)
+                + excess_kurtosis / 24. * (z ** 3 - 3. * z)
+                + skewness ** 2 / 72. * (z ** 5 - 10. * z ** 3 + 15. * z)
+        )
+        kurtosis_term, skewness_term = self._MAXIMUM_OF_SECOND_ORDER_TERMS
+        error = (
+                abs(excess_kurtosis) / 24. * kurtosis_term
+                + skewness ** 2 / 72. * skewness_term
+        )
+        return EdgeworthApproximation(
+            statistic,
+            min(1., max(0., tail)),
+            error,
+            skewness,
+            excess_kurtosis
+        )
+
+    @staticmethod
+    def _calculate_cumulants(
+            deviations: np.ndarray,
+            size: int
+    ) -> Tuple[float, float, float]:
+        # variance, skewness and excess kurtosis of the sum of `size`
+        # observations drawn without replacement among `deviations`
+        n, total = size, deviations.size
+        squared = deviations * deviations
+        m2 = np.mean(squared)
+        m3 = np.mean(squared * deviations)
+        m4 = np.mean(squared * squared)
+        variance = n * (total - n) / (total - 1) * m2
+        third = (
+                n * (total - n) * (total - 2 * n)
+                / ((total - 1) * (total - 2))
+                * m3
+        )
+        fourth = (
+                n * (total - n)
+                / ((total - 1) * (total - 2) * (total - 3))
+                * (
+                        (total * (total + 1) - 6 * n * (total - n)) * m4
+                        + 3 * total * (n - 1) * (total - n - 1) * m2 * m2
+                )
+        )
+        return (
+            variance,
+            third / variance ** 1.5,
+            fourth / variance ** 2 - 3.
+        )
+
+
+class ParallelOneSidedPermutationTestPValueCalculator(
+    IOneSidedPermutationTestPValueCalculator
+):
+    # Calculator of p-value for a one-sided permutation test on two
+    # samples with the unpaired t-test statistic assuming similar
+    # variances, splitting the permutations in blocks computed on a pool
+    # of threads by a backend (see core/backend.py), eg. compiled kernels
+    # releasing the GIL
+    # the j-th block draws from the counter-based stream of
+    # (simulation, j), thus the p-value does not depend on the number of
+    # threads, nor on the backend (up to rounding)
+    # every test continues with the blocks after those of the previous
+    # tests, thus the tests of a calculator draw independent permutations,
+    # and the i-th test of a calculator is reproducible
+
+    _UNIFORMS_PER_BLOCK = 2 ** 18  # bounds the memory of a block
+
+    @classmethod
+    def make(
+            cls,
+            *,
+            seed: int,
+            number_of_threads: Optional[int] = None,
+            backend: str = 'auto'
+    ) -> "ParallelOneSidedPermutationTestPValueCalculator":
+        # public constructor!
+        # will raise if `seed` is negative,
+        # if `number_of_threads` is not strictly positive,
+        # or if `backend` is not one of `available_backends()`
+        # uses one thread per core if `number_of_threads` is None
+        # 'auto' selects the backend by the size of every test, with the
+        # cores left by the threads
+        cores = os.cpu_count() or 1
+        number_of_threads = (
+            cores if number_of_threads is None else number_of_threads
+        )
+        return cls(
+            PhiloxStreams(seed),
+            simulation=0,
+            number_of_threads=number_of_threads,
+            backend=resolve_backend(
+                backend,
+                number_of_cores=max(1, cores // max(1, number_of_threads))
+            )
+        )
+
+    def __init__(
+            self,
+            streams: PhiloxStreams,
+            *,
+            simulation: int,
+            number_of_threads: int,
+            backend: IPermutationBackend
+    ):
+        # private!
+        self._raise_if_number_of_threads_is_not_strictly_positive(
+            number_of_threads
+        )
+        self._streams = streams
+        self._simulation = simulation
+        self._number_of_threads = number_of_threads
+        self._backend = backend
+        self._next_block = 0
+        self._lock = Lock()
+
+    @property
+    def streams(self) -> PhiloxStreams:
+        # for testing!
+        return self._streams
+
+    @property
+    def number_of_threads(self) -> int:
+        # for testing!
+        return self._number_of_threads
+
+    @property
+    def backend(self) -> IPermutationBackend:
+        # for testing!
+        return self._backend
+
+    @property
+    def next_block(self) -> int:
+        # for testing!
+        return self._next_block
+
+    def calculate(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> float:
+        # will raise as `OneSidedPermutationTestPValueCalculator.calculate`
+        return self.test(number_of_permutations, samples).p_value
+
+    def test(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> PermutationTestResult:
+        # will raise as `calculate`
+        observed, greater, _, valid = self._count_tails(
+            number_of_permutations,
+            samples
+        )
+        return PermutationTestResult(
+            observed,
+            greater / valid,
+            greater,
+            valid
+        )
+
+    def test_alternatives(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> AlternativesTestResult:
+        # will raise as `calculate`
+        # both tails are counted by the backends in the same pass
+        observed, greater, less, valid = self._count_tails(
+            number_of_permutations,
+            samples
+        )
+        return alternatives_from_tails(
+            observed,
+            greater / valid,
+            less / valid,
+            valid
+        )
+
+    def _count_tails(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> Tuple[float, int, int, int]:
+        # the observed statistic, and the counts of all the blocks, see
+        # `IPermutationBackend.count`
+        _raise_if_number_of_permutations_is_not_strictly_positive(
+            number_of_permutations
+        )
+        _raise_if_any_sample_is_empty(samples)
+        size = samples[0].size
+        centered = _center(samples)
+        backend = self._backend.select(centered.size, number_of_permutations)
+        observed = _calculate_observed(
+            centered,
+            size,
+            compiled=backend.is_compiled
+        )
+        blocks = self._reserve_blocks(
+            self._split_in_blocks(number_of_permutations, size)
+        )
+        counts = self._count_blocks(backend, centered, size, observed, blocks)
+        with current_tracer().span('counts', category='reduction'):
+            greater, less, valid = np.sum(counts, axis=0)
+        self._raise_runtime_if_no_valid_permutations(valid)
+        return observed, int(greater), int(less), int(valid)
+
+    def _count_blocks(
+            self,
+            backend: IPermutationBackend,
+            centered: np.ndarray,
+            size: int,
+            observed: float,
+            blocks: Tuple[Tuple[int, int], ...]
+    ) -> List[Tuple[int, int, int]]:
+        # the counts of every block, see `IPermutationBackend.count`
+        if self._number_of_threads == 1 or len(blocks) == 1:
+            return [
+                self._count(backend, centered, size, observed, *block)
+                for block in blocks
+            ]
+        with ThreadPoolExecutor(self._number_of_threads) as executor:
+            return list(executor.map(
+                lambda block: self._count(
+                    backend,
+                    centered,
+                    size,
+                    observed,
+                    *block
+                ),
+                blocks
+            ))
+
+    def _count(
+            self,
+            backend: IPermutationBackend,
+            centered: np.ndarray,
+            size: int,
+            observed: float,
+            block: int,
+            number_of_permutations: int
+    ) -> Tuple[int, int, int]:
+        with current_tracer().span(
+                'block',
+                category='permutation',
+                block=block,
+                backend=backend.name
+        ):
+            uniforms = Generator(
+                self._streams.permutation(self._simulation, block)
+            ).random((number_of_permutations, size))  # releases the GIL!
+            return backend.count(centered, size, uniforms, observed)
+
+    def _reserve_blocks(
+            self,
+            sizes: Tuple[int, ...]
+    ) -> Tuple[Tuple[int, int], ...]:
+        # the indices of the next blocks, which no other test of the
+        # calculator draws, with their numbers of permutations
+        with self._lock:
+            first = self._next_block
+            self._next_block += len(sizes)
+        return tuple(enumerate(sizes, first))
+
+    @classmethod
+    def _split_in_blocks(
+            cls,
+            number_of_permutations: int,
+            size: int
+    ) -> Tuple[int, ...]:
+        # the blocks depend on the sizes only, not on the number of threads
+        block_size = max(1, cls._UNIFORMS_PER_BLOCK // max(1, size))
+        full, remaining = divmod(number_of_permutations, block_size)
+        return (block_size,) * full + ((remaining,) if remaining else ())
+
+    @staticmethod
+    def _raise_if_number_of_threads_is_not_strictly_positive(
+            number_of_threads: int
+    ):
+        if number_of_threads <= 0:
+            msg = (
+                f'number_of_threads must be strictly positive, '
+                f'was [{number_of_threads}]'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_runtime_if_no_valid_permutations(valid: int):
+        # unlikely! as `TwoSamplePermutator`
+        if valid == 0:
+            msg = (
+                'unable to generate permutations with non-nan '
+                't-test statistic'
+            )
+            raise RuntimeError(msg)
+
+
+class SharedMemoryOneSidedPermutationTestPValueCalculator(
+    ParallelOneSidedPermutationTestPValueCalculator
+):
+    # As `ParallelOneSidedPermutationTestPValueCalculator`, thus with the
+    # same p-values, but counting the blocks on a pool of processes: the
+    # centered samples are copied once per test in shared memory, which
+    # every process reads through a read-only view, and the processes
+    # return the counts only, thus the memory of the samples does not grow
+    # with the number of processes, nor are the samples pickled
+    # the backends are resolved by name in the processes, thus must be
+    # registered there too (the built-in backends are)
+    # the pool is started on the first test and kept until `close`
+
+    @classmethod
+    def make(
+            cls,
+            *,
+            seed: int,
+            number_of_processes: Optional[int] = None,
+            backend: str = 'auto'
+    ) -> "SharedMemoryOneSidedPermutationTestPValueCalculator":
+        # public constructor!
+        # will raise if `number_of_processes` is not strictly positive, or
+        # as `ParallelOneSidedPermutationTestPValueCalculator`
+        # uses one process per core if `number_of_processes` is None
+        if number_of_processes is not None:
+            cls._raise_if_number_of_processes_is_not_strictly_positive(
+                number_of_processes
+            )
+        return super().make(
+            seed=seed,
+            number_of_threads=number_of_processes,
+            backend=backend
+        )
+
+    def __init__(
+            self,
+            streams: PhiloxStreams,
+            *,
+            simulation: int,
+            number_of_threads: int,
+            backend: IPermutationBackend
+    ):
+        # private!
+        super().__init__(
+            streams,
+            simulation=simulation,
+            number_of_threads=number_of_threads,
+            backend=backend
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def close(self):
+        # stops the pool, started again by the next test if any
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(
+            self
+    ) -> "SharedMemoryOneSidedPermutationTestPValueCalculator":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _count_blocks(
+            self,
+            backend: IPermutationBackend,
+            centered: np.ndarray,
+            size: int,
+            observed: float,
+            blocks: Tuple[Tuple[int, int], ...]
+    ) -> List[Tuple[int, int, int]]:
+        if self._executor is None:
+            # spawned, as forking a process running threads is unsafe!
+            self._executor = ProcessPoolExecutor(
+                self._number_of_threads,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        memory = shared_memory.SharedMemory(
+            create=True,
+            size=max(1, centered.nbytes)
+        )
+        try:
+            np.ndarray(
+                centered.shape,
+                dtype=centered.dtype,
+                buffer=memory.buf
+            )[:] = centered
+            # the processes are not traced, their blocks span as a whole
+            with current_tracer().span(
+                    'blocks',
+                    category='permutation',
+                    blocks=len(blocks),
+                    processes=self._number_of_threads
+            ):
+                futures = [
+                    self._executor.submit(
+                        _count_shared,
+                        memory.name,
+                        centered.size,
+                        size,
+                        observed,
+                        self._streams.seed,
+                        self._simulation,
+                        block,
+                        number_of_permutations,
+                        backend.name
+                    )
+                    for block, number_of_permutations in blocks
+                ]
+                return [future.result() for future in futures]  # raises!
+        finally:
+            memory.close()
+            memory.unlink()
+
+    @staticmethod
+    def _raise_if_number_of_processes_is_not_strictly_positive(
+            number_of_processes: int
+    ):
+        if number_of_processes <= 0:
+            msg = (
+                f'number_of_processes must be strictly positive, '
+                f'was [{number_of_processes}]'
+            )
+            raise ValueError(msg)
+
+
+def _count_shared(
+        name: str,
+        length: int,
+        size: int,
+        observed: float,
+        seed: int,
+        simulation: int,
+        block: int,
+        number_of_permutations: int,
+        backend: str
+) -> Tuple[int, int, int]:
+    # `ParallelOneSidedPermutationTestPValueCalculator._count` in a
+    # process, on the centered samples in the shared memory `name`
+    memory = shared_memory.SharedMemory(name=name)
+    centered = np.ndarray((length,), dtype=np.float64, buffer=memory.buf)
+    centered.flags.writeable = False  # read-only view!
+    try:
+        uniforms = Generator(
+            PhiloxStreams(seed).permutation(simulation, block)
+        ).random((number_of_permutations, size))
+        return resolve_backend(backend).count(
+            centered,
+            size,
+            uniforms,
+            observed
+        )
+    finally:
+        del centered  # releases the buffer before closing!
+        memory.close()
+
+
+class StreamingOneSidedPermutationTestPValueCalculator(
+    IOneSidedPermutationTestPValueCalculator
+):
+    # Calculator of p-value for a one-sided permutation test on two
+    # samples with the unpaired t-test statistic assuming similar
+    # variances, reading the samples chunk by chunk (eg. `MappedVector` of
+    # large files) with O(number_of_permutations) memory besides them
+    # the first sample of every permutation is drawn by selection sampling
+    # (Knuth's algorithm S) in a single pass on both samples, which keeps
+    # the sums of the first sample of every permutation only, thus the
+    # work is O(number_of_permutations * n) instead of
+    # O(number_of_permutations * size of the first sample) in memory
+
+    _UNIFORMS_PER_BLOCK = 2 ** 20  # bounds the memory of a block
+
+    @classmethod
+    def make(
+            cls,
+            generator: BitGenerator,
+            *,
+            chunk_size: int = 2 ** 16
+    ) -> "StreamingOneSidedPermutationTestPValueCalculator":
+        # public constructor!
+        # will raise if `chunk_size` is not strictly positive
+        # `chunk_size` is the number of elements read at once, bounded by
+        # the memory of a block of uniforms
+        cls._raise_if_chunk_size_is_not_strictly_positive(chunk_size)
+        return cls(Generator(generator), chunk_size=chunk_size)
+
+    def __init__(self, generator: Generator, *, chunk_size: int):
+        # private!
+        self._generator = generator
+        self._chunk_size = chunk_size
+
+    @property
+    def chunk_size(self) -> int:
+        # for testing!
+        return self._chunk_size
+
+    def calculate(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> float:
+        # will raise as `OneSidedPermutationTestPValueCalculator.calculate`
+        return self.test(number_of_permutations, samples).p_value
+
+    def test(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> PermutationTestResult:
+        # will raise as `calculate`
+        _raise_if_number_of_permutations_is_not_strictly_positive(
+            number_of_permutations
+        )
+        _raise_if_any_sample_is_empty(samples)
+        size, total = samples[0].size, samples[0].size + samples[1].size
+        mean = sum(
+            float(np.sum(chunk))
+            for sample in samples
+            for chunk in sample.chunks(self._chunk_size)
+        ) / total
+        selected = np.zeros((number_of_permutations,), dtype=np.int64)
+        sums = np.zeros((2, number_of_permutations), dtype=np.float_)
+        observed = np.zeros((4,), dtype=np.float_)
+        chunk_size = min(
+            self._chunk_size,
+            max(1, self._UNIFORMS_PER_BLOCK // number_of_permutations)
+        )
+        start = 0
+        for index, sample in enumerate(samples):
+            for chunk in sample.chunks(chunk_size):
+                _select_and_sum(
+                    chunk - mean,
+                    self._generator.random((chunk.size, selected.size)),
+                    total - start,
+                    size,
+                    index == 0,
+                    selected,
+                    sums,
+                    observed
+                )
+                start += chunk.size
+        return self._compare(observed, sums, size, total)
+
+    @staticmethod
+    def _compare(
+            observed: np.ndarray,
+            sums: np.ndarray,
+            size: int,
+            total: int
+    ) -> PermutationTestResult:
+        # `observed` holds the sum and sum of squares of the first sample,
+        # then of both samples
+        statistic = t_statistic_from_sums(
+            observed[0],
+            observed[1],
+            observed[2],
+            observed[3],
+            size,
+            total - size
+        )
+        if np.isnan(statistic):
+            msg = (
+                'cannot compute t-test test statistic, unbiased pooled '
+                'variance of provided samples is 0'
+            )
+            raise ValueError(msg)
+        greater, valid = _count_greater_from_sums(
+            sums,
+            observed[2],
+            observed[3],
+            size,
+            total - size,
+            statistic
+        )
+        if valid == 0:  # unlikely!
+            msg = (
+                'unable to generate permutations with non-nan '
+                't-test statistic'
+            )
+            raise RuntimeError(msg)
+        return PermutationTestResult(
+            statistic,
+            greater / valid,
+            int(greater),
+            int(valid)
+        )
+
+    @staticmethod
+    def _raise_if_chunk_size_is_not_strictly_positive(chunk_size: int):
+        if chunk_size <= 0:
+            msg = f'chunk_size must be strictly positive, was [{chunk_size}]'
+            raise ValueError(msg)
+
+
+@njit(cache=True, nogil=True)
+def _select_and_sum(
+        centered: np.ndarray,
+        uniforms: np.ndarray,
+        remaining: int,
+        size: int,
+        is_first: bool,
+        selected: np.ndarray,
+        sums: np.ndarray,
+        observed: np.ndarray
+):
+    # selects each element of `centered` in the first sample of the p-th
+    # permutation with probability (size - selected[p]) / remaining, and
+    # adds it to its sums, where `remaining` is the number of elements not
+    # visited yet, and to the observed sums (of the first sample if
+    # `is_first`)
+    for i in range(centered.size):
+        x = centered[i]
+        observed[2] += x
+        observed[3] += x * x
+        if is_first:
+            observed[0] += x
+            observed[1] += x * x
+        for p in range(selected.size):
+            if uniforms[i, p] * (remaining - i) < size - selected[p]:
+                selected[p] += 1
+                sums[0, p] += x
+                sums[1, p] += x * x
+
+
+@njit(cache=True, nogil=True)
+def _count_greater_from_sums(
+        sums: np.ndarray,
+        total: float,
+        total_of_squares: float,
+        size_a: int,
+        size_b: int,
+        observed: float
+) -> Tuple[int, int]:
+    greater = 0
+    valid = 0
+    for p in range(sums.shape[1]):
+        statistic = t_statistic_from_sums(
+            sums[0, p],
+            sums[1, p],
+            total,
+            total_of_squares,
+            size_a,
+            size_b
+        )
+        if not np.isnan(statistic):
+            valid += 1
+            if statistic > observed:
+                greater += 1
+    return greater, valid
 
 
 class ITwoSamplePermutator:
@@ -80,6 +1001,8 @@ class TwoSamplePermutator(ITwoSamplePermutator):
     # Performs the permutations required by a permutation test
     # on two samples
 
+    _ELEMENTS_PER_BATCH = 2 ** 18  # bounds the memory of a batch
+
     def __init__(
             self,
             calculator: ITwoSampleTTestStatisticCalculator,
@@ -108,7 +1031,7 @@ class TwoSamplePermutator(ITwoSamplePermutator):
         # (ie. the test denominator is zero or any sample is empty),
         # or if it is impossible to compute the test statistic for all
         # permutations (unlikely)
-        self._raise_if_number_of_permutations_is_not_strictly_positive(
+        _raise_if_number_of_permutations_is_not_strictly_positive(
             number_of_permutations
         )
         observed = self._calculator.calculate(samples)
@@ -121,42 +1044,526 @@ class TwoSamplePermutator(ITwoSamplePermutator):
             number_of_permutations: int,
             samples: Tuple[Vector, Vector]
     ) -> Vector:
-        concatenated = Vector.concatenate(samples)
-        permuted = np.empty((number_of_permutations,), dtype=np.float_)
-        for i in range(permuted.size):
-            permuted[i] = self._try_to_calculate_permuted_statistic(
-                concatenated,
-                samples[0].size
-            )
+        permuted = _permute_statistics(
+            (self._calculator,),
+            self._permutator,
+            number_of_permutations,
+            samples,
+            self._ELEMENTS_PER_BATCH
+        )[0]
         return Vector(permuted[~np.isnan(permuted)])
 
-    def _try_to_calculate_permuted_statistic(
+    @staticmethod
+    def _raise_runtime_if_permuted_is_empty(permuted: Vector):
+        # unlikely! should we do something else? would verify in practice
+        if permuted.is_empty():
+            msg = (
+                'unable to generate permutations with non-nan '
+                't-test statistic'
+            )
+            raise RuntimeError(msg)
+
+
+class MultipleStatisticsTwoSamplePermutator:
+    # Performs the permutations required by the permutation tests of
+    # several statistics on two samples, computing every statistic on the
+    # same permutations, thus drawing them once and pairing the tests
+    # the permutations are those of `TwoSamplePermutator` with the same
+    # permutator, thus the statistics of a calculator are those of its
+    # own `TwoSamplePermutator`
+
+    _ELEMENTS_PER_BATCH = TwoSamplePermutator._ELEMENTS_PER_BATCH
+
+    def __init__(
             self,
-            concatenated: Vector,
-            size: int
-    ) -> float:
-        # returns nan if statistic cannot be computed as in R
-        shuffled = self._permutator.permute(concatenated)
-        try:
-            permuted = self._calculator.calculate(shuffled.split(size))
-        except ValueError:
-            permuted = np.nan
-        return permuted
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator],
+            permutator: IRandomPermutator
+    ):
+        # will raise if `calculators` is empty
+        self._raise_if_calculators_are_empty(calculators)
+        self._calculators = tuple(calculators)
+        self._permutator = permutator
+
+    @property
+    def calculators(self) -> Tuple[ITwoSampleTTestStatisticCalculator, ...]:
+        # for testing!
+        return self._calculators
+
+    @property
+    def permutator(self) -> IRandomPermutator:
+        # for testing!
+        return self._permutator
+
+    def permute(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # will raise as `TwoSamplePermutator.permute` for any statistic
+        # returns the observed statistics, and the statistics of the
+        # permutations in the rows (nan if it cannot be computed), in the
+        # order of the calculators
+        _raise_if_number_of_permutations_is_not_strictly_positive(
+            number_of_permutations
+        )
+        observed = np.array(
+            [calculator.calculate(samples) for calculator in self._calculators]
+        )
+        permuted = _permute_statistics(
+            self._calculators,
+            self._permutator,
+            number_of_permutations,
+            samples,
+            self._ELEMENTS_PER_BATCH
+        )
+        return observed, permuted
 
     @staticmethod
-    def _raise_if_number_of_permutations_is_not_strictly_positive(
-            number_of_permutations: int
+    def _raise_if_calculators_are_empty(
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator]
     ):
-        if number_of_permutations <= 0:
-            msg = 'number of permutations must be strictly positive'
+        if len(calculators) == 0:
+            msg = 'calculators must be non-empty'
             raise ValueError(msg)
 
-    @staticmethod
-    def _raise_runtime_if_permuted_is_empty(permuted: Vector):
-        # unlikely! should we do something else? would verify in practice
-        if permuted.is_empty():
+
+class MultipleStatisticsPermutationTestPValueCalculator:
+    # Calculator of the p-values of the one-sided permutation tests of
+    # several statistics on two samples, on the same permutations (see
+    # `MultipleStatisticsTwoSamplePermutator`)
+
+    @classmethod
+    def make(
+            cls,
+            calculators: Sequence[ITwoSampleTTestStatisticCalculator],
+            permutator: IRandomPermutator
+    ) -> "MultipleStatisticsPermutationTestPValueCalculator":
+        # public constructor!
+        # will raise as `MultipleStatisticsTwoSamplePermutator`
+        return cls(
+            MultipleStatisticsTwoSamplePermutator(calculators, permutator)
+        )
+
+    def __init__(self, permutator: MultipleStatisticsTwoSamplePermutator):
+        # private!
+        self._permutator = permutator
+
+    @property
+    def permutator(self) -> MultipleStatisticsTwoSamplePermutator:
+        # for testing!
+        return self._permutator
+
+    def calculate(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> Tuple[float, ...]:
+        # will raise as `test`
+        return tuple(
+            result.p_value
+            for result in self.test(number_of_permutations, samples)
+        )
+
+    def test(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> Tuple[PermutationTestResult, ...]:
+        # will raise as `OneSidedPermutationTestPValueCalculator.calculate`
+        # for any statistic
+        # the result of every statistic, in the order of the calculators,
+        # counts its own computable permutations
+        observed, permuted = self._permutator.permute(
+            number_of_permutations,
+            samples
+        )
+        results = []
+        for statistic, statistics in zip(observed, permuted):
+            valid = int(np.count_nonzero(~np.isnan(statistics)))
+            _raise_runtime_if_no_valid_permutations(valid)
+            greater = int(np.count_nonzero(statistics > statistic))
+            results.append(PermutationTestResult(
+                float(statistic),
+                greater / valid,
+                greater,
+                valid
+            ))
+        return tuple(results)
+
+
+class SwapChainTwoSamplePermutator(ITwoSamplePermutator):
+    # Performs the permutations required by a permutation test on two
+    # samples with the unpaired t-test statistic assuming similar
+    # variances, by a Markov chain on the assignments of the observations
+    # to the samples instead of independent shuffles
+    # each step swaps a random observation of the first sample with a
+    # random observation of the second, thus the sums of the first sample,
+    # and the statistic, are updated in O(1) instead of O(n)
+    # the chain starts from the observed assignment, its first `burn_in`
+    # steps are discarded, and a permutation is kept every `thinning`
+    # steps, thus the kept permutations are correlated unless `thinning`
+    # is large enough and the p-value is noisier than with independent
+    # shuffles for the same number of permutations, see
+    # benchmarks/swap_chain.py
+    # the difference in sums of the samples is an eigenfunction of the
+    # chain (a Bernoulli-Laplace diffusion) of eigenvalue
+    # 1 - (n1 + n2) / (n1 n2), thus the correlation of the statistics kept
+    # every t steps is about that eigenvalue to the t
+
+    _STEPS_PER_BLOCK = 2 ** 18  # bounds the memory of a block
+    _CORRELATION = 0.1  # of the kept statistics by default
+
+    def __init__(
+            self,
+            generator: BitGenerator,
+            *,
+            burn_in: Optional[int] = None,
+            thinning: Optional[int] = None
+    ):
+        # will raise if `burn_in` is negative,
+        # or if `thinning` is not strictly positive
+        # the burn-in is the size of both samples if None, and the
+        # thinning the smallest number of steps after which the kept
+        # statistics are correlated by at most 0.1 if None (about
+        # 2.3 n1 n2 / (n1 + n2) steps, see above), which keeps the variance
+        # of the p-values within about 1.22 times that of independent
+        # shuffles
+        self._raise_if_burn_in_is_negative(burn_in)
+        self._raise_if_thinning_is_not_strictly_positive(thinning)
+        self._generator: Generator = Generator(generator)
+        self._burn_in = burn_in
+        self._thinning = thinning
+
+    @property
+    def burn_in(self) -> Optional[int]:
+        # for testing!
+        return self._burn_in
+
+    @property
+    def thinning(self) -> Optional[int]:
+        # for testing!
+        return self._thinning
+
+    def permute(
+            self,
+            number_of_permutations: int,
+            samples: Tuple[Vector, Vector]
+    ) -> Tuple[float, Vector]:
+        # will raise as `TwoSamplePermutator.permute`
+        _raise_if_number_of_permutations_is_not_strictly_positive(
+            number_of_permutations
+        )
+        _raise_if_any_sample_is_empty(samples)
+        size = samples[0].size
+        permuted = _center(samples)
+        observed = _calculate_observed(permuted, size)
+        burn_in = permuted.size if self._burn_in is None else self._burn_in
+        thinning = (
+            self._default_thinning(size, permuted.size - size)
+            if self._thinning is None else self._thinning
+        )
+        # a chain without a recorded step is a burn-in
+        self._walk(permuted, size, burn_in, burn_in + 1)
+        statistics = np.concatenate([
+            self._walk(permuted, size, steps, thinning)
+            for steps in self._split_in_blocks(
+                number_of_permutations,
+                thinning
+            )
+        ])
+        statistics = statistics[~np.isnan(statistics)]
+        if statistics.size == 0:
             msg = (
                 'unable to generate permutations with non-nan '
                 't-test statistic'
             )
             raise RuntimeError(msg)
+        return observed, Vector(statistics)
+
+    def _walk(
+            self,
+            permuted: np.ndarray,
+            size: int,
+            steps: int,
+            thinning: int
+    ) -> np.ndarray:
+        # advances the chain in place by `steps` steps, and returns the
+        # statistics every `thinning` steps
+        first = self._generator.integers(0, size, steps)
+        second = self._generator.integers(size, permuted.size, steps)
+        statistics = np.empty((steps // thinning,), dtype=np.float_)
+        _walk_swap_chain(permuted, size, first, second, thinning, statistics)
+        return statistics
+
+    @classmethod
+    def _default_thinning(cls, size: int, other: int) -> int:
+        # the chain of a single observation per sample alternates between
+        # the two assignments, which needs no thinning
+        eigenvalue = abs(1. - (size + other) / (size * other))
+        if not cls._CORRELATION < eigenvalue < 1.:
+            return 1
+        return ceil(log(cls._CORRELATION) / log(eigenvalue))
+
+    @classmethod
+    def _split_in_blocks(
+            cls,
+            number_of_permutations: int,
+            thinning: int
+    ) -> Tuple[int, ...]:
+        # the number of steps of the blocks, multiples of the thinning
+        per_block = max(1, cls._STEPS_PER_BLOCK // thinning)
+        full, remaining = divmod(number_of_permutations, per_block)
+        return (
+                (per_block * thinning,) * full
+                + ((remaining * thinning,) if remaining else ())
+        )
+
+    @staticmethod
+    def _raise_if_burn_in_is_negative(burn_in: Optional[int]):
+        if burn_in is not None and burn_in < 0:
+            msg = f'burn_in must be non-negative, was [{burn_in}]'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_thinning_is_not_strictly_positive(
+            thinning: Optional[int]
+    ):
+        if thinning is not None and thinning <= 0:
+            msg = f'thinning must be strictly positive, was [{thinning}]'
+            raise ValueError(msg)
+
+
+@njit(cache=True, nogil=True)
+def _walk_swap_chain(
+        permuted: np.ndarray,
+        size: int,
+        first: np.ndarray,
+        second: np.ndarray,
+        thinning: int,
+        statistics: np.ndarray
+):
+    # swaps the `first[k]`-th and `second[k]`-th observations of
+    # `permuted` at the k-th step, where the first `size` observations are
+    # the first sample, and records the statistic every `thinning` steps
+    # the sums are recomputed on every call to bound the rounding errors
+    total = np.sum(permuted)
+    total_of_squares = np.sum(permuted * permuted)
+    sum_a = np.sum(permuted[:size])
+    sum_of_squares_a = np.sum(permuted[:size] * permuted[:size])
+    for k in range(first.size):
+        i, j = first[k], second[k]
+        x, y = permuted[i], permuted[j]
+        permuted[i], permuted[j] = y, x
+        sum_a += y - x
+        sum_of_squares_a += y * y - x * x
+        if (k + 1) % thinning == 0:
+            statistics[(k + 1) // thinning - 1] = t_statistic_from_sums(
+                sum_a,
+                sum_of_squares_a,
+                total,
+                total_of_squares,
+                size,
+                permuted.size - size
+            )
+
+
+def rejection_probabilities(
+        greater: np.ndarray,
+        number_of_permutations: Union[int, np.ndarray],
+        alpha: float,
+        *,
+        grid_size: int = 200,
+        iterations: int = 500
+) -> np.ndarray:
+    # the probability that the p-value of every test on all the
+    # permutations is below `alpha` given `greater` of its
+    # `number_of_permutations` drawn permutations exceeding its observed
+    # statistic, under the distribution of the p-values of the tests
+    # estimated from all the counts (ie. an empirical Bayes prior, the
+    # maximum likelihood distribution on a grid of `grid_size` p-values
+    # refined below `alpha`, fitted by `iterations` EM steps)
+    # `number_of_permutations` is shared by the tests, or given per test
+    # (eg. the permutations whose statistic could be computed)
+    # will raise if any number of permutations is not strictly positive,
+    # if `alpha` is not in [0, 1],
+    # or if any element of `greater` is not in [0, number_of_permutations]
+    greater = np.asarray(greater).astype(np.intp)
+    trials = np.asarray(number_of_permutations).astype(np.intp)
+    if trials.size > 0:
+        _raise_if_number_of_permutations_is_not_strictly_positive(
+            int(np.min(trials))
+        )
+    if not 0. <= alpha <= 1.:
+        msg = f'alpha must be in [0, 1], was [{alpha}]'
+        raise ValueError(msg)
+    trials = np.broadcast_to(trials, greater.shape)
+    if np.any((greater < 0) | (greater > trials)):
+        msg = (
+            f'greater must be in [0, {number_of_permutations}], '
+            f'was [{greater}]'
+        )
+        raise ValueError(msg)
+    if greater.size == 0:
+        return np.empty(greater.shape)
+    grid = np.unique(np.concatenate((
+        np.linspace(0., 1., grid_size + 1),
+        np.linspace(0., alpha, grid_size // 4 + 1)
+    )))
+    # the distinct pairs of counts share their likelihoods
+    pairs, inverse, counts = np.unique(
+        np.stack((greater.ravel(), trials.ravel()), axis=1),
+        axis=0,
+        return_inverse=True,
+        return_counts=True
+    )
+    likelihoods = _binomial_probabilities(pairs[:, 0], pairs[:, 1], grid)
+    weights = np.full(grid.shape, 1. / grid.size)
+    for _ in range(iterations):
+        posteriors = likelihoods * weights
+        posteriors /= np.sum(posteriors, axis=1, keepdims=True)
+        weights = counts @ posteriors / greater.size
+    posteriors = likelihoods * weights
+    probabilities = (
+        np.sum(posteriors[:, grid < alpha], axis=1)
+        / np.sum(posteriors, axis=1)
+    )
+    return probabilities[inverse.ravel()].reshape(greater.shape)
+
+
+def _binomial_probabilities(
+        successes: np.ndarray,
+        trials: np.ndarray,
+        probabilities: np.ndarray
+) -> np.ndarray:
+    # the probability of every number of `successes` in its number of
+    # `trials` (rows) for every probability in `probabilities` (columns)
+    log_factorials = np.concatenate(
+        ([0.], np.cumsum(np.log(np.arange(1, np.max(trials) + 1))))
+    )
+    k = successes[:, np.newaxis]
+    trials = trials[:, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_p = np.log(probabilities)[np.newaxis, :]
+        log_q = np.log1p(-probabilities)[np.newaxis, :]
+        # 0 * log(0) is 0 at the ends of the grid!
+        terms = (
+            np.where(k > 0, k * log_p, 0.)
+            + np.where(trials - k > 0, (trials - k) * log_q, 0.)
+        )
+    return np.exp(
+        log_factorials[trials]
+        - log_factorials[k]
+        - log_factorials[trials - k]
+        + terms
+    )
+
+
+def _permute_statistics(
+        calculators: Sequence[ITwoSampleTTestStatisticCalculator],
+        permutator: IRandomPermutator,
+        number_of_permutations: int,
+        samples: Tuple[Vector, Vector],
+        elements_per_batch: int
+) -> np.ndarray:
+    # the statistics of every calculator (in the rows) on the same
+    # permutations, nan if they cannot be computed
+    # the permutations are drawn on the indices of the data, which draws
+    # the same permutations as on the data itself, in compact batches
+    # (see `IRandomPermutator.permute_batch`), and their statistics are
+    # calculated by batch
+    concatenated = Vector.concatenate(samples)
+    batch_size = max(1, elements_per_batch // max(1, concatenated.size))
+    permuted = np.empty(
+        (len(calculators), number_of_permutations),
+        dtype=np.float_
+    )
+    for start in range(0, number_of_permutations, batch_size):
+        assignments = permutator.permute_batch(
+            concatenated.size,
+            min(batch_size, number_of_permutations - start)
+        )
+        for row, calculator in zip(permuted, calculators):
+            row[start:start + assignments.shape[0]] = (
+                calculator.calculate_batch(
+                    concatenated,
+                    samples[0].size,
+                    assignments
+                )
+            )
+    return permuted
+
+
+def _raise_runtime_if_no_valid_permutations(valid: int):
+    # unlikely! as `TwoSamplePermutator`
+    if valid == 0:
+        msg = 'unable to generate permutations with non-nan test statistic'
+        raise RuntimeError(msg)
+
+
+def alternatives_from_tails(
+        statistic: float,
+        greater: float,
+        less: float,
+        permutations: int
+) -> AlternativesTestResult:
+    # the result of the p-values of the upper and the lower tails
+    return AlternativesTestResult(
+        statistic,
+        greater,
+        less,
+        min(1., 2. * min(greater, less)),
+        permutations
+    )
+
+
+def _center(samples: Tuple[Vector, Vector]) -> np.ndarray:
+    # the concatenated samples minus their mean, which conditions better
+    # the statistics computed from sums
+    concatenated = Vector.concatenate(samples).data
+    return concatenated - np.mean(concatenated)
+
+
+def _calculate_observed(
+        centered: np.ndarray,
+        size: int,
+        *,
+        compiled: bool = True
+) -> float:
+    # will raise if the statistic of the first `size` observations of
+    # `centered` against the others cannot be computed
+    # by the Python function of the kernel if not `compiled`, eg. for the
+    # backends free of any compilation
+    statistic = (
+        t_statistic_from_sums if compiled
+        else python_function(t_statistic_from_sums)
+    )
+    a = centered[:size]
+    observed = statistic(
+        np.sum(a),
+        np.sum(a * a),
+        np.sum(centered),
+        np.sum(centered * centered),
+        size,
+        centered.size - size
+    )
+    if np.isnan(observed):
+        msg = (
+            'cannot compute t-test test statistic, unbiased pooled '
+            'variance of provided samples is 0'
+        )
+        raise ValueError(msg)
+    return observed
+
+
+def _raise_if_any_sample_is_empty(samples: Tuple[Vector, Vector]):
+    if any(sample.is_empty() for sample in samples):
+        msg = 'sample must be non-empty'
+        raise ValueError(msg)
+
+
+def _raise_if_number_of_permutations_is_not_strictly_positive(
+        number_of_permutations: int
+):
+    if number_of_permutations <= 0:
+        msg = 'number of permutations must be strictly positive'
+        raise ValueError(msg)
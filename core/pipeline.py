@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+import time
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+
+class PipelineUtilization(NamedTuple):
+    # Fraction of the wall time the workers of each stage of a pipeline
+    # were busy (ie. not waiting on the queue), the stage with the larger
+    # utilization being the bottleneck
+    generation: float
+    testing: float
+    wall_time: float
+
+
+class SimulationPipeline:
+    # Overlaps two stages of work on a range of indices: generator
+    # workers produce the items of batches of indices and put them in a
+    # bounded queue, from which tester workers consume them
+    # the bounded queue blocks the generators when the testers fall
+    # behind, thus at most `capacity` batches are pending at any time
+
+    _POLL_INTERVAL = 0.05  # seconds, to notice the failure of a worker
+
+    def __init__(
+            self,
+            *,
+            number_of_generators: int,
+            number_of_testers: int,
+            batch_size: int = 16,
+            capacity: Optional[int] = None
+    ):
+        # will raise if `number_of_generators`, `number_of_testers`,
+        # `batch_size` or `capacity` is not strictly positive
+        # the capacity is two batches per tester if None
+        capacity = 2 * number_of_testers if capacity is None else capacity
+        for name, value in (
+                ('number_of_generators', number_of_generators),
+                ('number_of_testers', number_of_testers),
+                ('batch_size', batch_size),
+                ('capacity', capacity)
+        ):
+            self._raise_if_is_not_strictly_positive(value, name=name)
+        self._number_of_generators = number_of_generators
+        self._number_of_testers = number_of_testers
+        self._batch_size = batch_size
+        self._capacity = capacity
+
+    @property
+    def number_of_generators(self) -> int:
+        return self._number_of_generators
+
+    @property
+    def number_of_testers(self) -> int:
+        return self._number_of_testers
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def run(
+            self,
+            start: int,
+            stop: int,
+            generate: Callable[[int], Any],
+            test: Callable[[int, Any], None]
+    ) -> PipelineUtilization:
+        # calls `test(i, generate(i))` for every i in [start, stop), where
+        # `generate` and `test` are called concurrently from many threads
+        # will raise the first exception raised by `generate` or `test`
+        run = _PipelineRun(
+            range(start, stop, self._batch_size),
+            stop,
+            self._capacity
+        )
+        generators = [
+            Thread(target=self._generate, args=(run, generate))
+            for _ in range(self._number_of_generators)
+        ]
+        testers = [
+            Thread(target=self._test, args=(run, test))
+            for _ in range(self._number_of_testers)
+        ]
+        begin = time.perf_counter()
+        for thread in generators + testers:
+            thread.start()
+        for thread in generators:
+            thread.join()
+        for _ in testers:  # one end marker per tester
+            self._put(run, None)
+        for thread in testers:
+            thread.join()
+        wall_time = time.perf_counter() - begin
+        if run.error is not None:
+            raise run.error
+        return PipelineUtilization(
+            self._utilization(
+                run.busy[0],
+                wall_time,
+                self._number_of_generators
+            ),
+            self._utilization(
+                run.busy[1],
+                wall_time,
+                self._number_of_testers
+            ),
+            wall_time
+        )
+
+    def _generate(
+            self,
+            run: "_PipelineRun",
+            generate: Callable[[int], Any]
+    ):
+        try:
+            while not run.failed.is_set():
+                begin = run.next_batch()
+                if begin is None:
+                    return
+                stop = min(begin + self._batch_size, run.stop)
+                started = time.perf_counter()
+                items = [generate(i) for i in range(begin, stop)]
+                run.add_busy(0, time.perf_counter() - started)
+                self._put(run, (begin, items))
+        except Exception as error:  # forwarded to the caller
+            run.fail(error)
+
+    def _test(self, run: "_PipelineRun", test: Callable[[int, Any], None]):
+        try:
+            while not run.failed.is_set():
+                try:
+                    batch = run.queue.get(timeout=self._POLL_INTERVAL)
+                except Empty:
+                    continue
+                if batch is None:
+                    return
+                begin, items = batch
+                started = time.perf_counter()
+                for offset, item in enumerate(items):
+                    test(begin + offset, item)
+                run.add_busy(1, time.perf_counter() - started)
+        except Exception as error:  # forwarded to the caller
+            run.fail(error)
+
+    def _put(self, run: "_PipelineRun", batch: Optional[Tuple[int, list]]):
+        # blocks while the queue is full, unless a worker failed
+        while not run.failed.is_set():
+            try:
+                run.queue.put(batch, timeout=self._POLL_INTERVAL)
+                return
+            except Full:
+                continue
+
+    @staticmethod
+    def _utilization(
+            busy: float,
+            wall_time: float,
+            number_of_workers: int
+    ) -> float:
+        if wall_time <= 0.:
+            return 0.
+        return min(1., busy / (wall_time * number_of_workers))
+
+    @staticmethod
+    def _raise_if_is_not_strictly_positive(value: int, *, name: str):
+        if value <= 0:
+            msg = f'{name} must be strictly positive, was [{value}]'
+            raise ValueError(msg)
+
+
+class _PipelineRun:
+    # State shared by the workers of a single run of a pipeline
+
+    def __init__(
+            self,
+            batches: range,
+            stop: int,
+            capacity: int
+    ):
+        self._batches = iter(batches)
+        self._lock = Lock()
+        self.stop = stop
+        self.queue: Queue = Queue(maxsize=capacity)
+        self.failed = Event()
+        self.error: Optional[BaseException] = None
+        self.busy: List[float] = [0., 0.]
+
+    def next_batch(self) -> Optional[int]:
+        with self._lock:
+            return next(self._batches, None)
+
+    def add_busy(self, stage: int, seconds: float):
+        with self._lock:
+            self.busy[stage] += seconds
+
+    def fail(self, error: BaseException):
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self.failed.set()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import platform
+from typing import NamedTuple, Optional
+
+from .backend import BackendPolicy
+
+PROFILE_ENVIRONMENT_VARIABLE = 'PTSP_PROFILE'
+
+
+class TuningProfile(NamedTuple):
+    # Fastest configuration of the simulator on a machine, see
+    # core/autotune.py: the number of threads, the backend of the
+    # permutation tests (None for the sequential simulator), the number of
+    # simulations per chunk of `simulate_async`, and the thresholds of the
+    # automatic selection of a backend
+    # the backend is informative only, `make` never selects the engine
+    # from a profile as the engines draw different permutations
+    number_of_threads: int
+    backend: Optional[str]
+    chunk_size: int
+    policy: BackendPolicy
+    machine: str
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TuningProfile":
+        # will raise if `data` is not a profile
+        try:
+            profile = cls(
+                int(data['number_of_threads']),
+                None if data['backend'] is None else str(data['backend']),
+                int(data['chunk_size']),
+                BackendPolicy(
+                    int(data['small_work']),
+                    int(data['large_work'])
+                ),
+                str(data['machine'])
+            )
+        except (KeyError, TypeError, ValueError) as error:
+            msg = f'data must be a profile, was [{data}]'
+            raise ValueError(msg) from error
+        _raise_if_is_not_strictly_positive(
+            profile.number_of_threads,
+            name='number_of_threads'
+        )
+        _raise_if_is_not_strictly_positive(
+            profile.chunk_size,
+            name='chunk_size'
+        )
+        return profile
+
+    def to_dict(self) -> dict:
+        return {
+            'number_of_threads': self.number_of_threads,
+            'backend': self.backend,
+            'chunk_size': self.chunk_size,
+            'small_work': self.policy.small_work,
+            'large_work': self.policy.large_work,
+            'machine': self.machine
+        }
+
+
+def current_machine() -> str:
+    # identifies the machine a profile was tuned on, thus a profile in a
+    # home directory shared by many machines is used only on its own
+    return '/'.join((
+        platform.node(),
+        platform.machine(),
+        platform.processor(),
+        str(os.cpu_count() or 1)
+    ))
+
+
+def profile_path() -> str:
+    # the path in the environment variable PTSP_PROFILE if set, otherwise
+    # ~/.config/ptsp/profile.json
+    return os.environ.get(PROFILE_ENVIRONMENT_VARIABLE) or os.path.join(
+        os.path.expanduser('~'),
+        '.config',
+        'ptsp',
+        'profile.json'
+    )
+
+
+def load_profile(path: Optional[str] = None) -> Optional[TuningProfile]:
+    # the profile at `path` (`profile_path()` if None), None if there is
+    # none or if it was tuned on another machine
+    # will raise if the file at `path` is not a profile
+    path = profile_path() if path is None else path
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError as error:
+            msg = f'file must be a JSON profile, was [{path}]'
+            raise ValueError(msg) from error
+    if not isinstance(data, dict):
+        msg = f'file must be a JSON profile, was [{path}]'
+        raise ValueError(msg)
+    profile = TuningProfile.from_dict(data)
+    if profile.machine != current_machine():
+        return None
+    return profile
+
+
+def save_profile(profile: TuningProfile, path: Optional[str] = None) -> str:
+    # writes `profile` at `path` (`profile_path()` if None), creating its
+    # directory if needed, and returns the path
+    path = profile_path() if path is None else path
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(profile.to_dict(), file, indent=2)
+    os.replace(temporary, path)  # never a partial profile!
+    return path
+
+
+def _raise_if_is_not_strictly_positive(value: int, *, name: str):
+    if value <= 0:
+        msg = f'{name} must be strictly positive, was [{value}]'
+        raise ValueError(msg)
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from math import isfinite
+from threading import Lock
+from typing import List, Tuple
 
-from numpy.random import BitGenerator, Generator
+import numpy as np
+from numpy.random import BitGenerator, Generator, Philox
 
+from .jit import njit
 from .vector import Vector
 
 
@@ -34,33 +38,191 @@ class NumpyNormalGenerator(INormalRandomGenerator):
         # will raise if `size` is not strictly positive,
         # if `mean` or `scale` is not finite,
         # or if `scale` is negative
-        self._raise_if_size_is_not_strictly_positive(size)
-        self._raise_if_mean_is_non_finite(mean)
-        self._raise_if_scale_is_negative(scale)
-        self._raise_if_scale_is_non_finite(scale)
-        return Vector(
-            self._generator.normal(loc=mean, scale=scale, size=size)
+        _raise_if_normal_parameters_are_invalid(size, mean, scale)
+        return Vector(self._draw(size, mean, scale))
+
+    def _draw(self, size: int, mean: float, scale: float) -> np.ndarray:
+        return self._generator.normal(loc=mean, scale=scale, size=size)
+
+
+class AntitheticNormalGenerator(NumpyNormalGenerator):
+    # Normal generator negating the standardized draws if `negate`,
+    # two generators on the same stream with opposite `negate` thus draw
+    # an antithetic pair
+
+    def __init__(self, generator: BitGenerator, *, negate: bool):
+        super().__init__(generator)
+        self._negate = negate
+
+    @property
+    def negate(self) -> bool:
+        # for testing!
+        return self._negate
+
+    def _draw(self, size: int, mean: float, scale: float) -> np.ndarray:
+        standardized = self._generator.standard_normal(size=size)
+        if self._negate:
+            standardized = -standardized
+        return mean + scale * standardized
+
+
+class ScrambledHaltonNormalGenerator(INormalRandomGenerator):
+    # Normal generator transforming one point of a randomized
+    # low-discrepancy sequence, successive calls take the successive
+    # dimensions of the point, eg. the first and second samples of a
+    # simulation are the first and last dimensions of its point
+
+    def __init__(self, sequence: "ScrambledHaltonSequence", point: int):
+        self._sequence = sequence
+        self._point = point
+        self._dimension = 0
+
+    @property
+    def sequence(self) -> "ScrambledHaltonSequence":
+        # for testing!
+        return self._sequence
+
+    def generate(
+            self,
+            *,
+            size: int,
+            mean: float,
+            scale: float
+    ) -> Vector:
+        # will raise as `NumpyNormalGenerator.generate`
+        _raise_if_normal_parameters_are_invalid(size, mean, scale)
+        uniforms = self._sequence.point(
+            self._point,
+            range(self._dimension, self._dimension + size)
         )
+        self._dimension += size
+        return Vector(mean + scale * _inverse_normal_cdf(uniforms))
+
+
+class ScrambledHaltonSequence:
+    # Halton sequence randomized by a random permutation of the digits and
+    # a random shift (modulo 1) of each dimension, thus every point is
+    # uniform on the unit hypercube while the points cover it more evenly
+    # than independent ones
+    # the randomization of a dimension is drawn from its own counter-based
+    # stream, thus does not depend on the order of the calls
 
-    @staticmethod
-    def _raise_if_size_is_not_strictly_positive(size: int):
-        if size <= 0:
-            msg = f'size must be strictly positive, was [{size}]'
-            raise ValueError(msg)
+    def __init__(self, seed: int):
+        # will raise if `seed` is negative
+        _raise_if_is_negative(seed, name='seed')
+        self._seed = seed
+        self._lock = Lock()  # may be extended by many threads!
+        self._bases = np.empty((0,), dtype=np.int64)
+        self._permutations: List[np.ndarray] = []
+        self._shifts = np.empty((0,), dtype=np.float_)
 
-    @staticmethod
-    def _raise_if_mean_is_non_finite(mean: float):
-        _raise_if_is_non_finite(mean, name='mean')
+    @property
+    def seed(self) -> int:
+        return self._seed
 
-    @staticmethod
-    def _raise_if_scale_is_negative(scale: float):
-        if scale < 0.:
-            msg = f'scale must be non-negative, was [{scale}]'
-            raise ValueError(msg)
+    def point(self, index: int, dimensions: range) -> np.ndarray:
+        # will raise if `index` is negative
+        _raise_if_is_negative(index, name='index')
+        self._extend(dimensions.stop)
+        return np.array(
+            [self._radical_inverse(index + 1, d) for d in dimensions],
+            dtype=np.float_
+        )  # the first point of the Halton sequence is skipped!
 
-    @staticmethod
-    def _raise_if_scale_is_non_finite(scale: float):
-        _raise_if_is_non_finite(scale, name='scale')
+    def _radical_inverse(self, index: int, dimension: int) -> float:
+        base = int(self._bases[dimension])
+        permutation = self._permutations[dimension]
+        value = 0.
+        factor = 1. / base
+        while index > 0:
+            index, digit = divmod(index, base)
+            value += permutation[digit] * factor
+            factor /= base
+        # the infinitely many leading zeros are permuted too!
+        value += permutation[0] * factor * base / (base - 1)
+        return (value + self._shifts[dimension]) % 1.
+
+    def _extend(self, number_of_dimensions: int):
+        with self._lock:
+            if number_of_dimensions <= len(self._permutations):
+                return
+            bases = _first_primes(number_of_dimensions)
+            shifts = np.empty((bases.size,), dtype=np.float_)
+            shifts[:self._shifts.size] = self._shifts
+            for dimension in range(len(self._permutations), bases.size):
+                generator = Generator(
+                    Philox(key=self._seed, counter=[0, dimension + 1, 0, 0])
+                )
+                self._permutations.append(
+                    generator.permutation(int(bases[dimension]))
+                )
+                shifts[dimension] = generator.random()
+            self._bases, self._shifts = bases, shifts
+
+
+def _first_primes(number: int) -> np.ndarray:
+    limit = 16
+    while True:
+        sieve = np.ones((limit,), dtype=np.bool_)
+        sieve[:2] = False
+        for candidate in range(2, int(limit ** .5) + 1):
+            if sieve[candidate]:
+                sieve[candidate * candidate::candidate] = False
+        primes = np.flatnonzero(sieve)
+        if primes.size >= number:
+            return primes[:number]
+        limit *= 2
+
+
+def _inverse_normal_cdf(uniforms: np.ndarray) -> np.ndarray:
+    # rational approximation of Acklam, relative error below 1.2e-9
+    a = (-3.969683028665376e+01, 2.209460984245205e+02,
+         -2.759285104469687e+02, 1.383577518672690e+02,
+         -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02,
+         -1.556989798598866e+02, 6.680131188771972e+01,
+         -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01,
+         -2.400758277161838e+00, -2.549732539343734e+00,
+         4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01,
+         2.445134137142996e+00, 3.754408661907416e+00)
+    low = 0.02425
+    u = np.clip(uniforms, np.finfo(np.float_).tiny, 1. - 2 ** -53)
+    result = np.empty_like(u)
+    tail = np.minimum(u, 1. - u)
+    is_central = tail >= low
+    q = u[is_central] - .5
+    r = q * q
+    result[is_central] = (
+            (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r
+             + a[5]) * q
+            / (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r
+               + 1.)
+    )
+    q = np.sqrt(-2. * np.log(tail[~is_central]))
+    values = (
+            (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q
+             + c[5])
+            / ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1.)
+    )
+    result[~is_central] = np.where(u[~is_central] < .5, values, -values)
+    return result
+
+
+def _raise_if_normal_parameters_are_invalid(
+        size: int,
+        mean: float,
+        scale: float
+):
+    if size <= 0:
+        msg = f'size must be strictly positive, was [{size}]'
+        raise ValueError(msg)
+    _raise_if_is_non_finite(mean, name='mean')
+    if scale < 0.:
+        msg = f'scale must be non-negative, was [{scale}]'
+        raise ValueError(msg)
+    _raise_if_is_non_finite(scale, name='scale')
 
 
 def _raise_if_is_non_finite(value: float, *, name: str):
@@ -69,11 +231,72 @@ def _raise_if_is_non_finite(value: float, *, name: str):
         raise ValueError(msg)
 
 
+class INormalSampling:
+    # Scheme drawing the samples of each simulation
+
+    def generator(self, simulation: int) -> INormalRandomGenerator:
+        raise NotImplementedError
+
+
+class IndependentNormalSampling(INormalSampling):
+    # Independent pseudo-random draws from the counter-based stream of
+    # each simulation
+
+    def __init__(self, streams: "PhiloxStreams"):
+        self._streams = streams
+
+    def generator(self, simulation: int) -> INormalRandomGenerator:
+        return NumpyNormalGenerator(self._streams.samples(simulation))
+
+
+class AntitheticNormalSampling(INormalSampling):
+    # Antithetic pairs of simulations, ie. simulation 2k + 1 negates the
+    # standardized draws of simulation 2k
+
+    def __init__(self, streams: "PhiloxStreams"):
+        self._streams = streams
+
+    def generator(self, simulation: int) -> INormalRandomGenerator:
+        return AntitheticNormalGenerator(
+            self._streams.samples(simulation // 2),
+            negate=simulation % 2 == 1
+        )
+
+
+class ScrambledHaltonNormalSampling(INormalSampling):
+    # Quasi-Monte Carlo draws, ie. simulation i transforms the i-th point
+    # of a randomized Halton sequence
+
+    def __init__(self, sequence: ScrambledHaltonSequence):
+        self._sequence = sequence
+
+    def generator(self, simulation: int) -> INormalRandomGenerator:
+        return ScrambledHaltonNormalGenerator(self._sequence, simulation)
+
+
 class IRandomPermutator:
 
     def permute(self, vector: Vector) -> Vector:
         raise NotImplementedError
 
+    def permute_batch(
+            self,
+            size: int,
+            number_of_permutations: int
+    ) -> np.ndarray:
+        # the next `number_of_permutations` permutations of the indices of
+        # `size` elements, in the rows of a matrix of the smallest index
+        # data type (see `index_dtype`), ie. the permutations `permute`
+        # would draw, in 2 or 4 bytes per element instead of 8
+        # will raise if `size` is negative or too large for an index type
+        # optional! override if it can be vectorized, defaults to a loop
+        dtype = index_dtype(size)
+        indices = Vector(np.arange(size, dtype=np.float_))
+        batch = np.empty((number_of_permutations, size), dtype=dtype)
+        for row in batch:
+            row[:] = self.permute(indices).data
+        return batch
+
 
 class NumpyRandomPermutator(IRandomPermutator):
 
@@ -84,3 +307,145 @@ class NumpyRandomPermutator(IRandomPermutator):
         return Vector(
             self._generator.permutation(vector.data)
         )
+
+    def permute_batch(
+            self,
+            size: int,
+            number_of_permutations: int
+    ) -> np.ndarray:
+        # will raise as `IRandomPermutator.permute_batch`
+        # the rows are shuffled in order, thus as by successive `permute`
+        return self._generator.permuted(
+            np.tile(
+                np.arange(size, dtype=index_dtype(size)),
+                (number_of_permutations, 1)
+            ),
+            axis=1
+        )
+
+
+class PhiloxRandomPermutator(IRandomPermutator):
+    # Permutator drawing the j-th permutation of a simulation from the
+    # counter-based stream of (simulation, j), thus independently of any
+    # other permutation
+
+    def __init__(self, streams: "PhiloxStreams", simulation: int):
+        self._streams = streams
+        self._simulation = simulation
+        self._permutation = 0
+        self._bit_generator = streams.permutation(simulation, 0)
+        self._generator: Generator = Generator(self._bit_generator)
+
+    @property
+    def streams(self) -> "PhiloxStreams":
+        # for testing!
+        return self._streams
+
+    @property
+    def simulation(self) -> int:
+        # for testing!
+        return self._simulation
+
+    def permute(self, vector: Vector) -> Vector:
+        self._streams.seek_permutation(
+            self._bit_generator,
+            self._simulation,
+            self._permutation
+        )
+        self._permutation += 1
+        return Vector(
+            self._generator.permutation(vector.data)
+        )
+
+
+def index_dtype(size: int) -> np.dtype:
+    # the smallest unsigned integer data type of the indices of `size`
+    # elements
+    # will raise if `size` is negative or above 2 ** 32
+    if size < 0 or size > 2 ** 32:
+        msg = f'size must be in [0, 2 ** 32], was [{size}]'
+        raise ValueError(msg)
+    return np.dtype(np.uint16 if size <= 2 ** 16 else np.uint32)
+
+
+@njit(cache=True, nogil=True)
+def group_sums_from_indices(
+        data: np.ndarray,
+        indices: np.ndarray,
+        group_size: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    # the sum and sum of squares of the first group of every permutation
+    # in the rows of `indices`, ie. of the elements of `data` at its first
+    # `group_size` indices, without materializing the permuted data
+    sums = np.zeros((indices.shape[0],), dtype=np.float64)
+    sums_of_squares = np.zeros((indices.shape[0],), dtype=np.float64)
+    for i in range(indices.shape[0]):
+        for k in range(group_size):
+            value = data[indices[i, k]]
+            sums[i] += value
+            sums_of_squares[i] += value * value
+    return sums, sums_of_squares
+
+
+class PhiloxStreams:
+    # Counter-based (Philox) random streams addressable by
+    # (simulation, permutation) index
+    # the stream of any pair is computed directly from the seed, thus
+    # any subset of the simulations may be computed in any order, on any
+    # thread, process or machine, and give bit-identical results
+    # the counter of a stream is [0, 0, offset, simulation], where the
+    # offset is 0 for the samples and j + 1 for the j-th permutation
+    # (or block of permutations for batched calculators), its first word
+    # is incremented by the draws themselves
+
+    def __init__(self, seed: int):
+        # will raise if `seed` is negative
+        _raise_if_is_negative(seed, name='seed')
+        self._seed = seed
+        self._key = Philox(key=seed).state['state']['key']
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    def samples(self, simulation: int) -> Philox:
+        # will raise if `simulation` is negative
+        _raise_if_is_negative(simulation, name='simulation')
+        return Philox(key=self._seed, counter=[0, 0, 0, simulation])
+
+    def permutation(self, simulation: int, permutation: int) -> Philox:
+        # will raise if `simulation` or `permutation` is negative
+        _raise_if_is_negative(simulation, name='simulation')
+        _raise_if_is_negative(permutation, name='permutation')
+        return Philox(
+            key=self._seed,
+            counter=[0, 0, permutation + 1, simulation]
+        )
+
+    def seek_permutation(
+            self,
+            bit_generator: Philox,
+            simulation: int,
+            permutation: int
+    ):
+        # positions `bit_generator` (made by this object) at the start of
+        # the stream of (simulation, permutation), much cheaper than
+        # making a new bit generator
+        state = bit_generator.state
+        state['state'] = {
+            'counter': np.array(
+                [0, 0, permutation + 1, simulation],
+                dtype=np.uint64
+            ),
+            'key': self._key
+        }
+        state['buffer_pos'] = 4  # empty buffer!
+        state['has_uint32'] = 0
+        state['uinteger'] = 0
+        bit_generator.state = state
+
+
+def _raise_if_is_negative(value: int, *, name: str):
+    if value < 0:
+        msg = f'{name} must be non-negative, was [{value}]'
+        raise ValueError(msg)
@@ -0,0 +1,559 @@
+# -*- coding: utf-8 -*-
+# Splits a power study into shards, ie. ranges of simulation indices under
+# the same seed, done by workers anywhere (the simulations are counter-based
+# thus every shard is deterministic), whose small partial results are
+# merged into the powers of the study
+# a coordinator hands out the shards to workers over TCP (JSON lines, one
+# request per connection) and retries the failed or expired ones only
+#
+#     python -m core.shard coordinator --study study.json --port 5000
+#     python -m core.shard worker --address 127.0.0.1:5000
+
+import argparse
+import json
+import os
+import platform
+import socket
+import socketserver
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import UnpairedOneSidedPermutationTestPowerSimulator
+
+_HISTOGRAM_BINS = 100  # the p-value sketch of a partial result
+
+
+class Study(NamedTuple):
+    # Parameters of the simulations of a power study, and the alphas at
+    # which its powers are estimated
+    seed: int
+    number_of_simulations: int
+    number_of_permutations: int
+    number_of_observations: int
+    means: Tuple[float, float]
+    scale: float
+    alphas: Tuple[float, ...]
+    sampling: str = 'independent'
+    backend: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Study":
+        # will raise if `data` is not a study
+        try:
+            return cls(
+                int(data['seed']),
+                int(data['number_of_simulations']),
+                int(data['number_of_permutations']),
+                int(data['number_of_observations']),
+                (float(data['means'][0]), float(data['means'][1])),
+                float(data['scale']),
+                tuple(float(alpha) for alpha in data['alphas']),
+                str(data.get('sampling', 'independent')),
+                None if data.get('backend') is None
+                else str(data['backend'])
+            )
+        except (KeyError, IndexError, TypeError, ValueError) as error:
+            msg = f'data must be a study, was [{data}]'
+            raise ValueError(msg) from error
+
+    def to_dict(self) -> dict:
+        return dict(
+            self._asdict(),
+            means=list(self.means),
+            alphas=list(self.alphas)
+        )
+
+
+class Shard(NamedTuple):
+    # The simulations [start, stop) of a study
+    index: int
+    start: int
+    stop: int
+
+
+class PartialResult(NamedTuple):
+    # Outcome of a shard: the number of its simulations rejected at every
+    # alpha of the study, the counts of its p-values in equal bins of
+    # [0, 1], its duration and the worker which did it
+    shard: Shard
+    rejections: Tuple[int, ...]
+    histogram: Tuple[int, ...]
+    seconds: float
+    worker: str
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PartialResult":
+        # will raise if `data` is not a partial result
+        try:
+            return cls(
+                Shard(*(int(value) for value in data['shard'])),
+                tuple(int(count) for count in data['rejections']),
+                tuple(int(count) for count in data['histogram']),
+                float(data['seconds']),
+                str(data['worker'])
+            )
+        except (KeyError, TypeError, ValueError) as error:
+            msg = f'data must be a partial result, was [{data}]'
+            raise ValueError(msg) from error
+
+    def to_dict(self) -> dict:
+        return {
+            'shard': list(self.shard),
+            'rejections': list(self.rejections),
+            'histogram': list(self.histogram),
+            'seconds': self.seconds,
+            'worker': self.worker
+        }
+
+
+class StudyResult(NamedTuple):
+    # Powers of a study at its alphas, the counts of its p-values in equal
+    # bins of [0, 1], and the total time spent by the workers
+    powers: Tuple[float, ...]
+    number_of_simulations: int
+    histogram: Tuple[int, ...]
+    seconds: float
+
+
+def plan_shards(number_of_simulations: int, shard_size: int) -> List[Shard]:
+    # will raise if `number_of_simulations` or `shard_size` is not
+    # strictly positive
+    if number_of_simulations <= 0 or shard_size <= 0:
+        msg = (
+            f'number_of_simulations and shard_size must be strictly '
+            f'positive, were [{number_of_simulations}] and [{shard_size}]'
+        )
+        raise ValueError(msg)
+    return [
+        Shard(
+            index,
+            start,
+            min(start + shard_size, number_of_simulations)
+        )
+        for index, start in enumerate(
+            range(0, number_of_simulations, shard_size)
+        )
+    ]
+
+
+def run_shard(study: Study, shard: Shard) -> PartialResult:
+    # will raise as `UnpairedOneSidedPermutationTestPowerSimulator`
+    # the simulations of `shard` are those of the counter-based simulator
+    # of the study, regardless of the other shards
+    started = time.perf_counter()
+    simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+        seed=study.seed,
+        counter_based=True,
+        number_of_threads=1,
+        sampling=study.sampling,
+        backend=study.backend
+    )
+    p_values = simulator.simulate_range(
+        start=shard.start,
+        stop=shard.stop,
+        number_of_permutations=study.number_of_permutations,
+        number_of_observations=study.number_of_observations,
+        means=study.means,
+        scale=study.scale
+    )
+    return PartialResult(
+        shard,
+        tuple(
+            int(np.count_nonzero(p_values < alpha)) for alpha in study.alphas
+        ),
+        tuple(int(count) for count in np.histogram(
+            p_values,
+            bins=np.linspace(0., 1., _HISTOGRAM_BINS + 1)
+        )[0]),
+        time.perf_counter() - started,
+        _worker_name()
+    )
+
+
+def merge(study: Study, partials: Sequence[PartialResult]) -> StudyResult:
+    # will raise if the shards of `partials` do not cover the simulations
+    # of `study` exactly once
+    covered = sorted(partial.shard[1:] for partial in partials)
+    bounds = [0] + [stop for _, stop in covered]
+    if (
+            not covered
+            or [start for start, _ in covered] != bounds[:-1]
+            or bounds[-1] != study.number_of_simulations
+    ):
+        msg = (
+            f'partials must cover the simulations [0, '
+            f'{study.number_of_simulations}) exactly once, were {covered}'
+        )
+        raise ValueError(msg)
+    rejections = np.sum([partial.rejections for partial in partials], axis=0)
+    histogram = np.sum([partial.histogram for partial in partials], axis=0)
+    return StudyResult(
+        tuple(
+            float(count) / study.number_of_simulations
+            for count in rejections
+        ),
+        study.number_of_simulations,
+        tuple(int(count) for count in histogram),
+        float(sum(partial.seconds for partial in partials))
+    )
+
+
+class ShardQueue:
+    # Shards of a study to hand out to workers: a shard is leased to one
+    # worker at a time, and handed out again if its worker reports a
+    # failure or does not report before the end of the lease, at most
+    # `max_attempts` times in total; a late result of an expired lease is
+    # still accepted if the shard is not done yet
+
+    def __init__(
+            self,
+            shards: Sequence[Shard],
+            *,
+            max_attempts: int = 3,
+            lease: float = 600.,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        # will raise if `max_attempts` or `lease` is not strictly positive
+        if max_attempts <= 0 or lease <= 0.:
+            msg = (
+                f'max_attempts and lease must be strictly positive, were '
+                f'[{max_attempts}] and [{lease}]'
+            )
+            raise ValueError(msg)
+        self._shards = {shard.index: shard for shard in shards}
+        self._max_attempts = max_attempts
+        self._lease = lease
+        self._clock = clock
+        self._pending = [shard.index for shard in shards]
+        self._leases: Dict[int, float] = {}
+        self._attempts = {shard.index: 0 for shard in shards}
+        self._partials: Dict[int, PartialResult] = {}
+        self._errors: Dict[int, List[str]] = {
+            shard.index: [] for shard in shards
+        }
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def partials(self) -> List[PartialResult]:
+        with self._lock:
+            return [self._partials[index] for index in sorted(self._partials)]
+
+    @property
+    def errors(self) -> Dict[int, List[str]]:
+        # the errors reported for every shard
+        with self._lock:
+            return {
+                index: list(errors)
+                for index, errors in self._errors.items() if errors
+            }
+
+    def acquire(self) -> Optional[Shard]:
+        # a shard to do, None if none is available now
+        with self._lock:
+            self._expire()
+            if not self._pending:
+                return None
+            index = self._pending.pop(0)
+            self._attempts[index] += 1
+            self._leases[index] = self._clock() + self._lease
+            return self._shards[index]
+
+    def complete(self, partial: PartialResult):
+        # will raise if the shard of `partial` is unknown
+        with self._changed:
+            index = self._raise_if_is_unknown(partial.shard)
+            if index in self._partials:  # eg. a late duplicate!
+                return
+            self._partials[index] = partial
+            self._leases.pop(index, None)
+            if index in self._pending:
+                self._pending.remove(index)
+            self._changed.notify_all()
+
+    def fail(self, shard: Shard, error: str):
+        # will raise if `shard` is unknown
+        with self._changed:
+            index = self._raise_if_is_unknown(shard)
+            self._errors[index].append(error)
+            if index in self._partials or index not in self._leases:
+                return
+            del self._leases[index]
+            self._release(index)
+            self._changed.notify_all()
+
+    def is_done(self) -> bool:
+        with self._lock:
+            return len(self._partials) == len(self._shards)
+
+    def has_failed(self) -> bool:
+        # whether a shard failed in every attempt
+        with self._lock:
+            self._expire()
+            return self._has_failed()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # waits until every shard is done (True) or a shard failed in every
+        # attempt (False)
+        # will raise `TimeoutError` after `timeout` seconds if not None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while True:
+                self._expire()
+                if len(self._partials) == len(self._shards):
+                    return True
+                if self._has_failed():
+                    return False
+                remaining = 0.1 if deadline is None else min(
+                    0.1,
+                    deadline - time.monotonic()
+                )
+                if remaining <= 0.:
+                    msg = 'shards were not done before the timeout'
+                    raise TimeoutError(msg)
+                self._changed.wait(remaining)
+
+    def _expire(self):
+        now = self._clock()
+        for index, deadline in list(self._leases.items()):
+            if deadline <= now:
+                del self._leases[index]
+                self._errors[index].append('lease expired')
+                self._release(index)
+
+    def _release(self, index: int):
+        # hands out the shard again if it has attempts left
+        if self._attempts[index] < self._max_attempts:
+            self._pending.append(index)
+
+    def _has_failed(self) -> bool:
+        return any(
+            index not in self._partials
+            and index not in self._leases
+            and index not in self._pending
+            for index in self._shards
+        )
+
+    def _raise_if_is_unknown(self, shard: Shard) -> int:
+        if self._shards.get(shard.index) != shard:
+            msg = f'shard must be a shard of the queue, was [{shard}]'
+            raise ValueError(msg)
+        return shard.index
+
+
+class ShardCoordinator:
+    # Serves the shards of a study to workers on a TCP address, and merges
+    # their partial results
+
+    def __init__(
+            self,
+            study: Study,
+            *,
+            shard_size: int,
+            host: str = '127.0.0.1',
+            port: int = 0,
+            max_attempts: int = 3,
+            lease: float = 600.,
+            poll: float = 0.5
+    ):
+        # will raise as `plan_shards` and `ShardQueue`
+        # `port` 0 binds any free port, see `address`
+        # `poll` is the delay after which workers ask again for a shard
+        # if none is available but some are still leased
+        self._study = study
+        self._queue = ShardQueue(
+            plan_shards(study.number_of_simulations, shard_size),
+            max_attempts=max_attempts,
+            lease=lease
+        )
+        self._poll = poll
+        self._server = _ThreadingServer((host, port), _Handler)
+        self._server.coordinator = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @property
+    def queue(self) -> ShardQueue:
+        # for testing!
+        return self._queue
+
+    def start(self) -> "ShardCoordinator":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs=dict(poll_interval=0.05),
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "ShardCoordinator":
+        return self.start()
+
+    def __exit__(self, *_):
+        self.close()
+
+    def result(self, timeout: Optional[float] = None) -> StudyResult:
+        # waits for the shards and merges their partial results
+        # will raise `TimeoutError` as `ShardQueue.wait`, or
+        # `RuntimeError` if a shard failed in every attempt
+        if not self._queue.wait(timeout):
+            msg = f'shards failed in every attempt: {self._queue.errors}'
+            raise RuntimeError(msg)
+        return merge(self._study, self._queue.partials)
+
+    def handle(self, request: dict) -> dict:
+        # the reply to a request of a worker
+        kind = request.get('request')
+        if kind == 'shard':
+            if self._queue.is_done() or self._queue.has_failed():
+                return {'done': True}
+            shard = self._queue.acquire()
+            if shard is None:
+                return {'wait': self._poll}
+            return {'study': self._study.to_dict(), 'shard': list(shard)}
+        if kind == 'result':
+            self._queue.complete(PartialResult.from_dict(request['partial']))
+            return {'ok': True}
+        if kind == 'failure':
+            self._queue.fail(
+                Shard(*(int(value) for value in request['shard'])),
+                str(request['error'])
+            )
+            return {'ok': True}
+        return {'error': f'unknown request [{kind}]'}
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    coordinator: ShardCoordinator
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            reply = self.server.coordinator.handle(request)
+        except (ValueError, KeyError, TypeError) as error:
+            reply = {'error': str(error)}
+        self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+
+def run_worker(
+        address: Tuple[str, int],
+        *,
+        run: Callable[[Study, Shard], PartialResult] = run_shard,
+        timeout: float = 60.
+) -> int:
+    # does the shards handed out by the coordinator at `address` until
+    # there is none left, reporting the failures of `run`, and returns the
+    # number of shards done
+    # will raise `OSError` if the coordinator cannot be reached at first,
+    # afterwards a coordinator gone is done (eg. it merged the results)
+    done = 0
+    reached = False
+    while True:
+        try:
+            reply = _request(address, {'request': 'shard'}, timeout)
+        except OSError:
+            if not reached:
+                raise
+            return done
+        reached = True
+        if reply.get('done'):
+            return done
+        if 'wait' in reply:
+            time.sleep(float(reply['wait']))
+            continue
+        study = Study.from_dict(reply['study'])
+        shard = Shard(*(int(value) for value in reply['shard']))
+        try:
+            partial = run(study, shard)
+        except Exception as error:  # reported, then retried elsewhere!
+            _request(
+                address,
+                {
+                    'request': 'failure',
+                    'shard': list(shard),
+                    'error': f'{type(error).__name__}: {error}'
+                },
+                timeout
+            )
+            continue
+        _request(
+            address,
+            {'request': 'result', 'partial': partial.to_dict()},
+            timeout
+        )
+        done += 1
+
+
+def _request(address: Tuple[str, int], request: dict, timeout: float) -> dict:
+    with socket.create_connection(address, timeout=timeout) as connection:
+        connection.sendall(json.dumps(request).encode() + b'\n')
+        with connection.makefile('rb') as file:
+            line = file.readline()
+    if not line:
+        msg = f'coordinator closed the connection, at [{address}]'
+        raise OSError(msg)
+    return json.loads(line)
+
+
+def _worker_name() -> str:
+    return f'{platform.node()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def main(arguments: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(
+        description='sharded power studies'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    coordinator = commands.add_parser('coordinator')
+    coordinator.add_argument('--study', required=True)
+    coordinator.add_argument('--shard-size', type=int, default=1000)
+    coordinator.add_argument('--host', default='127.0.0.1')
+    coordinator.add_argument('--port', type=int, default=0)
+    coordinator.add_argument('--max-attempts', type=int, default=3)
+    coordinator.add_argument('--lease', type=float, default=600.)
+    worker = commands.add_parser('worker')
+    worker.add_argument('--address', required=True)
+    parsed = parser.parse_args(arguments)
+    if parsed.command == 'worker':
+        host, port = parsed.address.rsplit(':', 1)
+        print(f'{run_worker((host, int(port)))} shards done')
+        return
+    with open(parsed.study, 'r') as file:
+        study = Study.from_dict(json.load(file))
+    with ShardCoordinator(
+            study,
+            shard_size=parsed.shard_size,
+            host=parsed.host,
+            port=parsed.port,
+            max_attempts=parsed.max_attempts,
+            lease=parsed.lease
+    ) as server:
+        host, port = server.address
+        print(f'serving on {host}:{port}', flush=True)
+        result = server.result()
+    for alpha, power in zip(study.alphas, result.powers):
+        print(f'alpha {alpha:<8g} power {power:.6f}')
+    print(f'{result.number_of_simulations} simulations in '
+          f'{result.seconds:.2f} worker seconds')
+
+
+if __name__ == '__main__':
+    main()
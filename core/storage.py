@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+import os
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+
+class SimulationStore:
+    # Per-simulation p-values, and optionally observed statistics, in a
+    # memory-mapped .npy file, thus neither writing nor reading them
+    # requires them to fit in memory
+    # the file holds an array of floats (the p-values), or of records
+    # with the fields `p_value` and `statistic` if the statistics are
+    # stored, and can also be read by `np.load`
+
+    _DTYPE_WITH_STATISTICS = np.dtype(
+        [('p_value', np.float_), ('statistic', np.float_)]
+    )
+    _CHUNK_SIZE = 2 ** 20  # bounds the memory of reductions
+
+    @classmethod
+    def create(
+            cls,
+            path: str,
+            number_of_simulations: int,
+            *,
+            statistics: bool = False
+    ) -> "SimulationStore":
+        # public constructor!
+        # overwrites `path`! the elements are undefined until written
+        dtype = cls._DTYPE_WITH_STATISTICS if statistics else np.float_
+        return cls(
+            open_memmap(
+                os.fspath(path),
+                mode='w+',
+                dtype=dtype,
+                shape=(number_of_simulations,)
+            )
+        )
+
+    @classmethod
+    def open(cls, path: str) -> "SimulationStore":
+        # public constructor!
+        # will raise if `path` does not hold a store
+        return cls(np.load(os.fspath(path), mmap_mode='r'))
+
+    def __init__(self, data: np.ndarray):
+        # private!
+        self._raise_if_is_not_a_store(data)
+        self._data = data
+
+    @property
+    def size(self) -> int:
+        return self._data.shape[0]
+
+    @property
+    def has_statistics(self) -> bool:
+        return self._data.dtype.names is not None
+
+    @property
+    def p_values(self) -> np.ndarray:
+        # memory-mapped! read lazily
+        return self._data['p_value'] if self.has_statistics else self._data
+
+    @property
+    def statistics(self) -> Optional[np.ndarray]:
+        # memory-mapped! read lazily, None if not stored
+        return self._data['statistic'] if self.has_statistics else None
+
+    def flush(self):
+        if isinstance(self._data, np.memmap):
+            self._data.flush()
+
+    def power(self, alpha: float) -> float:
+        # will raise if `alpha` is not in [0, 1]
+        return self.powers((alpha,))[0]
+
+    def powers(self, alphas: Iterable[float]) -> Tuple[float, ...]:
+        # power at each of `alphas` in a single pass on the file
+        # will raise if any alpha is not in [0, 1]
+        frozen = np.array(tuple(alphas), dtype=np.float_)
+        self._raise_if_any_alpha_is_not_between_zero_and_one(frozen)
+        counts = np.zeros(frozen.shape, dtype=np.int64)
+        for chunk in self._chunks():
+            counts += np.count_nonzero(
+                chunk[:, np.newaxis] < frozen[np.newaxis, :],
+                axis=0
+            )
+        return tuple(counts / self.size)
+
+    def histogram(self, bins: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        # counts of the p-values in `bins` equal bins of [0, 1] and the
+        # edges of the bins, eg. to check the type-I error of the test
+        edges = np.linspace(0., 1., bins + 1)
+        counts = np.zeros((bins,), dtype=np.int64)
+        for chunk in self._chunks():
+            counts += np.histogram(chunk, bins=edges)[0]
+        return counts, edges
+
+    def _chunks(self) -> Iterable[np.ndarray]:
+        p_values = self.p_values
+        for start in range(0, self.size, self._CHUNK_SIZE):
+            yield np.asarray(p_values[start:start + self._CHUNK_SIZE])
+
+    @classmethod
+    def _raise_if_is_not_a_store(cls, data: np.ndarray):
+        if data.ndim != 1 or data.dtype not in (
+                np.dtype(np.float_),
+                cls._DTYPE_WITH_STATISTICS
+        ):
+            msg = (
+                f'data must be a one-dimensional array of p-values or of '
+                f'records of p-values and statistics, was [{data.dtype}] '
+                f'of [{data.ndim}] dimensions'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_any_alpha_is_not_between_zero_and_one(alphas: np.ndarray):
+        if np.any((alphas < 0.) | (alphas > 1.)) or np.any(np.isnan(alphas)):
+            msg = f'alpha must be in [0, 1], was [{alphas.tolist()}]'
+            raise ValueError(msg)
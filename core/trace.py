@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# Opt-in tracing of the runs: the simulator and the permutation engines
+# open spans (per chunk of simulations, per stage of a simulation, per
+# block of permutations, ...) on the current tracer, which records them
+# only while `tracing` is active, and exports them as Chrome trace events,
+# eg. to load a run in chrome://tracing or https://ui.perfetto.dev
+#
+#     tracer = ChromeTracer()
+#     with tracing(tracer):
+#         simulator.simulate(...)
+#     tracer.write('trace.json')
+#
+# the current tracer is global to the process (thus seen by the worker
+# threads), and does nothing by default: a disabled span costs a function
+# call and a shared context manager
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+
+class ITracer:
+
+    @property
+    def is_enabled(self) -> bool:
+        raise NotImplementedError
+
+    def span(
+            self,
+            name: str,
+            *,
+            category: str,
+            **arguments: Any
+    ) -> ContextManager:
+        # records the time spent in the context as a span of the calling
+        # thread, whose `arguments` are shown with it (eg. the indices of a
+        # chunk)
+        raise NotImplementedError
+
+
+class _NullSpan:
+    # shared by every disabled span!
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer(ITracer):
+    # Records nothing, the default tracer
+
+    @property
+    def is_enabled(self) -> bool:
+        return False
+
+    def span(
+            self,
+            name: str,
+            *,
+            category: str,
+            **arguments: Any
+    ) -> ContextManager:
+        return _NULL_SPAN
+
+
+class ChromeTracer(ITracer):
+    # Records the spans of every thread as complete events ('X') of the
+    # Chrome trace event format, timestamped in microseconds from the
+    # creation of the tracer, with the name of every thread (numbered in
+    # order of their first span) as metadata
+    # the categories used by the package are 'simulate' (a whole run),
+    # 'chunk' (a range of simulations of a worker), 'generation' (the
+    # samples of a simulation), 'permutation' (the test of a simulation,
+    # or a block of permutations), 'reduction' (the merge of counts or
+    # p-values), and 'compilation' (a first call of a compiled kernel,
+    # compiling it or loading it from the cache)
+
+    def __init__(self):
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._local = threading.local()  # the tid of every thread
+        self._lock = threading.Lock()
+
+    @property
+    def is_enabled(self) -> bool:
+        return True
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        # the recorded events, then the metadata naming the threads
+        with self._lock:
+            return list(self._events) + [
+                {
+                    'name': 'thread_name',
+                    'ph': 'M',
+                    'pid': self._pid,
+                    'tid': tid,
+                    'args': {'name': name}
+                }
+                for tid, name in self._threads.items()
+            ]
+
+    @contextmanager
+    def span(
+            self,
+            name: str,
+            *,
+            category: str,
+            **arguments: Any
+    ) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            stop = time.perf_counter_ns()
+            self._record(name, category, start, stop, arguments)
+
+    def to_dict(self) -> dict:
+        return {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file)
+
+    def _record(
+            self,
+            name: str,
+            category: str,
+            start: int,
+            stop: int,
+            arguments: Dict[str, Any]
+    ):
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self._origin) / 1e3,
+            'dur': (stop - start) / 1e3,
+            'pid': self._pid,
+            'tid': self._tid()
+        }
+        if arguments:
+            event['args'] = arguments
+        with self._lock:
+            self._events.append(event)
+
+    def _tid(self) -> int:
+        # sequential, as the identifiers of the finished threads are
+        # reused by the next ones
+        tid = getattr(self._local, 'tid', None)
+        if tid is None:
+            with self._lock:
+                tid = self._local.tid = len(self._threads)
+                self._threads[tid] = threading.current_thread().name
+        return tid
+
+
+_NULL_TRACER = NullTracer()
+_current: ITracer = _NULL_TRACER
+
+
+def current_tracer() -> ITracer:
+    return _current
+
+
+@contextmanager
+def tracing(tracer: Optional[ITracer] = None) -> Iterator[ITracer]:
+    # makes `tracer` (a new `ChromeTracer` if None) the current tracer of
+    # the process within the context, and the previous one afterwards
+    global _current
+    tracer = ChromeTracer() if tracer is None else tracer
+    previous, _current = _current, tracer
+    try:
+        yield tracer
+    finally:
+        _current = previous
@@ -3,8 +3,9 @@
 from typing import Tuple
 
 import numpy as np
-from numba import njit
 
+from .jit import njit
+from .random import group_sums_from_indices
 from .variance import IPooledVarianceCalculator
 from .variance import UnbiasedPooledVarianceCalculator
 from .vector import Vector
@@ -12,9 +13,41 @@ from .vector import Vector
 
 class ITwoSampleTTestStatisticCalculator:
 
+    @property
+    def is_increasing_in_first_sum(self) -> bool:
+        # whether the statistic of the permutations of given samples is
+        # increasing in the sum of the first sample, which lets the
+        # permutation distribution be approximated from the moments of
+        # that sum
+        # optional! override if True
+        return False
+
     def calculate(self, samples: Tuple[Vector, Vector]) -> float:
         raise NotImplementedError
 
+    def calculate_batch(
+            self,
+            concatenated: Vector,
+            size: int,
+            assignments: np.ndarray
+    ) -> np.ndarray:
+        # statistics of the permutations of `concatenated` in the rows of
+        # the two-dimensional `assignments`, ie. the first sample of the
+        # i-th permutation is `concatenated.data[assignments[i, :size]]`
+        # and the second is `concatenated.data[assignments[i, size:]]`
+        # returns nan for the permutations whose statistic cannot be
+        # computed, as in R
+        # optional! override if it can be vectorized, defaults to a loop
+        statistics = np.empty((assignments.shape[0],), dtype=np.float_)
+        for i, assignment in enumerate(assignments):
+            try:
+                statistics[i] = self.calculate(
+                    Vector(concatenated.data[assignment]).split(size)
+                )
+            except ValueError:
+                statistics[i] = np.nan
+        return statistics
+
 
 class UnpairedSimilarVarTTestStatisticCalculator(
     ITwoSampleTTestStatisticCalculator
@@ -38,6 +71,11 @@ class UnpairedSimilarVarTTestStatisticCalculator(
         # for testing!
         return self._calculator
 
+    @property
+    def is_increasing_in_first_sum(self) -> bool:
+        # the pooled variance decreases as the difference in means grows
+        return True
+
     def calculate(self, samples: Tuple[Vector, Vector]) -> float:
         # will raise if any sample in `samples` is empty,
         # or if the unbiased pooled variance of the two samples
@@ -47,6 +85,43 @@ class UnpairedSimilarVarTTestStatisticCalculator(
         a, b = samples
         return self._calculate(variance, a.data, b.data)
 
+    def calculate_batch(
+            self,
+            concatenated: Vector,
+            size: int,
+            assignments: np.ndarray
+    ) -> np.ndarray:
+        # will raise if any sample is empty
+        # the statistics are computed from the sum and sum of squares of
+        # the first sample of every permutation (as `t_statistic_from_sums`,
+        # ie. with the unbiased pooled variance), those of both samples
+        # being the same for every permutation, thus the permuted data is
+        # never materialized
+        size_b = concatenated.size - size
+        self._raise_if_any_sample_is_empty(size, size_b)
+        if size + size_b <= 2:  # corner case!
+            return np.full((assignments.shape[0],), np.nan)
+        centered = concatenated.data - np.mean(concatenated.data)
+        sums, sums_of_squares = group_sums_from_indices(
+            centered,
+            assignments,
+            size
+        )
+        total = np.sum(centered)
+        sums_b = total - sums
+        variance = (
+                (sums_of_squares - sums * sums / size)
+                + (
+                        np.dot(centered, centered) - sums_of_squares
+                        - sums_b * sums_b / size_b
+                )
+        ) / (size + size_b - 2)
+        variance[variance <= 0.] = np.nan  # cannot be computed!
+        return (
+                (sums / size - sums_b / size_b)
+                / np.sqrt(variance * (1. / size + 1. / size_b))
+        )
+
     @staticmethod
     @njit(cache=True)
     def _calculate(variance: float, a: np.ndarray, b: np.ndarray) -> float:
@@ -55,6 +130,12 @@ class UnpairedSimilarVarTTestStatisticCalculator(
                 / np.sqrt(variance * (1. / a.size + 1. / b.size))
         )
 
+    @staticmethod
+    def _raise_if_any_sample_is_empty(size_a: int, size_b: int):
+        if size_a <= 0 or size_b <= 0:
+            msg = 'cannot compute t-test test statistic, sample is empty'
+            raise ValueError(msg)
+
     @staticmethod
     def _raise_if_variance_is_zero(variance: float):
         if variance == 0.:
@@ -63,3 +144,121 @@ class UnpairedSimilarVarTTestStatisticCalculator(
                 'variance of provided samples is 0'
             )
             raise ValueError(msg)
+
+
+class UnpairedWelchTTestStatisticCalculator(
+    ITwoSampleTTestStatisticCalculator
+):
+    # Unpaired two sample t-test test statistic calculator not assuming
+    # similar variances (Welch)
+
+    def calculate(self, samples: Tuple[Vector, Vector]) -> float:
+        # will raise if any sample has less than two observations, or if
+        # the standard error of the difference in means is exactly zero
+        a, b = samples
+        self._raise_if_any_sample_is_too_small(a.size, b.size)
+        error = np.sqrt(
+            np.var(a.data, ddof=1) / a.size + np.var(b.data, ddof=1) / b.size
+        )
+        self._raise_if_error_is_zero(error)
+        return float((np.mean(a.data) - np.mean(b.data)) / error)
+
+    def calculate_batch(
+            self,
+            concatenated: Vector,
+            size: int,
+            assignments: np.ndarray
+    ) -> np.ndarray:
+        # will raise if any sample has less than two observations
+        permuted = concatenated.data[assignments]
+        a, b = permuted[:, :size], permuted[:, size:]
+        self._raise_if_any_sample_is_too_small(a.shape[1], b.shape[1])
+        error = np.sqrt(
+            np.var(a, axis=1, ddof=1) / a.shape[1]
+            + np.var(b, axis=1, ddof=1) / b.shape[1]
+        )
+        error[error == 0.] = np.nan  # cannot be computed!
+        return (np.mean(a, axis=1) - np.mean(b, axis=1)) / error
+
+    @staticmethod
+    def _raise_if_any_sample_is_too_small(size_a: int, size_b: int):
+        if size_a < 2 or size_b < 2:
+            msg = (
+                'cannot compute Welch t-test test statistic, samples must '
+                'have at least two observations'
+            )
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_error_is_zero(error: float):
+        if error == 0.:
+            msg = (
+                'cannot compute Welch t-test test statistic, variances of '
+                'provided samples are 0'
+            )
+            raise ValueError(msg)
+
+
+class DifferenceInMeansStatisticCalculator(
+    ITwoSampleTTestStatisticCalculator
+):
+    # Difference between the means of the first and the second sample,
+    # ie. the numerator of the t-test statistics
+
+    @property
+    def is_increasing_in_first_sum(self) -> bool:
+        # the sum of both samples is the same for every permutation
+        return True
+
+    def calculate(self, samples: Tuple[Vector, Vector]) -> float:
+        # will raise if any sample is empty
+        a, b = samples
+        self._raise_if_any_sample_is_empty(a.size, b.size)
+        return float(np.mean(a.data) - np.mean(b.data))
+
+    def calculate_batch(
+            self,
+            concatenated: Vector,
+            size: int,
+            assignments: np.ndarray
+    ) -> np.ndarray:
+        # will raise if any sample is empty
+        permuted = concatenated.data[assignments]
+        a, b = permuted[:, :size], permuted[:, size:]
+        self._raise_if_any_sample_is_empty(a.shape[1], b.shape[1])
+        return np.mean(a, axis=1) - np.mean(b, axis=1)
+
+    @staticmethod
+    def _raise_if_any_sample_is_empty(size_a: int, size_b: int):
+        if size_a == 0 or size_b == 0:
+            msg = 'cannot compute difference in means, sample is empty'
+            raise ValueError(msg)
+
+
+@njit(cache=True, nogil=True)
+def t_statistic_from_sums(
+        sum_a: float,
+        sum_of_squares_a: float,
+        total: float,
+        total_of_squares: float,
+        size_a: int,
+        size_b: int
+) -> float:
+    # compiled kernel of the statistic of
+    # `UnpairedSimilarVarTTestStatisticCalculator` from the sum and sum of
+    # squares of the first sample and of both samples, usable in other
+    # kernels, returns nan if the statistic cannot be computed
+    # (better conditioned if the samples are centered beforehand)
+    if size_a <= 0 or size_b <= 0 or size_a + size_b <= 2:
+        return np.nan
+    sum_b = total - sum_a
+    variance = (
+            (sum_of_squares_a - sum_a * sum_a / size_a)
+            + (total_of_squares - sum_of_squares_a - sum_b * sum_b / size_b)
+    ) / (size_a + size_b - 2)
+    if variance <= 0.:
+        return np.nan
+    return (
+            (sum_a / size_a - sum_b / size_b)
+            / np.sqrt(variance * (1. / size_a + 1. / size_b))
+    )
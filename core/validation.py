@@ -0,0 +1,559 @@
+# -*- coding: utf-8 -*-
+# Checks that the accelerated engines give the answers of the reference
+# engine: over many seeds and a grid of scenarios, the p-values of every
+# engine are compared with those of the reference by a two-sample
+# Kolmogorov-Smirnov test, and their power by a two-proportion test, with
+# a Bonferroni correction controlling the family-wise false alarm rate
+# engines claiming to be exact are compared element by element instead
+#
+#     python -m core.validation [--seeds 5] [--family-alpha 0.01]
+
+import argparse
+import os
+import tempfile
+from math import erfc, exp, isnan, nan, sqrt
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.random import PCG64
+
+from .backend import available_backends
+from .core import UnpairedOneSidedPermutationTestPowerSimulator
+from .permutation import IOneSidedPermutationTestPValueCalculator
+from .permutation import OneSidedPermutationTestPValueCalculator
+from .permutation import ParallelOneSidedPermutationTestPValueCalculator
+from .permutation import SharedMemoryOneSidedPermutationTestPValueCalculator
+from .permutation import StreamingOneSidedPermutationTestPValueCalculator
+from .random import NumpyRandomPermutator
+from .storage import SimulationStore
+from .ttest import UnpairedSimilarVarTTestStatisticCalculator
+from .vector import Vector
+
+
+class Scenario(NamedTuple):
+    # Parameters of the simulations of a point of the grid
+    number_of_simulations: int
+    number_of_permutations: int
+    number_of_observations: int
+    means: Tuple[float, float]
+    scale: float
+    alpha: float
+
+
+class Engine(NamedTuple):
+    # Named function drawing the p-values of a scenario for a seed, which
+    # must be equal to those of the engine `exact_to` (for the same seed
+    # and scenario) if not None, otherwise equivalent to those of the
+    # reference by the checks in `claims`: 'ks' (the same distribution of
+    # p-values) and 'power' (the same probability of rejection)
+    name: str
+    p_values: Callable[[int, Scenario], np.ndarray]
+    exact_to: Optional[str] = None
+    claims: Tuple[str, ...] = ('ks', 'power')
+
+
+class Check(NamedTuple):
+    # Outcome of a comparison of an engine with another on a scenario:
+    # 'ks' and 'power' are statistical tests against the reference
+    # (`p_value` is the p-value of the test, rejected below `threshold`),
+    # 'exact' compares the p-values element by element (`statistic` is the
+    # number of different p-values, `p_value` is nan)
+    engine: str
+    scenario: Scenario
+    kind: str
+    statistic: float
+    p_value: float
+    threshold: float
+    passed: bool
+
+
+class ValidationReport(NamedTuple):
+    checks: List[Check]
+
+    @property
+    def passed(self) -> bool:
+        return all(check.passed for check in self.checks)
+
+    @property
+    def failures(self) -> List[Check]:
+        return [check for check in self.checks if not check.passed]
+
+    def format(self) -> str:
+        lines = [
+            f'{"engine":<16} {"kind":<6} {"n":>4} {"means":>12} '
+            f'{"statistic":>10} {"p-value":>10} {"threshold":>10} result'
+        ]
+        for check in self.checks:
+            scenario = check.scenario
+            means = f'{scenario.means[0]:g},{scenario.means[1]:g}'
+            lines.append(
+                f'{check.engine:<16} {check.kind:<6} '
+                f'{scenario.number_of_observations:>4} {means:>12} '
+                f'{check.statistic:>10.4g} {check.p_value:>10.4g} '
+                f'{check.threshold:>10.4g} '
+                f'{"pass" if check.passed else "FAIL"}'
+            )
+        return '\n'.join(lines)
+
+
+class EquivalenceHarness:
+    # Compares engines with a reference engine over seeds and scenarios
+
+    def __init__(
+            self,
+            reference: Engine,
+            engines: Sequence[Engine],
+            *,
+            seeds: Sequence[int],
+            scenarios: Sequence[Scenario],
+            family_alpha: float = 0.01
+    ):
+        # will raise if `seeds` or `scenarios` is empty,
+        # if `family_alpha` is not in (0, 1),
+        # if the names of the engines are not unique,
+        # if an engine is exact to an unknown engine,
+        # or if an engine claims an unknown check
+        self._raise_if_is_empty(seeds, name='seeds')
+        self._raise_if_is_empty(scenarios, name='scenarios')
+        self._raise_if_family_alpha_is_not_in_open_unit_interval(
+            family_alpha
+        )
+        self._raise_if_engines_are_inconsistent(reference, engines)
+        self._reference = reference
+        self._engines = tuple(engines)
+        self._seeds = tuple(seeds)
+        self._scenarios = tuple(scenarios)
+        self._family_alpha = family_alpha
+
+    def run(self) -> ValidationReport:
+        # the family-wise false alarm rate of the statistical checks is at
+        # most `family_alpha` if every engine is equivalent
+        statistical = sum(
+            len(engine.claims) for engine in self._engines
+            if engine.exact_to is None
+        ) * len(self._scenarios)
+        threshold = self._family_alpha / max(1, statistical)
+        checks = []
+        for scenario in self._scenarios:
+            p_values = {
+                engine.name: [
+                    engine.p_values(seed, scenario) for seed in self._seeds
+                ]
+                for engine in (self._reference,) + self._engines
+            }
+            for engine in self._engines:
+                if engine.exact_to is not None:
+                    checks.append(self._check_exact(
+                        engine.name,
+                        scenario,
+                        p_values[engine.name],
+                        p_values[engine.exact_to]
+                    ))
+                    continue
+                checks.extend(self._check_statistically(
+                    engine,
+                    scenario,
+                    np.concatenate(p_values[engine.name]),
+                    np.concatenate(p_values[self._reference.name]),
+                    threshold
+                ))
+        return ValidationReport(checks)
+
+    @staticmethod
+    def _check_exact(
+            name: str,
+            scenario: Scenario,
+            p_values: List[np.ndarray],
+            expected: List[np.ndarray]
+    ) -> Check:
+        different = sum(
+            a.size + b.size if a.shape != b.shape
+            else int(np.count_nonzero(a != b))
+            for a, b in zip(p_values, expected)
+        )
+        return Check(
+            name,
+            scenario,
+            'exact',
+            float(different),
+            nan,
+            0.,
+            different == 0
+        )
+
+    @staticmethod
+    def _check_statistically(
+            engine: Engine,
+            scenario: Scenario,
+            p_values: np.ndarray,
+            reference: np.ndarray,
+            threshold: float
+    ) -> List[Check]:
+        tests = {
+            'ks': lambda: ks_two_sample(p_values, reference),
+            'power': lambda: two_proportion_test(
+                int(np.count_nonzero(p_values < scenario.alpha)),
+                p_values.size,
+                int(np.count_nonzero(reference < scenario.alpha)),
+                reference.size
+            )
+        }
+        checks = []
+        for kind in engine.claims:
+            statistic, p_value = tests[kind]()
+            checks.append(Check(
+                engine.name,
+                scenario,
+                kind,
+                statistic,
+                p_value,
+                threshold,
+                p_value >= threshold
+            ))
+        return checks
+
+    @staticmethod
+    def _raise_if_is_empty(values: Sequence, *, name: str):
+        if len(values) == 0:
+            msg = f'{name} must be non-empty'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_family_alpha_is_not_in_open_unit_interval(
+            family_alpha: float
+    ):
+        if not 0. < family_alpha < 1.:
+            msg = f'family_alpha must be in (0, 1), was [{family_alpha}]'
+            raise ValueError(msg)
+
+    @staticmethod
+    def _raise_if_engines_are_inconsistent(
+            reference: Engine,
+            engines: Sequence[Engine]
+    ):
+        names = [reference.name] + [engine.name for engine in engines]
+        if len(set(names)) != len(names):
+            msg = f'names of engines must be unique, were [{names}]'
+            raise ValueError(msg)
+        for engine in engines:
+            if engine.exact_to is not None and engine.exact_to not in names:
+                msg = (
+                    f'engine must be exact to a known engine, '
+                    f'was [{engine.exact_to}]'
+                )
+                raise ValueError(msg)
+            unknown = set(engine.claims) - {'ks', 'power'}
+            if unknown:
+                msg = (
+                    f'claims must be among ks and power, '
+                    f'were [{engine.claims}]'
+                )
+                raise ValueError(msg)
+
+
+def simulator_engine(
+        name: str,
+        make: Callable[[int], UnpairedOneSidedPermutationTestPowerSimulator],
+        *,
+        exact_to: Optional[str] = None,
+        claims: Tuple[str, ...] = ('ks', 'power')
+) -> Engine:
+    # the engine of the p-values of the simulations of the simulator
+    # made by `make` for a seed
+
+    def p_values(seed: int, scenario: Scenario) -> np.ndarray:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'simulations.npy')
+            make(seed).simulate(**scenario._asdict(), path=path)
+            return np.array(SimulationStore.open(path).p_values)
+
+    return Engine(name, p_values, exact_to, claims)
+
+
+def calculator_engine(
+        name: str,
+        make: Callable[[int], IOneSidedPermutationTestPValueCalculator],
+        *,
+        exact_to: Optional[str] = None,
+        claims: Tuple[str, ...] = ('ks', 'power')
+) -> Engine:
+    # the engine of the p-values of the calculator made by `make` for a
+    # seed, on samples drawn from `np.random.default_rng(seed)`, thus the
+    # same samples for every calculator
+    # the calculator is closed afterwards if it can be (eg. its pool of
+    # processes)
+
+    def p_values(seed: int, scenario: Scenario) -> np.ndarray:
+        generator = np.random.default_rng(seed)
+        calculator = make(seed)
+        try:
+            return np.array([
+                calculator.calculate(
+                    scenario.number_of_permutations,
+                    tuple(
+                        Vector(generator.normal(
+                            loc=mean,
+                            scale=scenario.scale,
+                            size=scenario.number_of_observations
+                        ))
+                        for mean in scenario.means
+                    )
+                )
+                for _ in range(scenario.number_of_simulations)
+            ])
+        finally:
+            if isinstance(
+                    calculator,
+                    SharedMemoryOneSidedPermutationTestPValueCalculator
+            ):
+                calculator.close()
+
+    return Engine(name, p_values, exact_to, claims)
+
+
+def ks_two_sample(a: np.ndarray, b: np.ndarray) -> Tuple[float, float]:
+    # two-sample Kolmogorov-Smirnov statistic of `a` and `b`, and its
+    # asymptotic p-value (conservative for discrete distributions)
+    # will raise if `a` or `b` is empty
+    if a.size == 0 or b.size == 0:
+        msg = 'samples must be non-empty'
+        raise ValueError(msg)
+    points = np.concatenate([a, b])
+    statistic = float(np.max(np.abs(
+        np.searchsorted(np.sort(a), points, side='right') / a.size
+        - np.searchsorted(np.sort(b), points, side='right') / b.size
+    )))
+    size = a.size * b.size / (a.size + b.size)
+    return statistic, _kolmogorov_survival(
+        (sqrt(size) + 0.12 + 0.11 / sqrt(size)) * statistic
+    )
+
+
+def two_proportion_test(
+        successes_a: int,
+        trials_a: int,
+        successes_b: int,
+        trials_b: int
+) -> Tuple[float, float]:
+    # z statistic of the difference between two binomial proportions
+    # (pooled under the null hypothesis), and its two-sided p-value
+    # will raise if any number of trials is not strictly positive
+    if trials_a <= 0 or trials_b <= 0:
+        msg = 'number of trials must be strictly positive'
+        raise ValueError(msg)
+    pooled = (successes_a + successes_b) / (trials_a + trials_b)
+    variance = pooled * (1. - pooled) * (1. / trials_a + 1. / trials_b)
+    if variance == 0.:  # both proportions are 0 or both are 1!
+        return 0., 1.
+    z = (successes_a / trials_a - successes_b / trials_b) / sqrt(variance)
+    return z, erfc(abs(z) / sqrt(2.))
+
+
+def _kolmogorov_survival(value: float) -> float:
+    # probability that the Kolmogorov distribution exceeds `value`
+    if isnan(value) or value < 0.2:  # the series is 1 up to rounding!
+        return 1.
+    terms = (
+        2. * (-1.) ** (j - 1) * exp(-2. * j * j * value * value)
+        for j in range(1, 101)
+    )
+    return min(1., max(0., sum(terms)))
+
+
+def simulator_engines(
+        *,
+        number_of_threads: int = 2
+) -> Tuple[Engine, List[Engine]]:
+    # the reference (the sequential simulator) and the accelerated
+    # simulators, where the pipelined simulator claims the results of the
+    # counter-based one and the threaded simulator those of its backend
+    make = UnpairedOneSidedPermutationTestPowerSimulator.make
+    reference = simulator_engine(
+        'reference',
+        lambda seed: make(seed=seed, number_of_threads=1)
+    )
+    return reference, [
+        simulator_engine(
+            'counter-based',
+            lambda seed: make(
+                seed=seed,
+                number_of_threads=1,
+                counter_based=True
+            )
+        ),
+        simulator_engine(
+            'pipelined',
+            lambda seed: make(
+                seed=seed,
+                number_of_threads=1,
+                number_of_generators=1
+            ),
+            exact_to='counter-based'
+        ),
+        simulator_engine(
+            'numba',
+            lambda seed: make(
+                seed=seed,
+                number_of_threads=1,
+                backend='numba'
+            )
+        ),
+        simulator_engine(
+            'threads',
+            lambda seed: make(
+                seed=seed,
+                number_of_threads=number_of_threads,
+                backend='numba'
+            ),
+            exact_to='numba'
+        ),
+        simulator_engine(
+            'antithetic',
+            lambda seed: make(
+                seed=seed,
+                number_of_threads=1,
+                sampling='antithetic'
+            )
+        ),
+        simulator_engine(
+            'halton',
+            lambda seed: make(
+                seed=seed,
+                number_of_threads=1,
+                sampling='halton'
+            )
+        ),
+        simulator_engine(
+            'edgeworth',
+            lambda seed: make(
+                seed=seed,
+                number_of_threads=1,
+                approximation='auto',
+                tolerance=1e-2
+            ),
+            claims=('power',)  # approximated p-values are continuous!
+        )
+    ]
+
+
+def calculator_engines(
+        *,
+        number_of_threads: int = 2
+) -> Tuple[Engine, List[Engine]]:
+    # the reference (independent shuffles) and the accelerated calculators,
+    # where the shared-memory calculator claims the results of the parallel
+    # calculator of the numpy backend, as it runs the same kernel on the
+    # same permutations, while the parallel calculators of the other
+    # registered backends (but the scalar reference and 'auto', which
+    # selects among them) draw the same permutations, but compiled kernels
+    # may round the statistics differently, thus count the ties of the
+    # observed statistic differently, and are compared statistically
+    reference = calculator_engine(
+        'reference',
+        lambda seed: OneSidedPermutationTestPValueCalculator.make(
+            UnpairedSimilarVarTTestStatisticCalculator.make(),
+            NumpyRandomPermutator(PCG64(seed=seed))
+        )
+    )
+    backends = [
+        name for name in available_backends()
+        if name not in ('auto', 'reference', 'numpy')
+    ]
+    return reference, [
+        calculator_engine(
+            'swap-chain',
+            lambda seed: (
+                OneSidedPermutationTestPValueCalculator.make_swap_chain(
+                    PCG64(seed=seed)
+                )
+            )
+        ),
+        calculator_engine(
+            'streaming',
+            lambda seed: StreamingOneSidedPermutationTestPValueCalculator.make(
+                PCG64(seed=seed)
+            )
+        ),
+        calculator_engine(
+            'parallel-numpy',
+            lambda seed: ParallelOneSidedPermutationTestPValueCalculator.make(
+                seed=seed,
+                number_of_threads=1,
+                backend='numpy'
+            )
+        )
+    ] + [
+        calculator_engine(
+            f'parallel-{backend}',
+            _parallel_calculator(backend, number_of_threads)
+        )
+        for backend in backends
+    ] + [
+        calculator_engine(
+            'shared-memory',
+            lambda seed: (
+                SharedMemoryOneSidedPermutationTestPValueCalculator.make(
+                    seed=seed,
+                    number_of_processes=number_of_threads,
+                    backend='numpy'
+                )
+            ),
+            exact_to='parallel-numpy'
+        )
+    ]
+
+
+def _parallel_calculator(
+        backend: str,
+        number_of_threads: int
+) -> Callable[[int], IOneSidedPermutationTestPValueCalculator]:
+    # binds `backend` (a lambda in a comprehension would not)
+    return lambda seed: ParallelOneSidedPermutationTestPValueCalculator.make(
+        seed=seed,
+        number_of_threads=number_of_threads,
+        backend=backend
+    )
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='equivalence of the engines with the reference'
+    )
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--simulations', type=int, default=200)
+    parser.add_argument('--permutations', type=int, default=200)
+    parser.add_argument('--family-alpha', type=float, default=0.01)
+    parser.add_argument('--threads', type=int, default=2)
+    parsed = parser.parse_args(arguments)
+    scenarios = [
+        Scenario(
+            parsed.simulations,
+            parsed.permutations,
+            number_of_observations,
+            (effect, 0.),
+            1.,
+            0.05
+        )
+        for number_of_observations in (10, 50)
+        for effect in (0., 0.5)
+    ]
+    graphs = (
+        simulator_engines(number_of_threads=parsed.threads),
+        calculator_engines(number_of_threads=parsed.threads)
+    )
+    passed = True
+    for reference, engines in graphs:
+        report = EquivalenceHarness(
+            reference,
+            engines,
+            seeds=range(parsed.seeds),
+            scenarios=scenarios,
+            family_alpha=parsed.family_alpha
+        ).run()
+        print(report.format())
+        passed = passed and report.passed
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
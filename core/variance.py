@@ -3,9 +3,9 @@
 from typing import Iterable
 from typing import Tuple
 
-from numba import njit
 import numpy as np
 
+from .jit import njit
 from .vector import Vector
 
 
@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 
-from typing import Iterable, Sequence
+from typing import Iterable, Iterator, Sequence
 from typing import SupportsFloat
 from typing import Tuple
 
 import numpy as np
-from numba import njit
 from numpy import ndarray
 
+from .jit import njit
+
 
 class Vector:
     # wrapper of one-dimensional np.ndarray of finite floats
@@ -51,6 +52,15 @@ class Vector:
     def is_empty(self) -> int:
         return self.size == 0
 
+    def chunks(self, chunk_size: int) -> Iterator[ndarray]:
+        # will raise if `chunk_size` is not strictly positive
+        # the consecutive views of at most `chunk_size` elements of the data
+        if chunk_size <= 0:
+            msg = f'chunk_size must be strictly positive, was [{chunk_size}]'
+            raise ValueError(msg)
+        for start in range(0, self.size, chunk_size):
+            yield self._data[start:start + chunk_size]
+
     def split(self, index: int) -> Tuple["Vector", "Vector"]:
         a, b = self._split(self._data, index)
         return self.__class__(a), self.__class__(b)
@@ -94,11 +104,49 @@ class Vector:
             raise ValueError(msg)
 
     @staticmethod
-    @njit(cache=True)
     def _all_finite(data: ndarray) -> bool:
-        return np.all(np.isfinite(data))
+        # vectorized, thus not compiled: validating a vector never
+        # compiles anything, eg. with the backends free of compilation
+        return bool(np.all(np.isfinite(data)))
 
     @staticmethod
     @njit(cache=True)
     def _split(data: ndarray, index: int) -> Tuple[ndarray, ndarray]:
         return np.split(data, (index,))
+
+
+class MappedVector(Vector):
+    # Vector of a (memory-mapped) array which is neither copied nor loaded
+    # in memory at once, eg. a large sample stored in a file, whose
+    # elements are validated chunk by chunk
+    # the data must not be modified through another reference!
+
+    _CHUNK_SIZE = 2 ** 20  # bounds the memory of the validation
+
+    @classmethod
+    def load(cls, path: str) -> "MappedVector":
+        # will raise if the .npy file at `path` is not a valid vector
+        return cls(np.load(path, mmap_mode='r'))
+
+    @classmethod
+    def from_binary(cls, path: str, *, offset: int = 0) -> "MappedVector":
+        # will raise if the raw float64 (native byte order) elements of the
+        # file at `path`, after `offset` bytes, are not a valid vector
+        return cls(np.memmap(path, dtype=np.float64, mode='r', offset=offset))
+
+    def __init__(self, data: ndarray):
+        # will raise as `Vector`
+        self._data = data.view()  # shares the memory!
+        self._data.flags.writeable = False  # immutable!
+        self._raise_if_is_not_one_dimension()
+        self._raise_if_is_not_float()
+        self._raise_if_is_not_finite()
+
+    def _raise_if_is_not_finite(self):
+        for chunk in self.chunks(self._CHUNK_SIZE):
+            if not self._all_finite(chunk):
+                msg = (
+                    f'data must contain finite elements, some elements in '
+                    f'data were not finite'
+                )
+                raise ValueError(msg)
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from core.profile import PROFILE_ENVIRONMENT_VARIABLE
+
+
+@pytest.fixture(autouse=True)
+def _without_profile(monkeypatch, tmp_path):
+    # the tests never depend on the profile of the machine running them
+    monkeypatch.setenv(
+        PROFILE_ENVIRONMENT_VARIABLE,
+        str(tmp_path / 'missing-profile.json')
+    )
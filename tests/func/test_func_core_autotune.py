@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from core import UnpairedOneSidedPermutationTestPowerSimulator
+from core.autotune import calibrate_chunk_size
+from core.autotune import calibrate_policy
+from core.autotune import calibrate_threads
+from core.autotune import main
+from core.backend import BackendPolicy
+from core.jit import NUMBA_AVAILABLE
+from core.profile import PROFILE_ENVIRONMENT_VARIABLE
+from core.profile import TuningProfile
+from core.profile import current_machine
+from core.profile import load_profile
+from core.profile import save_profile
+
+
+@pytest.fixture(scope='module')
+def parameters():
+    return dict(
+        number_of_simulations=16,
+        number_of_permutations=50,
+        number_of_observations=10,
+        means=(0.5, 0.),
+        scale=1.,
+        alpha=0.05
+    )
+
+
+class TestCalibratePolicy:
+
+    @pytest.mark.skipif(not NUMBA_AVAILABLE, reason='numba is missing')
+    def test(self):
+        result = calibrate_policy(
+            works=[2 ** 10, 2 ** 14],
+            number_of_cores=1,
+            repeats=1
+        )
+        # no parallel backend on a single core
+        assert result.small_work in (2 ** 10, 2 ** 14, 2 ** 62)
+        assert result.large_work == 2 ** 62
+
+
+class TestCalibrateThreads:
+
+    def test(self, parameters):
+        result, timings = calibrate_threads(
+            candidates=[0, 1],
+            policy=BackendPolicy(),
+            parameters=parameters
+        )
+        assert result in (0, 1)
+        assert set(timings) == {0, 1}
+
+
+class TestCalibrateChunkSize:
+
+    def test(self, parameters):
+        result, timings = calibrate_chunk_size(
+            candidates=[4, 16],
+            number_of_threads=1,
+            policy=BackendPolicy(),
+            parameters=parameters,
+            slack=float('inf')
+        )
+        # the smallest chunk size within the slack
+        assert result == 4
+        assert set(timings) == {4, 16}
+
+
+class TestMain:
+
+    def test(self, tmp_path, capsys):
+        path = str(tmp_path / 'profile.json')
+        main(['--quick', '--path', path])
+        result = load_profile(path)
+        assert result is not None
+        assert result.machine == current_machine()
+        assert result.number_of_threads >= 1
+        assert path in capsys.readouterr().out
+
+    def test_when_dry_run(self, tmp_path):
+        path = str(tmp_path / 'profile.json')
+        main(['--quick', '--dry-run', '--path', path])
+        assert load_profile(path) is None
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorProfile:
+
+    @pytest.fixture(scope='function')
+    def profile(self, monkeypatch, tmp_path) -> TuningProfile:
+        path = str(tmp_path / 'profile.json')
+        monkeypatch.setenv(PROFILE_ENVIRONMENT_VARIABLE, path)
+        profile = TuningProfile(
+            2,
+            'numpy',
+            8,
+            BackendPolicy(1, 2),
+            current_machine()
+        )
+        save_profile(profile)
+        return profile
+
+    def test_when_is_loaded(self, profile: TuningProfile, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            backend='numpy',
+            profile=True
+        )
+        assert simulator.number_of_threads == 2
+        assert simulator.chunk_size == 8
+        result = asyncio.run(simulator.simulate_async(**parameters))
+        assert result == simulator.simulate(**parameters)
+        # the profile does not change the result
+        assert result == UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            backend='numpy'
+        ).simulate(**parameters)
+
+    def test_when_has_no_backend(self, profile: TuningProfile):
+        # the threads are calibrated on the kernels of the backends
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True,
+            profile=True
+        )
+        assert simulator.number_of_threads == 1
+        assert simulator.chunk_size == 8
+
+    def test_when_is_not_requested(self, profile: TuningProfile):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        )
+        assert simulator.number_of_threads == 1
+        assert simulator.chunk_size == 64
+
+    def test_when_is_invalid_and_not_requested(self, monkeypatch, tmp_path):
+        path = tmp_path / 'profile.json'
+        path.write_text('not json')
+        monkeypatch.setenv(PROFILE_ENVIRONMENT_VARIABLE, str(path))
+        UnpairedOneSidedPermutationTestPowerSimulator.make(seed=1234)
+        with pytest.raises(ValueError, match='JSON profile'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                profile=True
+            )
+
+    def test_when_is_sequential(self, profile: TuningProfile):
+        # the profile never selects the engine
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            profile=True
+        )
+        assert simulator.number_of_threads == 1
+        assert not simulator.factory.is_addressable
+        assert simulator.chunk_size == 8
+
+    def test_when_number_of_threads_is_given(self, profile: TuningProfile):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True,
+            number_of_threads=1,
+            profile=True
+        )
+        assert simulator.number_of_threads == 1
+        assert simulator.chunk_size == 8
+
+    def test_when_backend_is_auto(self, profile: TuningProfile):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            backend='auto',
+            profile=True
+        )
+        assert simulator.factory.backend.policy == profile.policy
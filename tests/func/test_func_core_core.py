@@ -1,8 +1,18 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+import time
+
+import numpy as np
 import pytest
 
 from core import UnpairedOneSidedPermutationTestPowerSimulator
+from core.rank import RankSumStatisticCalculator
+from core.storage import SimulationStore
+from core.trace import tracing
+from core.ttest import DifferenceInMeansStatisticCalculator
+from core.ttest import UnpairedSimilarVarTTestStatisticCalculator
+from core.ttest import UnpairedWelchTTestStatisticCalculator
 
 
 def _almost_equal(result: float, expected: float, *, tolerance: float) -> bool:
@@ -30,3 +40,952 @@ class TestUnpairedOneSidedPermutationTestPowerSimulator:
             alpha=0.025
         )
         assert _almost_equal(result, 0.6968888, tolerance=2e-2)
+
+    @pytest.mark.parametrize('keywords', [
+        dict(),
+        dict(backend='numpy'),
+        dict(statistic='rank-sum')
+    ])
+    def test_when_sizes_are_a_pair(self, keywords):
+        parameters = dict(
+            number_of_simulations=50,
+            number_of_permutations=100,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate(**parameters, number_of_observations=(20, 20))
+        assert result == UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate(**parameters, number_of_observations=20)
+        assert result != UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate(**parameters, number_of_observations=(10, 30))
+
+    @pytest.mark.parametrize('number_of_observations', [1, (1, 20), (20, 1)])
+    def test_when_sizes_are_too_small(self, number_of_observations):
+        with pytest.raises(ValueError, match='at least 2'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234
+            ).simulate(
+                number_of_simulations=10,
+                number_of_permutations=10,
+                number_of_observations=number_of_observations,
+                means=(0.5, 0.),
+                scale=1.,
+                alpha=0.05
+            )
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorSimulateAsync:
+
+    @pytest.fixture(scope='class')
+    def parameters(self):
+        return dict(
+            number_of_simulations=20,
+            number_of_permutations=50,
+            number_of_observations=10,
+            means=(0.5, 0.),
+            scale=1.
+        )
+
+    def test_when_compared_to_simulate(self, parameters):
+        expected = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        ).simulate(**parameters, alpha=0.05)
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        result = asyncio.run(
+            simulator.simulate_async(**parameters, alpha=0.05, chunk_size=3)
+        )
+        assert result == expected
+
+    def test_when_identical_requests_are_concurrent(self, parameters):
+        reference = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        first = reference.simulate(**parameters, alpha=0.05)
+        expected = reference.simulate(**parameters, alpha=0.05)
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+
+        async def _gather():
+            return await asyncio.gather(
+                simulator.simulate_async(**parameters, alpha=0.05),
+                simulator.simulate_async(**parameters, alpha=0.05)
+            )
+
+        assert asyncio.run(_gather()) == [first, first]
+        # the generator was consumed by one computation only
+        assert simulator.simulate(**parameters, alpha=0.05) == expected
+
+    def test_when_cancelled(self, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        reported = []
+
+        async def _cancel():
+            task = asyncio.ensure_future(
+                simulator.simulate_async(
+                    **{**parameters, 'number_of_simulations': 10000},
+                    alpha=0.05,
+                    chunk_size=1,
+                    progress=lambda completed, _: reported.append(completed)
+                )
+            )
+            while not reported:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0.1)
+
+        asyncio.run(_cancel())
+        assert max(reported) < 10000
+
+    def test_when_one_of_concurrent_requests_is_cancelled(self, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        cancelled, awaited = [], []
+
+        async def _cancel_one():
+            simulations = {**parameters, 'number_of_simulations': 200}
+            task = asyncio.ensure_future(
+                simulator.simulate_async(
+                    **simulations,
+                    alpha=0.05,
+                    chunk_size=1,
+                    progress=lambda completed, _: cancelled.append(completed)
+                )
+            )
+            other = asyncio.ensure_future(
+                simulator.simulate_async(
+                    **simulations,
+                    alpha=0.05,
+                    chunk_size=1,
+                    progress=lambda completed, _: awaited.append(completed)
+                )
+            )
+            while not cancelled:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            reported = len(cancelled)
+            await other
+            return reported
+
+        reported = asyncio.run(_cancel_one())
+        # the computation went on for the other request only
+        assert awaited[-1] == 200
+        assert len(cancelled) == reported < 200
+
+    def test_when_traced(self, parameters):
+        with tracing() as tracer:
+            asyncio.run(
+                UnpairedOneSidedPermutationTestPowerSimulator.make(
+                    seed=1234
+                ).simulate_async(**parameters, alpha=0.05, chunk_size=3)
+            )
+        spans = [event for event in tracer.events if event['ph'] == 'X']
+        simulate, = [span for span in spans if span['cat'] == 'simulate']
+        assert simulate['args']['number_of_simulations'] == 20
+        assert len([span for span in spans if span['name'] == 'test']) == 20
+
+    def test_when_chunk_size_is_not_strictly_positive(self, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        with pytest.raises(ValueError, match='chunk_size'):
+            asyncio.run(
+                simulator.simulate_async(
+                    **parameters,
+                    alpha=0.05,
+                    chunk_size=0
+                )
+            )
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorCounterBased:
+
+    @pytest.fixture(scope='class')
+    def parameters(self):
+        return dict(
+            number_of_simulations=20,
+            number_of_permutations=50,
+            number_of_observations=10,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+
+    def test_when_seed_is_negative(self):
+        with pytest.raises(ValueError, match='seed must be non-negative'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=-1,
+                counter_based=True
+            )
+
+    def test(self):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        )
+        result = simulator.simulate(
+            number_of_simulations=300,
+            number_of_permutations=300,
+            number_of_observations=50,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.025
+        )
+        # about three standard errors of the estimate
+        assert _almost_equal(result, 0.6968888, tolerance=1e-1)
+
+    def test_when_simulated_twice(self, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        )
+        first = simulator.simulate(**parameters)
+        second = simulator.simulate(**parameters)
+        assert first == second  # stateless!
+
+    def test_simulations_do_not_depend_on_order(self):
+        factory = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        ).factory
+
+        def _simulate(simulation: int) -> float:
+            calculator, generator = factory.create(simulation)
+            samples = (
+                generator.generate(size=10, mean=0.5, scale=1.),
+                generator.generate(size=10, mean=0., scale=1.)
+            )
+            return calculator.calculate(50, samples)
+
+        forward = [_simulate(i) for i in range(5)]
+        backward = [_simulate(i) for i in reversed(range(5))]
+        assert forward == backward[::-1]
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorThreads:
+
+    @pytest.fixture(scope='class')
+    def parameters(self):
+        return dict(
+            number_of_simulations=50,
+            number_of_permutations=200,
+            number_of_observations=20,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+
+    def test_when_number_of_threads_is_not_strictly_positive(self):
+        with pytest.raises(ValueError, match='number_of_threads'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                number_of_threads=0
+            )
+
+    def test_when_components_are_shared(self):
+        factory = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        ).factory
+        with pytest.raises(ValueError, match='cannot split simulations'):
+            UnpairedOneSidedPermutationTestPowerSimulator(
+                factory,
+                number_of_threads=2
+            )
+
+    def test_when_is_not_counter_based(self):
+        with pytest.raises(ValueError, match='without counter-based'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                number_of_threads=2
+            )
+
+    @pytest.mark.parametrize('keywords', [
+        dict(counter_based=True),
+        dict(sampling='halton'),
+        dict(statistic='rank-sum')
+    ])
+    def test_when_threads_hold_the_gil(self, keywords):
+        with pytest.warns(RuntimeWarning, match='hold the GIL'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                number_of_threads=2,
+                **keywords
+            )
+
+    @pytest.mark.filterwarnings('error')
+    def test_when_threads_release_the_gil(self):
+        UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            number_of_threads=2,
+            backend='numpy'
+        )
+
+    @pytest.mark.filterwarnings('ignore:without a backend')
+    def test(self):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True,
+            number_of_threads=4
+        )
+        result = simulator.simulate(
+            number_of_simulations=300,
+            number_of_permutations=300,
+            number_of_observations=50,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.025
+        )
+        # about three standard errors of the estimate
+        assert _almost_equal(result, 0.6968888, tolerance=1e-1)
+
+    @pytest.mark.parametrize('keywords', [
+        dict(counter_based=True),
+        dict(backend='numba'),
+        dict(sampling='antithetic')
+    ])
+    @pytest.mark.filterwarnings('ignore:without a backend')
+    def test_does_not_depend_on_number_of_threads(self, parameters, keywords):
+        expected = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            number_of_threads=1,
+            **keywords
+        ).simulate(**parameters)
+        for number_of_threads in (2, 3):
+            simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                number_of_threads=number_of_threads,
+                **keywords
+            )
+            assert simulator.number_of_threads == number_of_threads
+            assert simulator.simulate(**parameters) == expected
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorBackend:
+
+    def test_when_backend_is_unknown(self):
+        with pytest.raises(ValueError, match='backend must be one of'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                backend='cuda'
+            )
+
+    def test_when_approximation_is_not_never(self):
+        with pytest.raises(ValueError, match='approximation must be never'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                backend='numpy',
+                approximation='auto'
+            )
+
+    @pytest.mark.parametrize('backend', ['numpy', 'auto'])
+    def test(self, backend: str):
+        arguments = dict(
+            number_of_simulations=50,
+            number_of_permutations=200,
+            number_of_observations=20,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            backend=backend
+        )
+        result = simulator.simulate(**arguments)
+        expected = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            backend='reference'
+        ).simulate(**arguments)
+        assert simulator.factory.is_addressable
+        assert simulator.factory.backend.name == backend
+        assert result == expected
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorSampling:
+
+    def test_when_sampling_is_unknown(self):
+        with pytest.raises(ValueError, match='sampling must be one of'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                sampling='sobol'
+            )
+
+    @pytest.mark.parametrize('sampling', ['antithetic', 'halton'])
+    @pytest.mark.parametrize('number_of_threads', [1, 2])
+    @pytest.mark.filterwarnings('ignore:without a backend')
+    def test(self, sampling: str, number_of_threads: int):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            number_of_threads=number_of_threads,
+            sampling=sampling
+        )
+        result = simulator.simulate(
+            number_of_simulations=300,
+            number_of_permutations=300,
+            number_of_observations=50,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.025
+        )
+        # about three standard errors of the estimate
+        assert _almost_equal(result, 0.6968888, tolerance=1e-1)
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorRankSum:
+
+    def test_when_statistic_is_unknown(self):
+        with pytest.raises(ValueError, match='statistic must be one of'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                statistic='median'
+            )
+
+    @pytest.mark.parametrize('keywords', [
+        dict(backend='numpy'),
+        dict(approximation='always')
+    ])
+    def test_when_is_not_exact(self, keywords):
+        with pytest.raises(ValueError, match='rank-sum'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                statistic='rank-sum',
+                **keywords
+            )
+
+    @pytest.mark.parametrize('number_of_threads', [1, 2])
+    @pytest.mark.filterwarnings('ignore:without a backend')
+    def test(self, number_of_threads: int):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            number_of_threads=number_of_threads,
+            statistic='rank-sum'
+        )
+        result = simulator.simulate(
+            number_of_simulations=300,
+            number_of_permutations=300,
+            number_of_observations=50,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.025
+        )
+        # the t-test power times an efficiency of about 0.95, about three
+        # standard errors of the estimate
+        assert _almost_equal(result, 0.68, tolerance=1e-1)
+        # the p-values are exact, whatever the number of permutations
+        assert result == simulator.simulate(
+            number_of_simulations=300,
+            number_of_permutations=1,
+            number_of_observations=50,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.025
+        )
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorAlternatives:
+
+    @pytest.fixture(scope='function')
+    def parameters(self):
+        return dict(
+            number_of_simulations=100,
+            number_of_permutations=200,
+            number_of_observations=20,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+
+    @pytest.mark.parametrize('keywords', [
+        dict(),
+        dict(counter_based=True),
+        dict(number_of_generators=1),
+        dict(statistic='rank-sum'),
+        dict(backend='numpy')
+    ])
+    def test(self, parameters, keywords):
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate_alternatives(**parameters)
+        assert list(result) == ['greater', 'less', 'two-sided']
+        # the power of 'greater' is the power of `simulate`
+        assert result['greater'] == (
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                **keywords
+            ).simulate(**parameters)
+        )
+        # the first sample is the greater, the two-sided test rejects at
+        # half alpha in each tail
+        assert result['less'] < result['two-sided'] < result['greater']
+
+    def test_when_alternatives_are_given(self, parameters):
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        ).simulate_alternatives(**parameters, alternatives=['two-sided'])
+        assert list(result) == ['two-sided']
+
+    @pytest.mark.parametrize('alternatives', [[], ['greater', 'either']])
+    def test_when_alternatives_are_unknown(self, parameters, alternatives):
+        with pytest.raises(ValueError, match='alternatives must be among'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234
+            ).simulate_alternatives(**parameters, alternatives=alternatives)
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorStatistics:
+
+    @pytest.fixture(scope='function')
+    def parameters(self):
+        return dict(
+            number_of_simulations=100,
+            number_of_permutations=200,
+            number_of_observations=20,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+
+    @pytest.mark.parametrize('keywords', [
+        dict(),
+        dict(counter_based=True),
+        dict(number_of_generators=1)
+    ])
+    def test(self, parameters, keywords):
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate_statistics(
+            calculators=[
+                UnpairedSimilarVarTTestStatisticCalculator.make(),
+                DifferenceInMeansStatisticCalculator()
+            ],
+            **parameters
+        )
+        # the power of the t-test statistic is the power of `simulate`,
+        # and the difference in means orders the permutations of equal
+        # sizes as the t-test statistic
+        expected = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate(**parameters)
+        assert result == (expected, expected)
+
+    @pytest.mark.parametrize('keywords', [
+        dict(counter_based=True),
+        dict(backend='numpy')
+    ])
+    def test_when_statistics_differ(self, parameters, keywords):
+        parameters = {
+            **parameters,
+            'number_of_observations': (5, 35),
+            'means': (0.8, 0.)
+        }
+        calculators = [
+            UnpairedSimilarVarTTestStatisticCalculator.make(),
+            DifferenceInMeansStatisticCalculator(),
+            UnpairedWelchTTestStatisticCalculator(),
+            RankSumStatisticCalculator()
+        ]
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate_statistics(calculators=calculators, **parameters)
+        # the pooled t-test statistic is increasing in the sum of the first
+        # sample, as the difference in means, whatever the sizes, but not
+        # the Welch statistic with samples of distinct sizes
+        assert result[0] == result[1]
+        assert result[2] != result[0]
+        assert result[3] != result[0]
+        # the same simulations as every calculator alone
+        for calculator, power in zip(calculators, result):
+            assert power == (
+                UnpairedOneSidedPermutationTestPowerSimulator.make(
+                    seed=1234,
+                    **keywords
+                ).simulate_statistics(calculators=[calculator], **parameters)
+            )[0]
+
+    def test_when_calculators_are_empty(self, parameters):
+        with pytest.raises(ValueError, match='calculators must be'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234
+            ).simulate_statistics(calculators=[], **parameters)
+
+    def test_when_permutations_are_not_drawn(self, parameters):
+        with pytest.raises(ValueError, match='cannot test several'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                statistic='rank-sum'
+            ).simulate_statistics(
+                calculators=[DifferenceInMeansStatisticCalculator()],
+                **parameters
+            )
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorTracing:
+
+    @pytest.mark.parametrize('keywords, categories', [
+        (dict(), {'simulate', 'chunk', 'generation', 'permutation'}),
+        (
+            dict(number_of_threads=2, backend='numba'),
+            {'simulate', 'chunk', 'generation', 'permutation', 'reduction'}
+        ),
+        (
+            dict(number_of_generators=1),
+            {'simulate', 'generation', 'permutation'}
+        )
+    ])
+    def test(self, keywords, categories):
+        parameters = dict(
+            number_of_simulations=20,
+            number_of_permutations=100,
+            number_of_observations=10,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+        with tracing() as tracer:
+            result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                **keywords
+            ).simulate(**parameters)
+        # tracing does not change the result
+        assert result == UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate(**parameters)
+        spans = [event for event in tracer.events if event['ph'] == 'X']
+        assert categories <= {span['cat'] for span in spans}
+        tests = [span for span in spans if span['name'] == 'test']
+        assert len(tests) == 20
+        simulate, = [span for span in spans if span['cat'] == 'simulate']
+        assert simulate['args']['number_of_simulations'] == 20
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorApproximation:
+
+    def test_when_backend_is_not_none(self):
+        with pytest.raises(ValueError, match='approximation must be never'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                number_of_threads=2,
+                backend='auto',
+                approximation='auto'
+            )
+
+    @pytest.mark.parametrize('keywords, match', [
+        (dict(approximation='sometimes'), 'approximation must be one of'),
+        (dict(approximation='auto', tolerance=0.), 'tolerance must be')
+    ])
+    def test_when_approximation_is_invalid(self, keywords, match: str):
+        with pytest.raises(ValueError, match=match):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                counter_based=True,
+                **keywords
+            )
+
+    @pytest.mark.parametrize('counter_based', [False, True])
+    def test(self, counter_based: bool):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=counter_based,
+            approximation='always'
+        )
+        result = simulator.simulate(
+            number_of_simulations=300,
+            number_of_permutations=300,
+            number_of_observations=50,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.025
+        )
+        # about three standard errors of the estimate
+        assert _almost_equal(result, 0.6968888, tolerance=1e-1)
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorPipeline:
+
+    def test_when_number_of_generators_is_negative(self):
+        with pytest.raises(ValueError, match='number_of_generators'):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                number_of_generators=-1
+            )
+
+    def test_when_is_not_pipelined(self):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        assert simulator.pipeline is None
+        assert simulator.utilization is None
+
+    @pytest.mark.parametrize('number_of_threads', [1, 2])
+    @pytest.mark.filterwarnings('ignore:without a backend')
+    def test(self, number_of_threads: int):
+        # the pipelined simulations are those of the counter-based streams
+        arguments = dict(
+            number_of_simulations=100,
+            number_of_permutations=100,
+            number_of_observations=20,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.025
+        )
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            number_of_threads=number_of_threads,
+            number_of_generators=2
+        )
+        result = simulator.simulate(**arguments)
+        expected = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True,
+            number_of_threads=number_of_threads
+        ).simulate(**arguments)
+        assert result == expected
+        assert simulator.factory.is_addressable
+        assert simulator.pipeline.number_of_testers == number_of_threads
+        assert 0. < simulator.utilization.testing <= 1.
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorStore:
+
+    @pytest.fixture(scope='class')
+    def parameters(self):
+        return dict(
+            number_of_simulations=20,
+            number_of_permutations=50,
+            number_of_observations=10,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+
+    @pytest.mark.parametrize('number_of_threads', [1, 2])
+    @pytest.mark.filterwarnings('ignore:without a backend')
+    def test(self, tmp_path, parameters, number_of_threads: int):
+        path = str(tmp_path / 'simulations.npy')
+        expected = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True,
+            number_of_threads=number_of_threads
+        ).simulate(**parameters)
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True,
+            number_of_threads=number_of_threads
+        ).simulate(**parameters, path=path, statistics=True)
+        store = SimulationStore.open(path)
+        assert result == expected
+        assert store.size == parameters['number_of_simulations']
+        assert store.power(parameters['alpha']) == expected
+        assert np.all(np.isfinite(store.statistics))
+
+    @pytest.mark.parametrize('keywords, match', [
+        (dict(number_of_simulations=0), 'number_of_simulations'),
+        (dict(number_of_permutations=0), 'number_of_permutations'),
+        (dict(number_of_observations=1), 'number_of_observations'),
+        (dict(means=(0.5, float('nan'))), 'means'),
+        (dict(scale=-1.), 'scale'),
+        (dict(scale=float('inf')), 'scale'),
+        (dict(alpha=2.), 'alpha')
+    ])
+    def test_when_is_invalid(self, tmp_path, parameters, keywords, match):
+        # an existing file is left untouched
+        path = tmp_path / 'simulations.npy'
+        path.write_bytes(b'existing')
+        with pytest.raises(ValueError, match=match):
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                counter_based=True
+            ).simulate(**{**parameters, **keywords}, path=str(path))
+        assert path.read_bytes() == b'existing'
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorSimulateAnytime:
+
+    @pytest.fixture(scope='class')
+    def parameters(self):
+        return dict(
+            number_of_permutations=100,
+            number_of_observations=20,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+
+    def test_when_budget_is_sufficient(self, parameters):
+        expected = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        ).simulate(**parameters, number_of_simulations=20)
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        ).simulate_anytime(
+            **parameters,
+            number_of_simulations=20,
+            time_budget=60.
+        )
+        assert result.power == expected
+        assert result.number_of_simulations == 20
+        low, high = result.confidence_interval
+        assert 0. <= low < result.power < high <= 1.
+
+    def test_when_budget_is_insufficient(self, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        )
+        result = simulator.simulate_anytime(
+            **parameters,
+            number_of_simulations=10 ** 6,
+            time_budget=0.5
+        )
+        # stopped early, whatever the speed of the machine
+        assert 1 <= result.number_of_simulations < 10 ** 6
+        low, high = result.confidence_interval
+        assert low <= result.power <= high
+
+    def test_when_deadline_has_passed(self, parameters):
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        ).simulate_anytime(
+            **parameters,
+            number_of_simulations=100,
+            deadline=time.monotonic() - 1.
+        )
+        # at least one simulation is done
+        assert result.number_of_simulations == 1
+
+    def test_when_time_budget_is_negative(self, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        with pytest.raises(ValueError, match='time_budget must be non-neg'):
+            simulator.simulate_anytime(
+                **parameters,
+                number_of_simulations=10,
+                time_budget=-1.
+            )
+
+    def test_when_deadline_and_budget_are_given(self, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        with pytest.raises(ValueError, match='exactly one of'):
+            simulator.simulate_anytime(
+                **parameters,
+                number_of_simulations=10
+            )
+        with pytest.raises(ValueError, match='exactly one of'):
+            simulator.simulate_anytime(
+                **parameters,
+                number_of_simulations=10,
+                time_budget=1.,
+                deadline=time.monotonic() + 1.
+            )
+
+    @pytest.mark.parametrize('confidence', [0., 1.])
+    def test_when_confidence_is_not_in_open_unit_interval(
+            self,
+            parameters,
+            confidence: float
+    ):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        with pytest.raises(ValueError, match='confidence must be in'):
+            simulator.simulate_anytime(
+                **parameters,
+                number_of_simulations=10,
+                time_budget=1.,
+                confidence=confidence
+            )
+
+
+class TestUnpairedOneSidedPermutationTestPowerSimulatorSimulateSmoothed:
+
+    @pytest.fixture(scope='function')
+    def parameters(self):
+        return dict(
+            number_of_simulations=200,
+            number_of_observations=20,
+            means=(0.6, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+
+    def test_when_compared_to_many_permutations(self, parameters):
+        # with few permutations, the smoothed power is close to the power
+        # of many permutations, and more precise than the rejections
+        expected = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        ).simulate(**parameters, number_of_permutations=1000)
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            counter_based=True
+        ).simulate_smoothed(**parameters, number_of_permutations=20)
+        assert abs(result.power - expected) < 0.05
+        assert result.indicator_power == (
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                counter_based=True
+            ).simulate(**parameters, number_of_permutations=20)
+        )
+        assert result.variance_reduction > 1.
+        assert result.standard_error < result.indicator_standard_error
+
+    @pytest.mark.parametrize('keywords', [
+        dict(backend='numpy'),
+        dict(counter_based=True, approximation='always'),
+        dict(statistic='rank-sum')
+    ])
+    def test_when_permutations_are_not_drawn_by_the_permutator(
+            self,
+            parameters,
+            keywords
+    ):
+        # the counts of a backend, or the rounded p-values computed
+        # without permutations
+        result = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234,
+            **keywords
+        ).simulate_smoothed(**parameters, number_of_permutations=20)
+        assert result.indicator_power == (
+            UnpairedOneSidedPermutationTestPowerSimulator.make(
+                seed=1234,
+                **keywords
+            ).simulate(**parameters, number_of_permutations=20)
+        )
+        assert 0. < result.power < 1.
+
+    def test_when_is_invalid(self, parameters):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=1234
+        )
+        with pytest.raises(ValueError):
+            simulator.simulate_smoothed(
+                **dict(parameters, alpha=2.),
+                number_of_permutations=20
+            )
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import math
+
+import pytest
+
+from core import UnpairedOneSidedPermutationTestPowerSimulator
+from core.grid import AdaptivePowerGrid
+from core.grid import GridPoint
+
+_POINTS = tuple(
+    GridPoint(20, (difference, 0.))
+    for difference in (0., 0.5, 1., 2.)
+)
+
+
+def _simulator() -> UnpairedOneSidedPermutationTestPowerSimulator:
+    return UnpairedOneSidedPermutationTestPowerSimulator.make(
+        seed=1234,
+        statistic='rank-sum'
+    )
+
+
+def _grid(**kwargs) -> AdaptivePowerGrid:
+    return AdaptivePowerGrid(
+        _simulator(),
+        points=_POINTS,
+        number_of_permutations=1,
+        scale=1.,
+        alpha=0.05,
+        **kwargs
+    )
+
+
+class TestAdaptivePowerGrid:
+
+    def test_run(self):
+        curve = _grid(precision=0.03).run(budget=20000)
+        assert curve.is_resolved
+        assert curve.number_of_simulations == sum(
+            estimate.number_of_simulations for estimate in curve.estimates
+        )
+        for estimate, point in zip(curve.estimates, _POINTS):
+            assert estimate.point == point
+            assert estimate.half_width <= 0.03
+            # the estimate of a point is that of its first simulations
+            assert estimate.power == _simulator().simulate(
+                number_of_simulations=estimate.number_of_simulations,
+                number_of_permutations=1,
+                number_of_observations=20,
+                means=point.means,
+                scale=1.,
+                alpha=0.05
+            )
+        # the uniform allocation needs the simulations of the least precise
+        # point, ie. of power near 0.5, for every point
+        uniform = len(_POINTS) * math.ceil(1.96 ** 2 * 0.25 / 0.03 ** 2)
+        assert curve.number_of_simulations < 0.6 * uniform
+        simulations = [
+            estimate.number_of_simulations for estimate in curve.estimates
+        ]
+        assert simulations[-1] < simulations[1]
+
+    def test_run_when_has_threshold(self):
+        curve = _grid(precision=0.01, threshold=0.8).run(budget=20000)
+        assert curve.is_resolved
+        for estimate in curve.estimates:
+            low, high = estimate.confidence_interval
+            assert not low <= 0.8 <= high or estimate.half_width <= 0.01
+        # far from the threshold, the points stop at the initial simulations
+        assert curve.estimates[0].number_of_simulations == 32
+        assert curve.estimates[-1].number_of_simulations == 32
+        assert curve.number_of_simulations < 20000
+
+    def test_run_when_threshold_is_looked_at_repeatedly(self):
+        # a point whose power is the threshold is rarely resolved on either
+        # side of it, however many looks it gets
+        threshold = _simulator().simulate(
+            number_of_simulations=4000,
+            number_of_permutations=1,
+            number_of_observations=20,
+            means=(0.5, 0.),
+            scale=1.,
+            alpha=0.05
+        )
+        resolved = 0
+        for seed in range(20):
+            curve = AdaptivePowerGrid(
+                UnpairedOneSidedPermutationTestPowerSimulator.make(
+                    seed=seed,
+                    statistic='rank-sum'
+                ),
+                points=_POINTS[1:2],
+                number_of_permutations=1,
+                scale=1.,
+                alpha=0.05,
+                precision=0.001,
+                threshold=threshold,
+                initial=8
+            ).run(budget=4000)
+            resolved += curve.is_resolved
+        assert resolved <= 2
+
+    def test_run_when_budget_is_spent(self):
+        curve = _grid(precision=0.005).run(budget=1000)
+        assert curve.number_of_simulations == 1000
+        assert not curve.is_resolved
+
+    def test_run_when_budget_is_too_small(self):
+        with pytest.raises(ValueError, match='budget must be at least'):
+            _grid(initial=100).run(budget=399)
+
+    def test_run_when_is_not_addressable(self):
+        grid = AdaptivePowerGrid(
+            UnpairedOneSidedPermutationTestPowerSimulator.make(seed=1234),
+            points=_POINTS,
+            number_of_permutations=10,
+            scale=1.,
+            alpha=0.05
+        )
+        with pytest.raises(ValueError):
+            grid.run(budget=1000)
+
+    @pytest.mark.parametrize('kwargs, match', [
+        ({'points': ()}, 'points must be non-empty'),
+        ({'alpha': 1.5}, 'alpha must be in'),
+        ({'precision': 0.}, 'precision must be in'),
+        ({'threshold': 1.}, 'threshold must be in'),
+        ({'confidence': 1.}, 'confidence must be in'),
+        ({'initial': 0}, 'initial must be strictly positive')
+    ])
+    def test_when_is_invalid(self, kwargs: dict, match: str):
+        kwargs = {'points': _POINTS, 'alpha': 0.05, **kwargs}
+        with pytest.raises(ValueError, match=match):
+            AdaptivePowerGrid(
+                _simulator(),
+                number_of_permutations=1,
+                scale=1.,
+                **kwargs
+            )
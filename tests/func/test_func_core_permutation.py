@@ -0,0 +1,711 @@
+# -*- coding: utf-8 -*-
+
+import os
+from itertools import combinations
+from typing import Optional, Tuple
+
+import numpy as np
+import pytest
+from numpy.random import PCG64
+
+from core.permutation import EdgeworthPValueApproximator
+from core.permutation import (
+    MultipleStatisticsPermutationTestPValueCalculator
+)
+from core.permutation import OneSidedPermutationTestPValueCalculator
+from core.permutation import ParallelOneSidedPermutationTestPValueCalculator
+from core.permutation import (
+    SharedMemoryOneSidedPermutationTestPValueCalculator
+)
+from core.permutation import StreamingOneSidedPermutationTestPValueCalculator
+from core.permutation import SwapChainTwoSamplePermutator
+from core.permutation import TwoSamplePermutator
+from core.permutation import rejection_probabilities
+from core.random import NumpyRandomPermutator
+from core.ttest import DifferenceInMeansStatisticCalculator
+from core.ttest import ITwoSampleTTestStatisticCalculator
+from core.ttest import UnpairedSimilarVarTTestStatisticCalculator
+from core.ttest import UnpairedWelchTTestStatisticCalculator
+from core.vector import MappedVector
+from core.vector import Vector
+
+
+@pytest.fixture(scope='module')
+def samples():
+    generator = np.random.default_rng(1234)
+    return (
+        Vector(generator.normal(loc=0.3, scale=1., size=30)),
+        Vector(generator.normal(loc=0., scale=1., size=20))
+    )
+
+
+@pytest.fixture(scope='module')
+def calculators():
+    # the pools are spawned once for the module
+    calculators = {
+        backend: SharedMemoryOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_processes=2,
+            backend=backend
+        )
+        for backend in ('numpy', 'auto')
+    }
+    yield calculators
+    for calculator in calculators.values():
+        calculator.close()
+
+
+class TestParallelOneSidedPermutationTestPValueCalculator:
+
+    @pytest.mark.parametrize('number_of_threads', [0, -1])
+    def test_when_number_of_threads_is_not_strictly_positive(
+            self,
+            number_of_threads: int
+    ):
+        with pytest.raises(ValueError, match='number_of_threads'):
+            ParallelOneSidedPermutationTestPValueCalculator.make(
+                seed=1234,
+                number_of_threads=number_of_threads
+            )
+
+    def test_when_number_of_permutations_is_not_strictly_positive(
+            self,
+            samples
+    ):
+        calculator = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234
+        )
+        with pytest.raises(ValueError, match='strictly positive'):
+            calculator.calculate(0, samples)
+
+    def test_when_sample_is_empty(self):
+        calculator = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234
+        )
+        with pytest.raises(ValueError, match='must be non-empty'):
+            calculator.calculate(
+                10,
+                (Vector.empty(), Vector.from_sequence([1., 2.]))
+            )
+
+    def test_when_variance_is_zero(self):
+        calculator = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234
+        )
+        with pytest.raises(ValueError, match='pooled variance.*is 0'):
+            calculator.calculate(
+                10,
+                (Vector.from_sequence([1.]), Vector.from_sequence([2.]))
+            )
+
+    def test_does_not_depend_on_number_of_threads(self, samples):
+        results = [
+            ParallelOneSidedPermutationTestPValueCalculator.make(
+                seed=1234,
+                number_of_threads=number_of_threads
+            ).calculate(100000, samples)
+            for number_of_threads in (1, 2, 3)
+        ]
+        assert results[0] == results[1] == results[2]
+
+    def test_when_tested_again(self, samples):
+        # every test draws the blocks after those of the previous tests
+        calculator = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=1
+        )
+        first = calculator.test(20000, samples)  # 3 blocks!
+        assert calculator.next_block == 3
+        swapped = (samples[1], samples[0])
+        second = calculator.test(20000, swapped)
+        assert calculator.next_block == 5  # 2 blocks!
+        # the first test of another calculator draws the first blocks
+        assert first == ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=1
+        ).test(20000, samples)
+        assert second != ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=1
+        ).test(20000, swapped)
+        assert calculator.test(20000, samples) != first
+
+    def test_when_compared_to_reference(self, samples):
+        reference = OneSidedPermutationTestPValueCalculator.make(
+            UnpairedSimilarVarTTestStatisticCalculator.make(),
+            NumpyRandomPermutator(PCG64(seed=1234))
+        ).calculate(20000, samples)
+        result = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=2
+        ).calculate(200000, samples)
+        # well within the Monte Carlo error of the reference
+        assert abs(result - reference) <= 4 * np.sqrt(
+            reference * (1. - reference) / 20000
+        )
+
+    @pytest.mark.parametrize('backend', ['reference', 'numpy', 'auto'])
+    def test_does_not_depend_on_backend(self, samples, backend: str):
+        result = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=2,
+            backend=backend
+        ).test(2000, samples)
+        expected = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=1,
+            backend='numpy'
+        ).test(2000, samples)
+        assert result == expected
+
+    def test_when_backend_is_unknown(self):
+        with pytest.raises(ValueError, match='backend must be one of'):
+            ParallelOneSidedPermutationTestPValueCalculator.make(
+                seed=1234,
+                backend='cuda'
+            )
+
+
+class TestSharedMemoryOneSidedPermutationTestPValueCalculator:
+
+    @pytest.mark.parametrize('backend', ['numpy', 'auto'])
+    def test_when_compared_to_threads(self, samples, calculators, backend):
+        # 20000 permutations of 50 observations are 3 blocks
+        threads = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=2,
+            backend=backend
+        )
+        while threads.next_block < calculators[backend].next_block:
+            threads.test(1, samples)  # catches up with the other tests!
+        for _ in range(2):  # on the same pool!
+            assert (
+                    calculators[backend].test(20000, samples)
+                    == threads.test(20000, samples)
+            )
+
+    @pytest.mark.skipif(
+        not os.path.isdir('/dev/shm'),
+        reason='shared memory is not listed'
+    )
+    def test_releases_shared_memory(self, samples, calculators):
+        before = set(os.listdir('/dev/shm'))
+        calculators['auto'].test(100, samples)
+        assert set(os.listdir('/dev/shm')) <= before
+
+    def test_when_variance_is_zero(self, calculators):
+        with pytest.raises(ValueError, match='pooled variance.*is 0'):
+            calculators['auto'].calculate(
+                10,
+                (Vector.from_sequence([1.]), Vector.from_sequence([2.]))
+            )
+
+    @pytest.mark.parametrize('number_of_processes', [0, -1])
+    def test_when_number_of_processes_is_not_strictly_positive(
+            self,
+            number_of_processes: int
+    ):
+        with pytest.raises(ValueError, match='number_of_processes'):
+            SharedMemoryOneSidedPermutationTestPValueCalculator.make(
+                seed=1234,
+                number_of_processes=number_of_processes
+            )
+
+    def test_when_closed(self, samples):
+        calculator = SharedMemoryOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_processes=1
+        )
+        threads = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=1
+        )
+        with calculator:
+            assert calculator.test(100, samples) == threads.test(100, samples)
+        with calculator:  # a new pool, continuing the blocks!
+            assert calculator.test(100, samples) == threads.test(100, samples)
+
+
+class _DifferenceInMeansCalculatorStub(ITwoSampleTTestStatisticCalculator):
+
+    def calculate(self, samples: Tuple[Vector, Vector]) -> float:
+        a, b = samples
+        return np.mean(a.data) - np.mean(b.data)
+
+
+class TestTwoSamplePermutator:
+
+    def test_when_statistic_is_not_batched(self, samples):
+        # the batched and scalar statistics see the same permutations
+        batched = TwoSamplePermutator(
+            UnpairedSimilarVarTTestStatisticCalculator.make(),
+            NumpyRandomPermutator(PCG64(seed=1234))
+        )
+        scalar = TwoSamplePermutator(
+            _DifferenceInMeansCalculatorStub(),
+            NumpyRandomPermutator(PCG64(seed=1234))
+        )
+        _, t = batched.permute(100, samples)
+        _, difference = scalar.permute(100, samples)
+        # the t-statistic is monotonic in the difference in means for a
+        # given concatenated sample
+        assert np.array_equal(np.argsort(t.data), np.argsort(difference.data))
+
+
+class TestOneSidedPermutationTestPValueCalculatorTest:
+
+    @pytest.mark.parametrize(
+        'make',
+        [
+            lambda: OneSidedPermutationTestPValueCalculator.make(
+                UnpairedSimilarVarTTestStatisticCalculator.make(),
+                NumpyRandomPermutator(PCG64(seed=1234))
+            ),
+            lambda: ParallelOneSidedPermutationTestPValueCalculator.make(
+                seed=1234
+            )
+        ]
+    )
+    def test_when_compared_to_calculate(self, samples, make):
+        result = make().test(1000, samples)
+        expected = make().calculate(1000, samples)
+        statistic = UnpairedSimilarVarTTestStatisticCalculator.make(
+        ).calculate(samples)
+        assert result.p_value == expected
+        assert result.permutations == 1000
+        assert abs(result.statistic - statistic) <= 1e-12 * abs(statistic)
+
+
+class TestMultipleStatisticsPermutationTestPValueCalculator:
+
+    @pytest.fixture(scope='function')
+    def calculators(self):
+        return [
+            UnpairedSimilarVarTTestStatisticCalculator.make(),
+            DifferenceInMeansStatisticCalculator(),
+            UnpairedWelchTTestStatisticCalculator()
+        ]
+
+    def test_when_compared_to_single_statistics(self, samples, calculators):
+        results = MultipleStatisticsPermutationTestPValueCalculator.make(
+            calculators,
+            NumpyRandomPermutator(PCG64(seed=1234))
+        ).test(1000, samples)
+        # every statistic sees the permutations of its own test
+        expected = [
+            OneSidedPermutationTestPValueCalculator.make(
+                calculator,
+                NumpyRandomPermutator(PCG64(seed=1234))
+            ).test(1000, samples)
+            for calculator in calculators
+        ]
+        assert results == tuple(expected)
+
+    def test_when_calculators_are_empty(self):
+        with pytest.raises(ValueError, match='calculators must be'):
+            MultipleStatisticsPermutationTestPValueCalculator.make(
+                [],
+                NumpyRandomPermutator(PCG64(seed=1234))
+            )
+
+
+class TestOneSidedPermutationTestPValueCalculatorTestAlternatives:
+
+    @staticmethod
+    def _make(**keywords) -> OneSidedPermutationTestPValueCalculator:
+        return OneSidedPermutationTestPValueCalculator.make(
+            UnpairedSimilarVarTTestStatisticCalculator.make(),
+            NumpyRandomPermutator(PCG64(seed=1234)),
+            **keywords
+        )
+
+    def test_when_compared_to_test(self, samples):
+        result = self._make().test_alternatives(1000, samples)
+        expected = self._make().test(1000, samples)
+        # the same permutations
+        observed, permuted = self._make().permutator.permute(1000, samples)
+        assert result.statistic == expected.statistic
+        assert result.greater == expected.p_value
+        assert result.less == np.mean(permuted.data < observed)
+        assert result.less > 0.
+        assert result.two_sided == min(1., 2. * min(result.p_values[:2]))
+        assert result.permutations == 1000
+
+    def test_when_approximated(self, samples):
+        result = self._make(approximation='always').test_alternatives(
+            1000,
+            samples
+        )
+        assert result.greater + result.less == pytest.approx(1.)
+        assert result.permutations == 0
+
+    @pytest.mark.parametrize('backend', ['reference', 'numpy', 'auto'])
+    def test_when_counted_by_backend(self, samples, backend: str):
+        result = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=1,
+            backend=backend
+        ).test_alternatives(1000, samples)
+        expected = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=1,
+            backend=backend
+        ).test(1000, samples)
+        assert result.statistic == expected.statistic
+        assert result.greater == expected.p_value
+        # continuous samples, thus no permutation ties the observed one
+        assert result.greater + result.less == pytest.approx(1.)
+        assert result.two_sided == min(1., 2. * min(result.p_values[:2]))
+        assert result.permutations == 1000
+        # both tails are counted on the same permutations by every backend
+        assert result == ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234,
+            number_of_threads=1,
+            backend='reference'
+        ).test_alternatives(1000, samples)
+
+
+class TestEdgeworthPValueApproximator:
+
+    @pytest.mark.parametrize('size', [(50, 50), (200, 100)])
+    def test_when_compared_to_permutations(self, size):
+        generator = np.random.default_rng(1234)
+        samples = (
+            Vector(generator.exponential(size=size[0]) + 0.2),
+            Vector(generator.exponential(size=size[1]))
+        )
+        calculator = UnpairedSimilarVarTTestStatisticCalculator.make()
+        approximation = EdgeworthPValueApproximator(calculator).approximate(
+            samples
+        )
+        reference = OneSidedPermutationTestPValueCalculator.make(
+            calculator,
+            NumpyRandomPermutator(PCG64(seed=1234))
+        ).calculate(100000, samples)
+        # within the Monte Carlo error of the reference and the estimated
+        # error of the approximation
+        assert abs(approximation.p_value - reference) <= (
+                4 * np.sqrt(reference * (1. - reference) / 100000)
+                + approximation.error
+        )
+        assert approximation.statistic == calculator.calculate(samples)
+
+    def test_when_samples_are_too_small(self):
+        approximation = EdgeworthPValueApproximator(
+            UnpairedSimilarVarTTestStatisticCalculator.make()
+        ).approximate((Vector(np.array([1., 2.])), Vector(np.array([0.]))))
+        assert np.isnan(approximation.p_value)
+        assert approximation.error == np.inf
+
+    def test_when_samples_are_larger(self):
+        # the estimated error decreases with the size of the samples
+        generator = np.random.default_rng(1234)
+        approximator = EdgeworthPValueApproximator(
+            UnpairedSimilarVarTTestStatisticCalculator.make()
+        )
+        errors = [
+            approximator.approximate(
+                (
+                    Vector(generator.exponential(size=size)),
+                    Vector(generator.exponential(size=size))
+                )
+            ).error
+            for size in (10, 100, 1000)
+        ]
+        assert errors[0] > errors[1] > errors[2]
+
+
+class TestOneSidedPermutationTestPValueCalculatorApproximation:
+
+    @staticmethod
+    def _make(approximation, tolerance=1e-3):
+        return OneSidedPermutationTestPValueCalculator.make(
+            UnpairedSimilarVarTTestStatisticCalculator.make(),
+            NumpyRandomPermutator(PCG64(seed=1234)),
+            approximation=approximation,
+            tolerance=tolerance
+        )
+
+    def test_when_approximation_is_unknown(self):
+        with pytest.raises(ValueError, match='approximation'):
+            self._make('sometimes')
+
+    def test_when_tolerance_is_not_strictly_positive(self):
+        with pytest.raises(ValueError, match='tolerance'):
+            self._make('auto', tolerance=0.)
+
+    def test_when_statistic_is_not_increasing_in_first_sum(self):
+        with pytest.raises(ValueError, match='increasing'):
+            OneSidedPermutationTestPValueCalculator.make(
+                _DifferenceInMeansCalculatorStub(),
+                NumpyRandomPermutator(PCG64(seed=1234)),
+                approximation='auto'
+            )
+
+    def test_when_approximation_is_never(self, samples):
+        result = self._make('never').test(1000, samples)
+        assert result.permutations == 1000
+
+    def test_when_approximation_is_always(self, samples):
+        result = self._make('always').test(1000, samples)
+        expected = EdgeworthPValueApproximator(
+            UnpairedSimilarVarTTestStatisticCalculator.make()
+        ).approximate(samples)
+        assert result.p_value == expected.p_value
+        assert result.greater == 0
+        assert result.permutations == 0
+
+    def test_when_approximation_is_auto(self, samples):
+        # the error for 50 observations is above a tight tolerance
+        loose = self._make('auto', tolerance=1.).test(1000, samples)
+        tight = self._make('auto', tolerance=1e-12).test(1000, samples)
+        assert loose.permutations == 0
+        assert tight.permutations == 1000
+
+    def test_when_approximation_is_always_and_samples_are_too_small(self):
+        samples = (Vector(np.array([1., 2.])), Vector(np.array([0.])))
+        result = self._make('always').test(10, samples)
+        assert result.permutations == 10
+
+    def test_when_number_of_permutations_is_not_strictly_positive(
+            self,
+            samples
+    ):
+        with pytest.raises(ValueError, match='strictly positive'):
+            self._make('always').test(0, samples)
+
+
+class TestSwapChainTwoSamplePermutator:
+
+    def test_when_burn_in_is_negative(self):
+        with pytest.raises(ValueError, match='burn_in'):
+            SwapChainTwoSamplePermutator(PCG64(seed=1234), burn_in=-1)
+
+    def test_when_thinning_is_not_strictly_positive(self):
+        with pytest.raises(ValueError, match='thinning'):
+            SwapChainTwoSamplePermutator(PCG64(seed=1234), thinning=0)
+
+    def test_when_number_of_permutations_is_not_strictly_positive(
+            self,
+            samples
+    ):
+        with pytest.raises(ValueError, match='strictly positive'):
+            SwapChainTwoSamplePermutator(PCG64(seed=1234)).permute(
+                0,
+                samples
+            )
+
+    def test_when_sample_is_empty(self, samples):
+        with pytest.raises(ValueError, match='must be non-empty'):
+            SwapChainTwoSamplePermutator(PCG64(seed=1234)).permute(
+                10,
+                (samples[0], Vector(np.array([], dtype=np.float_)))
+            )
+
+    @pytest.mark.parametrize('thinning', [1, 3, None])
+    def test_when_compared_to_recomputed_statistics(self, samples, thinning):
+        # the statistics updated in O(1) are those of the assignments
+        observed, permuted = SwapChainTwoSamplePermutator(
+            PCG64(seed=1234),
+            burn_in=0,
+            thinning=thinning
+        ).permute(1000, samples)
+        assert permuted.size == 1000
+        expected = UnpairedSimilarVarTTestStatisticCalculator.make(
+        ).calculate(samples)
+        assert abs(observed - expected) <= 1e-12 * abs(expected)
+        # every statistic is one of a reachable assignment, thus bounded
+        # by the extreme assignments
+        concatenated = np.sort(Vector.concatenate(samples).data)
+        size = samples[0].size
+        bounds = [
+            UnpairedSimilarVarTTestStatisticCalculator.make().calculate(
+                (Vector(a), Vector(b))
+            )
+            for a, b in (
+                (concatenated[:size], concatenated[size:]),
+                (concatenated[-size:], concatenated[:-size])
+            )
+        ]
+        assert np.all(permuted.data >= bounds[0] - 1e-9)
+        assert np.all(permuted.data <= bounds[1] + 1e-9)
+
+    @staticmethod
+    def _diagnose(
+            sizes: Tuple[int, int],
+            thinning: Optional[int]
+    ) -> Tuple[float, float]:
+        # the distance between the distribution of the statistics of the
+        # chain and the exact permutation distribution (enumerated), and
+        # the correlation of consecutive statistics of the chain
+        data = np.random.default_rng(1234).normal(size=sum(sizes))
+        calculator = UnpairedSimilarVarTTestStatisticCalculator.make()
+        exact = np.sort([
+            calculator.calculate((
+                Vector(data[list(first)]),
+                Vector(np.delete(data, list(first)))
+            ))
+            for first in combinations(range(data.size), sizes[0])
+        ])
+        _, permuted = SwapChainTwoSamplePermutator(
+            PCG64(seed=1234),
+            thinning=thinning
+        ).permute(20000, (Vector(data[:sizes[0]]), Vector(data[sizes[0]:])))
+        statistics = permuted.data
+        # between the exact statistics, thus robust to rounding
+        cuts = (exact[1:] + exact[:-1]) / 2.
+        distance = np.max(np.abs(
+            np.searchsorted(np.sort(statistics), cuts) / statistics.size
+            - np.searchsorted(exact, cuts) / exact.size
+        ))
+        correlation = np.corrcoef(statistics[:-1], statistics[1:])[0, 1]
+        return distance, correlation
+
+    @pytest.mark.parametrize('sizes', [(4, 5), (3, 3), (2, 6), (1, 4)])
+    def test_when_compared_to_exact_enumeration(self, sizes):
+        distance, correlation = self._diagnose(sizes, None)
+        assert distance <= 0.02
+        # the default thinning nearly decorrelates the kept permutations
+        assert abs(correlation) <= 0.15
+
+    def test_when_thinning_is_too_short(self):
+        # the chain keeps the exact distribution, but its permutations are
+        # correlated (ie. 1 - 9 / 20 after a step)
+        distance, correlation = self._diagnose((4, 5), 1)
+        assert distance <= 0.02
+        assert correlation >= 0.4
+
+    def test_when_compared_to_independent_shuffles(self):
+        generator = np.random.default_rng(1234)
+        samples = (
+            Vector(generator.normal(loc=0.1, size=200)),
+            Vector(generator.normal(size=200))
+        )
+        result = OneSidedPermutationTestPValueCalculator.make_swap_chain(
+            PCG64(seed=1234)
+        ).calculate(20000, samples)
+        expected = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234
+        ).calculate(200000, samples)
+        # nearly independent permutations by default, thus about the Monte
+        # Carlo error of independent shuffles
+        assert abs(result - expected) <= 4 * np.sqrt(
+            expected * (1. - expected) / 20000
+        )
+
+
+class TestStreamingOneSidedPermutationTestPValueCalculator:
+
+    @staticmethod
+    def _make(chunk_size: int = 2 ** 16):
+        return StreamingOneSidedPermutationTestPValueCalculator.make(
+            PCG64(seed=1234),
+            chunk_size=chunk_size
+        )
+
+    def test_when_chunk_size_is_not_strictly_positive(self):
+        with pytest.raises(ValueError, match='chunk_size'):
+            self._make(0)
+
+    def test_when_number_of_permutations_is_not_strictly_positive(
+            self,
+            samples
+    ):
+        with pytest.raises(ValueError, match='strictly positive'):
+            self._make().calculate(0, samples)
+
+    def test_when_sample_is_empty(self, samples):
+        with pytest.raises(ValueError, match='must be non-empty'):
+            self._make().calculate(10, (samples[0], Vector.empty()))
+
+    def test_when_variance_is_zero(self):
+        samples = (Vector.from_sequence([1., 1.]), Vector.from_sequence([1.]))
+        with pytest.raises(ValueError, match='variance'):
+            self._make().calculate(10, samples)
+
+    def test_does_not_depend_on_chunk_size(self, samples):
+        # the uniforms are drawn element by element
+        result = self._make(7).test(1000, samples)
+        expected = self._make().test(1000, samples)
+        assert result == expected
+
+    def test_when_samples_are_mapped(self, tmp_path, samples):
+        paths = [str(tmp_path / f'{i}.npy') for i in range(2)]
+        for path, sample in zip(paths, samples):
+            np.save(path, sample.data)
+        mapped = tuple(MappedVector.load(path) for path in paths)
+        result = self._make(16).test(1000, mapped)
+        expected = self._make(16).test(1000, samples)
+        assert result == expected
+
+    def test_when_compared_to_independent_shuffles(self, samples):
+        result = self._make().test(20000, samples)
+        expected = ParallelOneSidedPermutationTestPValueCalculator.make(
+            seed=1234
+        ).test(200000, samples)
+        assert result.permutations == 20000
+        assert abs(result.statistic - expected.statistic) <= 1e-12 * abs(
+            expected.statistic
+        )
+        assert abs(result.p_value - expected.p_value) <= 4 * np.sqrt(
+            expected.p_value * (1. - expected.p_value) / 20000
+        )
+
+
+class TestRejectionProbabilities:
+
+    def test_when_p_values_are_known(self):
+        # p-values of 0.01 or 0.5 are told apart by 200 permutations
+        generator = np.random.default_rng(1234)
+        low = generator.binomial(200, 0.01, size=300)
+        high = generator.binomial(200, 0.5, size=700)
+        result = rejection_probabilities(
+            np.concatenate([low, high]),
+            200,
+            0.05
+        )
+        assert np.all(result[:300] > 0.95)
+        assert np.all(result[300:] < 0.05)
+        assert np.mean(result) == pytest.approx(0.3, abs=0.01)
+
+    def test_is_decreasing(self):
+        generator = np.random.default_rng(1234)
+        greater = generator.binomial(50, generator.random(500))
+        result = rejection_probabilities(greater, 50, 0.1)
+        order = np.argsort(greater, kind='stable')
+        assert np.all(np.diff(result[order]) <= 1e-12)
+        assert np.all((result >= 0.) & (result <= 1.))
+
+    def test_when_permutations_are_per_test(self):
+        generator = np.random.default_rng(1234)
+        greater = generator.binomial(50, generator.random(500))
+        expected = rejection_probabilities(greater, 50, 0.1)
+        result = rejection_probabilities(
+            np.concatenate([greater, [0, 0]]),
+            np.concatenate([np.full((500,), 50), [50, 10]]),
+            0.1
+        )
+        assert result[:500] == pytest.approx(expected, abs=1e-2)
+        # no exceeding permutation of fewer permutations is less certain
+        assert result[-1] < result[-2]
+
+    def test_when_alpha_is_zero(self):
+        result = rejection_probabilities(np.array([0, 5, 10]), 10, 0.)
+        assert np.all(result == 0.)
+
+    @pytest.mark.parametrize('greater, number_of_permutations, alpha', [
+        (np.array([0]), 0, 0.05),
+        (np.array([0, 1]), np.array([10, 0]), 0.05),
+        (np.array([0, 6]), np.array([10, 5]), 0.05),
+        (np.array([11]), 10, 0.05),
+        (np.array([-1]), 10, 0.05),
+        (np.array([0]), 10, 1.5)
+    ])
+    def test_when_is_invalid(
+            self,
+            greater: np.ndarray,
+            number_of_permutations: int,
+            alpha: float
+    ):
+        with pytest.raises(ValueError):
+            rejection_probabilities(greater, number_of_permutations, alpha)
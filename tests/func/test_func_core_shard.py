@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import numpy as np
+import pytest
+
+from core import UnpairedOneSidedPermutationTestPowerSimulator
+from core.shard import ShardCoordinator
+from core.shard import Study
+from core.shard import run_shard
+from core.shard import run_worker
+
+
+@pytest.fixture(scope='module')
+def study() -> Study:
+    return Study(1234, 30, 50, 10, (0.8, 0.), 1., (0.01, 0.05, 0.2))
+
+
+def _expected(study: Study):
+    simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+        seed=study.seed,
+        counter_based=True,
+        number_of_threads=1
+    )
+    return tuple(
+        simulator.simulate(
+            number_of_simulations=study.number_of_simulations,
+            number_of_permutations=study.number_of_permutations,
+            number_of_observations=study.number_of_observations,
+            means=study.means,
+            scale=study.scale,
+            alpha=alpha
+        )
+        for alpha in study.alphas
+    )
+
+
+def _run_workers(address, number_of_workers: int, **kwargs) -> list:
+    done = [0] * number_of_workers
+
+    def work(i: int):
+        done[i] = run_worker(address, **kwargs)
+
+    threads = [
+        threading.Thread(target=work, args=(i,))
+        for i in range(number_of_workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60.)
+    return done
+
+
+class TestSimulateRange:
+
+    def test_when_ranges_are_concatenated(self, study: Study):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=study.seed,
+            counter_based=True,
+            number_of_threads=1
+        )
+        parameters = dict(
+            number_of_permutations=study.number_of_permutations,
+            number_of_observations=study.number_of_observations,
+            means=study.means,
+            scale=study.scale
+        )
+        result = np.concatenate([
+            simulator.simulate_range(start=10, stop=30, **parameters),
+            simulator.simulate_range(start=0, stop=10, **parameters)
+        ])
+        expected = simulator.simulate_range(start=0, stop=30, **parameters)
+        assert np.array_equal(result, np.roll(expected, -10))
+
+    def test_when_is_not_addressable(self, study: Study):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=study.seed,
+            number_of_threads=1
+        )
+        with pytest.raises(ValueError, match='cannot simulate a range'):
+            simulator.simulate_range(
+                start=0,
+                stop=10,
+                number_of_permutations=10,
+                number_of_observations=10,
+                means=(0., 0.),
+                scale=1.
+            )
+
+    @pytest.mark.parametrize('start, stop', [(-1, 10), (5, 5)])
+    def test_when_range_is_invalid(self, study: Study, start, stop):
+        simulator = UnpairedOneSidedPermutationTestPowerSimulator.make(
+            seed=study.seed,
+            counter_based=True
+        )
+        with pytest.raises(ValueError, match='range must be'):
+            simulator.simulate_range(
+                start=start,
+                stop=stop,
+                number_of_permutations=10,
+                number_of_observations=10,
+                means=(0., 0.),
+                scale=1.
+            )
+
+
+class TestShardCoordinator:
+
+    def test_when_workers_succeed(self, study: Study):
+        with ShardCoordinator(study, shard_size=7, poll=0.01) as server:
+            done = _run_workers(server.address, 3)
+            result = server.result(timeout=60.)
+        assert sum(done) == 5
+        assert result.powers == _expected(study)
+        assert sum(result.histogram) == study.number_of_simulations
+
+    def test_when_shards_fail_once(self, study: Study):
+        failed = set()
+        lock = threading.Lock()
+
+        def flaky(study_, shard):
+            with lock:
+                first = shard.index not in failed
+                failed.add(shard.index)
+            if first:
+                raise RuntimeError('worker lost')
+            return run_shard(study_, shard)
+
+        with ShardCoordinator(study, shard_size=10, poll=0.01) as server:
+            done = _run_workers(server.address, 2, run=flaky)
+            result = server.result(timeout=60.)
+            errors = server.queue.errors
+        assert sum(done) == 3
+        assert result.powers == _expected(study)
+        assert errors == {
+            index: ['RuntimeError: worker lost'] for index in range(3)
+        }
+
+    def test_when_shard_always_fails(self, study: Study):
+        def failing(study_, shard):
+            raise RuntimeError('broken')
+
+        with ShardCoordinator(
+                study,
+                shard_size=10,
+                max_attempts=2,
+                poll=0.01
+        ) as server:
+            _run_workers(server.address, 1, run=failing)
+            with pytest.raises(RuntimeError, match='every attempt'):
+                server.result(timeout=60.)
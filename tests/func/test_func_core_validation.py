@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from core.backend import available_backends
+from core.validation import Engine
+from core.validation import EquivalenceHarness
+from core.validation import Scenario
+from core.validation import calculator_engines
+from core.validation import ks_two_sample
+from core.validation import main
+from core.validation import simulator_engines
+from core.validation import two_proportion_test
+
+
+@pytest.fixture(scope='module')
+def scenarios():
+    return [
+        Scenario(50, 50, 10, (0., 0.), 1., 0.05),
+        Scenario(50, 50, 10, (1., 0.), 1., 0.05)
+    ]
+
+
+def _uniform(name, *, exact_to=None, shift=0.):
+    # an engine of uniform p-values (shifted towards 0 by `shift`)
+    def p_values(seed, scenario):
+        generator = np.random.default_rng(seed)
+        uniforms = generator.random(scenario.number_of_simulations)
+        return np.clip(uniforms - shift, 0., 1.)
+
+    return Engine(name, p_values, exact_to)
+
+
+class TestKsTwoSample:
+
+    def test_when_samples_are_equal(self):
+        a = np.linspace(0., 1., 100)
+        statistic, p_value = ks_two_sample(a, a)
+        assert statistic == 0.
+        assert p_value == 1.
+
+    def test_when_samples_are_disjoint(self):
+        statistic, p_value = ks_two_sample(
+            np.linspace(0., 1., 100),
+            np.linspace(2., 3., 100)
+        )
+        assert statistic == 1.
+        assert p_value < 1e-10
+
+    def test_when_samples_are_drawn_from_the_same_distribution(self):
+        generator = np.random.default_rng(0)
+        _, p_value = ks_two_sample(
+            generator.random(1000),
+            generator.random(500)
+        )
+        assert p_value > 0.01
+
+    def test_when_is_empty(self):
+        with pytest.raises(ValueError):
+            ks_two_sample(np.array([]), np.array([1.]))
+
+
+class TestTwoProportionTest:
+
+    def test_when_proportions_are_equal(self):
+        z, p_value = two_proportion_test(30, 100, 60, 200)
+        assert z == pytest.approx(0.)
+        assert p_value == pytest.approx(1.)
+
+    def test_when_proportions_differ(self):
+        z, p_value = two_proportion_test(80, 100, 20, 100)
+        assert z > 0.
+        assert p_value < 1e-10
+
+    def test_when_all_trials_fail(self):
+        assert two_proportion_test(0, 10, 0, 20) == (0., 1.)
+
+    def test_when_has_no_trials(self):
+        with pytest.raises(ValueError):
+            two_proportion_test(0, 0, 0, 10)
+
+
+class TestEquivalenceHarness:
+
+    def test_when_engines_are_equivalent(self, scenarios):
+        report = EquivalenceHarness(
+            _uniform('reference'),
+            [_uniform('a'), _uniform('b', exact_to='a')],
+            seeds=range(3),
+            scenarios=scenarios
+        ).run()
+        assert report.passed
+        assert [check.kind for check in report.checks] == [
+            'ks', 'power', 'exact'
+        ] * 2
+        # Bonferroni over the two statistical checks of two scenarios
+        assert all(
+            check.threshold == 0.01 / 4
+            for check in report.checks if check.kind != 'exact'
+        )
+
+    def test_when_engine_is_biased(self, scenarios):
+        report = EquivalenceHarness(
+            _uniform('reference'),
+            [_uniform('a', shift=0.2)],
+            seeds=range(3),
+            scenarios=scenarios
+        ).run()
+        assert not report.passed
+        assert {check.kind for check in report.failures} == {'ks', 'power'}
+
+    def test_when_engine_is_not_exact(self, scenarios):
+        report = EquivalenceHarness(
+            _uniform('reference'),
+            [
+                _uniform('a'),
+                _uniform('b', exact_to='a', shift=1e-9)
+            ],
+            seeds=range(3),
+            scenarios=scenarios
+        ).run()
+        failures = report.failures
+        assert [check.kind for check in failures] == ['exact'] * 2
+        assert all(check.statistic > 0 for check in failures)
+        assert 'FAIL' in report.format()
+
+    def test_when_claims_power_only(self, scenarios):
+        engine = _uniform('a', shift=0.2)._replace(claims=('power',))
+        report = EquivalenceHarness(
+            _uniform('reference'),
+            [engine],
+            seeds=range(3),
+            scenarios=scenarios
+        ).run()
+        assert [check.kind for check in report.checks] == ['power'] * 2
+
+    @pytest.mark.parametrize('keywords', [
+        dict(seeds=[]),
+        dict(scenarios=[]),
+        dict(family_alpha=0.),
+        dict(family_alpha=1.),
+        dict(engines=[_uniform('reference')]),
+        dict(engines=[_uniform('a', exact_to='b')]),
+        dict(engines=[_uniform('a')._replace(claims=('exact',))])
+    ])
+    def test_when_is_invalid(self, scenarios, keywords):
+        arguments = dict(
+            engines=[_uniform('a')],
+            seeds=range(1),
+            scenarios=scenarios
+        )
+        arguments.update(keywords)
+        with pytest.raises(ValueError):
+            EquivalenceHarness(_uniform('reference'), **arguments)
+
+
+class TestEngines:
+    # the engines of the package against their reference
+
+    def test_simulators(self, scenarios):
+        reference, engines = simulator_engines(number_of_threads=2)
+        report = EquivalenceHarness(
+            reference,
+            engines,
+            seeds=range(2),
+            scenarios=scenarios
+        ).run()
+        assert report.passed, report.format()
+        assert {
+            check.engine for check in report.checks if check.kind == 'exact'
+        } == {'pipelined', 'threads'}
+
+    def test_calculators(self, scenarios):
+        reference, engines = calculator_engines(number_of_threads=2)
+        report = EquivalenceHarness(
+            reference,
+            engines,
+            seeds=range(2),
+            scenarios=scenarios
+        ).run()
+        assert report.passed, report.format()
+        assert {
+            check.engine for check in report.checks if check.kind == 'exact'
+        } == {'shared-memory'}
+        # compiled kernels may round the statistics differently
+        assert {
+            check.engine for check in report.checks if check.kind == 'ks'
+        } >= {
+            f'parallel-{backend}' for backend in available_backends()
+            if backend not in ('auto', 'reference', 'numpy')
+        }
+
+
+class TestMain:
+
+    def test(self, capsys):
+        code = main([
+            '--seeds', '1',
+            '--simulations', '20',
+            '--permutations', '20'
+        ])
+        assert code == 0
+        assert 'swap-chain' in capsys.readouterr().out
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from core.backend import AutoPermutationBackend
+from core.backend import BackendPolicy
+from core.backend import available_backends
+from core.backend import register_backend
+from core.backend import resolve_backend
+from core.jit import NUMBA_AVAILABLE
+
+
+@pytest.fixture(scope='module')
+def generator():
+    return np.random.default_rng(1234)
+
+
+class TestResolveBackend:
+
+    def test_when_is_unknown(self):
+        with pytest.raises(ValueError, match='backend must be one of'):
+            resolve_backend('cuda')
+
+    @pytest.mark.parametrize('name', ['reference', 'numpy'])
+    def test_when_is_free_of_compilation(self, name: str):
+        assert name in available_backends()
+        assert resolve_backend(name).name == name
+        assert not resolve_backend(name).is_compiled
+
+    def test_when_is_auto(self):
+        result = resolve_backend('auto', number_of_cores=3)
+        assert isinstance(result, AutoPermutationBackend)
+        assert result.number_of_cores == 3
+
+
+class TestRegisterBackend:
+
+    def test_when_is_registered(self):
+        with pytest.raises(ValueError, match='already registered'):
+            register_backend(resolve_backend('numpy'))
+
+
+class TestPermutationBackendCount:
+
+    @pytest.mark.parametrize('name', available_backends()[1:])
+    @pytest.mark.parametrize('sizes', [(1, 3), (10, 10), (30, 7)])
+    @pytest.mark.parametrize('number_of_permutations', [1, 500])
+    def test(self, generator, name: str, sizes, number_of_permutations: int):
+        # every backend draws the same permutations
+        centered = generator.normal(size=sum(sizes))
+        centered -= np.mean(centered)
+        uniforms = generator.random((number_of_permutations, sizes[0]))
+        result = resolve_backend(name).count(
+            centered,
+            sizes[0],
+            uniforms,
+            0.25
+        )
+        expected = resolve_backend('reference').count(
+            centered,
+            sizes[0],
+            uniforms,
+            0.25
+        )
+        assert result == expected
+
+    @pytest.mark.parametrize('name', available_backends()[1:])
+    def test_when_statistic_cannot_be_computed(self, name: str):
+        result = resolve_backend(name).count(
+            np.zeros((4,)),
+            2,
+            np.full((10, 2), 0.5),
+            0.
+        )
+        assert result == (0, 0, 0)
+
+
+class TestAutoPermutationBackend:
+
+    @pytest.fixture(scope='function')
+    def policy(self) -> BackendPolicy:
+        return BackendPolicy(small_work=100, large_work=10000)
+
+    def test_when_is_small(self, policy: BackendPolicy):
+        backend = AutoPermutationBackend(number_of_cores=4, policy=policy)
+        assert backend.select(10, 9).name == 'numpy'
+
+    @pytest.mark.skipif(not NUMBA_AVAILABLE, reason='numba is missing')
+    @pytest.mark.parametrize(
+        'number_of_cores,expected',
+        [(1, 'numba'), (4, 'numba-parallel')]
+    )
+    def test_when_is_large(
+            self,
+            policy: BackendPolicy,
+            number_of_cores: int,
+            expected: str
+    ):
+        backend = AutoPermutationBackend(
+            number_of_cores=number_of_cores,
+            policy=policy
+        )
+        assert backend.select(100, 100).name == expected
+
+    @pytest.mark.skipif(not NUMBA_AVAILABLE, reason='numba is missing')
+    def test_when_is_medium(self, policy: BackendPolicy):
+        backend = AutoPermutationBackend(number_of_cores=4, policy=policy)
+        assert backend.select(10, 10).name == 'numba'
+
+
+class TestIPermutationBackendSelect:
+
+    def test(self):
+        backend = resolve_backend('numpy')
+        assert backend.select(10 ** 6, 10 ** 6) is backend
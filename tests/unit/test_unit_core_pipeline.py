@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import time
+from threading import Lock
+
+import pytest
+
+from core.pipeline import SimulationPipeline
+
+
+class TestSimulationPipeline:
+
+    @pytest.mark.parametrize(
+        'name',
+        ['number_of_generators', 'number_of_testers', 'batch_size', 'capacity']
+    )
+    def test_when_is_not_strictly_positive(self, name: str):
+        arguments = dict(number_of_generators=1, number_of_testers=1)
+        arguments[name] = 0
+        with pytest.raises(ValueError, match=name):
+            SimulationPipeline(**arguments)
+
+    def test_when_capacity_is_none(self):
+        pipeline = SimulationPipeline(
+            number_of_generators=1,
+            number_of_testers=3
+        )
+        assert pipeline.capacity == 6
+
+    @pytest.mark.parametrize('batch_size', [1, 3, 100])
+    @pytest.mark.parametrize('number_of_workers', [1, 3])
+    def test(self, batch_size: int, number_of_workers: int):
+        tested = {}
+        pipeline = SimulationPipeline(
+            number_of_generators=number_of_workers,
+            number_of_testers=number_of_workers,
+            batch_size=batch_size
+        )
+        result = pipeline.run(
+            5,
+            42,
+            lambda i: i * i,
+            lambda i, item: tested.__setitem__(i, item)
+        )
+        assert tested == {i: i * i for i in range(5, 42)}
+        assert 0. <= result.generation <= 1.
+        assert 0. <= result.testing <= 1.
+        assert result.wall_time > 0.
+
+    def test_when_is_empty(self):
+        tested = []
+        SimulationPipeline(
+            number_of_generators=2,
+            number_of_testers=2
+        ).run(3, 3, lambda i: i, lambda i, item: tested.append(i))
+        assert tested == []
+
+    def test_when_generate_raises(self):
+        def generate(i: int) -> int:
+            if i == 7:
+                raise ValueError('generate')
+            return i
+
+        pipeline = SimulationPipeline(
+            number_of_generators=2,
+            number_of_testers=2,
+            batch_size=2
+        )
+        with pytest.raises(ValueError, match='generate'):
+            pipeline.run(0, 100, generate, lambda i, item: None)
+
+    def test_when_test_raises(self):
+        def test(i: int, item: int):
+            raise ValueError('test')
+
+        pipeline = SimulationPipeline(
+            number_of_generators=2,
+            number_of_testers=1,
+            capacity=1
+        )
+        with pytest.raises(ValueError, match='test'):
+            pipeline.run(0, 1000, lambda i: i, test)
+
+    def test_when_testing_is_slower(self):
+        # the generators are blocked by the bounded queue, thus at most
+        # `capacity` batches are pending, besides those being handled
+        lock = Lock()
+        counts = {'generated': 0, 'tested': 0, 'pending': 0}
+
+        def generate(i: int) -> int:
+            with lock:
+                counts['generated'] += 1
+                counts['pending'] = max(
+                    counts['pending'],
+                    counts['generated'] - counts['tested']
+                )
+            return i
+
+        def test(i: int, item: int):
+            time.sleep(1e-3)
+            with lock:
+                counts['tested'] += 1
+
+        result = SimulationPipeline(
+            number_of_generators=2,
+            number_of_testers=1,
+            batch_size=1,
+            capacity=2
+        ).run(0, 50, generate, test)
+        assert counts['tested'] == 50
+        # queued, being tested and being generated
+        assert counts['pending'] <= 2 + 1 + 2
+        assert result.testing > result.generation
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from core.backend import BackendPolicy
+from core.profile import PROFILE_ENVIRONMENT_VARIABLE
+from core.profile import TuningProfile
+from core.profile import current_machine
+from core.profile import load_profile
+from core.profile import profile_path
+from core.profile import save_profile
+
+
+@pytest.fixture(scope='function')
+def profile() -> TuningProfile:
+    return TuningProfile(
+        4,
+        'auto',
+        16,
+        BackendPolicy(100, 1000),
+        current_machine()
+    )
+
+
+class TestProfilePath:
+
+    def test_when_environment_variable_is_set(self, monkeypatch):
+        monkeypatch.setenv(PROFILE_ENVIRONMENT_VARIABLE, '/tmp/profile.json')
+        assert profile_path() == '/tmp/profile.json'
+
+    def test_when_environment_variable_is_not_set(self, monkeypatch):
+        monkeypatch.delenv(PROFILE_ENVIRONMENT_VARIABLE)
+        assert profile_path().endswith('profile.json')
+
+
+class TestLoadProfile:
+
+    def test_when_is_missing(self, tmp_path):
+        assert load_profile(str(tmp_path / 'profile.json')) is None
+
+    def test_when_is_saved(self, tmp_path, profile: TuningProfile):
+        path = save_profile(profile, str(tmp_path / 'ptsp' / 'profile.json'))
+        assert load_profile(path) == profile
+
+    def test_when_backend_is_none(self, tmp_path, profile: TuningProfile):
+        profile = profile._replace(backend=None)
+        path = save_profile(profile, str(tmp_path / 'profile.json'))
+        assert load_profile(path) == profile
+
+    def test_when_is_in_environment_variable(
+            self,
+            monkeypatch,
+            tmp_path,
+            profile: TuningProfile
+    ):
+        path = str(tmp_path / 'profile.json')
+        monkeypatch.setenv(PROFILE_ENVIRONMENT_VARIABLE, path)
+        save_profile(profile)
+        assert load_profile() == profile
+
+    def test_when_is_of_another_machine(
+            self,
+            tmp_path,
+            profile: TuningProfile
+    ):
+        path = save_profile(
+            profile._replace(machine='elsewhere'),
+            str(tmp_path / 'profile.json')
+        )
+        assert load_profile(path) is None
+
+    @pytest.mark.parametrize(
+        'content',
+        ['not json', '[1, 2]', json.dumps({'number_of_threads': 1})]
+    )
+    def test_when_is_not_a_profile(self, tmp_path, content: str):
+        path = tmp_path / 'profile.json'
+        path.write_text(content)
+        with pytest.raises(ValueError, match='profile'):
+            load_profile(str(path))
+
+    def test_when_number_of_threads_is_not_strictly_positive(
+            self,
+            profile: TuningProfile
+    ):
+        data = profile.to_dict()
+        data['number_of_threads'] = 0
+        with pytest.raises(ValueError, match='number_of_threads'):
+            TuningProfile.from_dict(data)
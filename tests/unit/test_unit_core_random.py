@@ -6,10 +6,18 @@ from math import nan, inf
 
 import numpy as np
 import pytest
+from numpy.random import Generator
 from numpy.random import PCG64
 
+from core.random import AntitheticNormalGenerator
 from core.random import NumpyNormalGenerator
 from core.random import NumpyRandomPermutator
+from core.random import PhiloxRandomPermutator
+from core.random import PhiloxStreams
+from core.random import ScrambledHaltonNormalGenerator
+from core.random import ScrambledHaltonSequence
+from core.random import group_sums_from_indices
+from core.random import index_dtype
 from core.vector import Vector
 
 
@@ -132,3 +140,234 @@ class TestNumpyRandomPermutatorPermute:
         assert first in all_permutations
         assert second in all_permutations
         assert first != second
+
+
+class TestRandomPermutatorPermuteBatch:
+
+    @pytest.mark.parametrize('make', [
+        lambda: NumpyRandomPermutator(PCG64(seed=1234)),
+        lambda: PhiloxRandomPermutator(PhiloxStreams(1234), 3)
+    ])
+    def test_draws_the_permutations_of_permute(self, make):
+        indices = Vector(np.arange(10, dtype=np.float_))
+        expected = make()
+        result = make().permute_batch(10, 5)
+        assert result.dtype == np.uint16
+        assert result.shape == (5, 10)
+        for row in result:
+            assert np.array_equal(row, expected.permute(indices).data)
+
+    def test_when_is_empty(self):
+        permutator = NumpyRandomPermutator(PCG64(seed=1234))
+        assert permutator.permute_batch(0, 3).shape == (3, 0)
+        assert permutator.permute_batch(5, 0).shape == (0, 5)
+
+
+class TestIndexDtype:
+
+    @pytest.mark.parametrize('size, expected', [
+        (0, np.uint16),
+        (2 ** 16, np.uint16),
+        (2 ** 16 + 1, np.uint32),
+        (2 ** 32, np.uint32)
+    ])
+    def test(self, size: int, expected):
+        assert index_dtype(size) == np.dtype(expected)
+
+    @pytest.mark.parametrize('size', [-1, 2 ** 32 + 1])
+    def test_when_is_invalid(self, size: int):
+        with pytest.raises(ValueError):
+            index_dtype(size)
+
+
+class TestGroupSums:
+
+    @pytest.fixture(scope='function')
+    def data(self) -> np.ndarray:
+        return np.random.default_rng(1234).normal(size=21)
+
+    @pytest.fixture(scope='function')
+    def indices(self) -> np.ndarray:
+        return NumpyRandomPermutator(PCG64(seed=1234)).permute_batch(21, 50)
+
+    @pytest.mark.parametrize('group_size', [0, 1, 8, 13, 21])
+    def test(
+            self,
+            data: np.ndarray,
+            indices: np.ndarray,
+            group_size: int
+    ):
+        first = data[indices[:, :group_size].astype(np.intp)]
+        expected = np.sum(first, axis=1), np.sum(first * first, axis=1)
+        result = group_sums_from_indices(data, indices, group_size)
+        assert np.allclose(result[0], expected[0])
+        assert np.allclose(result[1], expected[1])
+
+
+class TestPhiloxStreams:
+
+    @pytest.fixture(scope='class')
+    def streams(self) -> PhiloxStreams:
+        return PhiloxStreams(1234)
+
+    def test_when_seed_is_negative(self):
+        with pytest.raises(ValueError, match='seed must be non-negative'):
+            PhiloxStreams(-1)
+
+    @pytest.mark.parametrize('simulation', [-1, -2])
+    def test_when_simulation_is_negative(
+            self,
+            streams: PhiloxStreams,
+            simulation: int
+    ):
+        with pytest.raises(ValueError, match='simulation must be non-neg'):
+            streams.samples(simulation)
+        with pytest.raises(ValueError, match='simulation must be non-neg'):
+            streams.permutation(simulation, 0)
+
+    def test_when_permutation_is_negative(self, streams: PhiloxStreams):
+        with pytest.raises(ValueError, match='permutation must be non-neg'):
+            streams.permutation(0, -1)
+
+    def test_samples_are_addressable(self, streams: PhiloxStreams):
+        first = Generator(streams.samples(3)).random(5)
+        second = Generator(PhiloxStreams(1234).samples(3)).random(5)
+        assert np.array_equal(first, second)
+
+    def test_streams_are_distinct(self, streams: PhiloxStreams):
+        draws = [
+            Generator(streams.samples(0)).random(),
+            Generator(streams.samples(1)).random(),
+            Generator(streams.permutation(0, 0)).random(),
+            Generator(streams.permutation(0, 1)).random(),
+            Generator(streams.permutation(1, 0)).random(),
+            Generator(PhiloxStreams(4321).samples(0)).random()
+        ]
+        assert len(set(draws)) == len(draws)
+
+    def test_seek_permutation(self, streams: PhiloxStreams):
+        expected = Generator(streams.permutation(7, 11)).random(9)
+        bit_generator = streams.permutation(0, 0)
+        Generator(bit_generator).random(3)  # moves the stream!
+        streams.seek_permutation(bit_generator, 7, 11)
+        result = Generator(bit_generator).random(9)
+        assert np.array_equal(result, expected)
+
+
+class TestPhiloxRandomPermutatorPermute:
+
+    @pytest.fixture(scope='class')
+    def vector(self) -> Vector:
+        return Vector.from_sequence(np.arange(20.))
+
+    def test_when_is_of_size_greater_than_one(self, vector: Vector):
+        permutator = PhiloxRandomPermutator(PhiloxStreams(1234), 0)
+        first = permutator.permute(vector)
+        second = permutator.permute(vector)
+        assert np.array_equal(np.sort(first.data), vector.data)
+        assert first != second
+
+    def test_permutations_are_addressable(self, vector: Vector):
+        streams = PhiloxStreams(1234)
+        first = PhiloxRandomPermutator(streams, 5)
+        second = PhiloxRandomPermutator(streams, 5)
+        other = PhiloxRandomPermutator(streams, 6)
+        result = [first.permute(vector) for _ in range(3)]
+        other.permute(vector)  # does not affect the others!
+        expected = [second.permute(vector) for _ in range(3)]
+        assert result == expected
+
+
+class TestAntitheticNormalGeneratorGenerate:
+
+    def test_when_not_negated(self):
+        result = AntitheticNormalGenerator(
+            PCG64(seed=1234),
+            negate=False
+        ).generate(size=10, mean=1., scale=2.)
+        expected = NumpyNormalGenerator(
+            PCG64(seed=1234)
+        ).generate(size=10, mean=1., scale=2.)
+        assert np.allclose(result.data, expected.data, rtol=1e-12, atol=0.)
+
+    def test_when_negated(self):
+        first = AntitheticNormalGenerator(
+            PCG64(seed=1234),
+            negate=False
+        ).generate(size=10, mean=1., scale=2.)
+        second = AntitheticNormalGenerator(
+            PCG64(seed=1234),
+            negate=True
+        ).generate(size=10, mean=1., scale=2.)
+        assert np.allclose(first.data + second.data, 2., rtol=0., atol=1e-12)
+
+    def test_size_validity(self):
+        generator = AntitheticNormalGenerator(PCG64(seed=1234), negate=True)
+        with pytest.raises(ValueError, match='size must be strictly positive'):
+            generator.generate(size=0, mean=0., scale=1.)
+
+
+class TestScrambledHaltonSequence:
+
+    @pytest.fixture(scope='class')
+    def points(self) -> np.ndarray:
+        sequence = ScrambledHaltonSequence(1234)
+        return np.array([sequence.point(i, range(8)) for i in range(1024)])
+
+    def test_when_seed_is_negative(self):
+        with pytest.raises(ValueError, match='seed must be non-negative'):
+            ScrambledHaltonSequence(-1)
+
+    def test_points_are_in_unit_interval(self, points: np.ndarray):
+        assert np.all((0. <= points) & (points < 1.))
+
+    def test_points_are_evenly_spread(self, points: np.ndarray):
+        # each tenth of each dimension holds about a tenth of the points,
+        # much closer than independent points would
+        counts = np.stack([
+            np.histogram(points[:, d], bins=10, range=(0., 1.))[0]
+            for d in range(points.shape[1])
+        ])
+        assert np.all(np.abs(counts - 102.4) <= 5.)
+
+    def test_does_not_depend_on_order(self, points: np.ndarray):
+        sequence = ScrambledHaltonSequence(1234)
+        late = sequence.point(1000, range(4, 8))  # extends first!
+        assert np.array_equal(late, points[1000, 4:])
+
+
+class TestScrambledHaltonNormalGeneratorGenerate:
+
+    def test_successive_dimensions(self):
+        sequence = ScrambledHaltonSequence(1234)
+        generator = ScrambledHaltonNormalGenerator(sequence, 5)
+        first = generator.generate(size=3, mean=0., scale=1.)
+        second = generator.generate(size=2, mean=0., scale=1.)
+        whole = ScrambledHaltonNormalGenerator(sequence, 5).generate(
+            size=5,
+            mean=0.,
+            scale=1.
+        )
+        assert Vector.concatenate((first, second)) == whole
+
+    @pytest.mark.parametrize('mean', [-inf, nan])
+    def test_mean_validity(self, mean: float):
+        generator = ScrambledHaltonNormalGenerator(
+            ScrambledHaltonSequence(1234),
+            0
+        )
+        with pytest.raises(ValueError, match='mean must be finite'):
+            generator.generate(size=1, mean=mean, scale=1.)
+
+    def test_parameter_passing(self):
+        sequence = ScrambledHaltonSequence(1234)
+        draws = np.array([
+            ScrambledHaltonNormalGenerator(sequence, i).generate(
+                size=2,
+                mean=1.,
+                scale=2.
+            ).data
+            for i in range(4096)
+        ])
+        assert _almost_equal(np.mean(draws), 1., tolerance=1e-2)
+        assert _almost_equal(np.std(draws), 2., tolerance=1e-2)
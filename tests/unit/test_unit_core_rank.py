@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+
+import numpy as np
+import pytest
+from numpy.random import PCG64
+
+from core.permutation import OneSidedPermutationTestPValueCalculator
+from core.rank import RankSumNullCache
+from core.rank import RankSumNullDistribution
+from core.rank import RankSumPValueCalculator
+from core.rank import RankSumStatisticCalculator
+from core.random import NumpyRandomPermutator
+from core.vector import Vector
+
+
+def _enumerated(size_a: int, size_b: int) -> np.ndarray:
+    # distribution of U by enumeration of the ranks of the first sample
+    counts = np.zeros((size_a * size_b + 1,))
+    for ranks in itertools.combinations(range(1, size_a + size_b + 1), size_a):
+        counts[sum(ranks) - size_a * (size_a + 1) // 2] += 1
+    return counts / np.sum(counts)
+
+
+class TestRankSumStatisticCalculator:
+
+    @pytest.fixture(scope='function')
+    def calculator(self) -> RankSumStatisticCalculator:
+        return RankSumStatisticCalculator()
+
+    def test_calculate(self, calculator: RankSumStatisticCalculator):
+        samples = (
+            Vector.from_sequence([3., 1., 5.]),
+            Vector.from_sequence([2., 4.])
+        )
+        # the pairs (3, 2), (5, 2) and (5, 4)
+        assert calculator.calculate(samples) == 3.
+
+    def test_calculate_when_has_ties(
+            self,
+            calculator: RankSumStatisticCalculator
+    ):
+        samples = (
+            Vector.from_sequence([2., 3.]),
+            Vector.from_sequence([2., 1.])
+        )
+        assert calculator.calculate(samples) == 3.5
+
+    def test_calculate_when_is_empty(
+            self,
+            calculator: RankSumStatisticCalculator
+    ):
+        with pytest.raises(ValueError):
+            calculator.calculate(
+                (Vector.empty(), Vector.from_sequence([1.]))
+            )
+
+    def test_calculate_batch(self, calculator: RankSumStatisticCalculator):
+        concatenated = Vector(np.random.default_rng(0).normal(size=7))
+        assignments = np.stack([
+            np.random.default_rng(i).permutation(7) for i in range(10)
+        ])
+        expected = [
+            calculator.calculate(
+                Vector(concatenated.data[assignment]).split(3)
+            )
+            for assignment in assignments
+        ]
+        result = calculator.calculate_batch(concatenated, 3, assignments)
+        np.testing.assert_array_equal(result, expected)
+
+
+class TestRankSumNullDistribution:
+
+    @pytest.mark.parametrize('size_a, size_b', [
+        (1, 1), (1, 6), (6, 2), (3, 4), (5, 5), (4, 7)
+    ])
+    def test_compute(self, size_a: int, size_b: int):
+        distribution = RankSumNullDistribution.compute(size_a, size_b)
+        np.testing.assert_allclose(
+            distribution.probabilities,
+            _enumerated(size_a, size_b),
+            rtol=0.,
+            atol=1e-14
+        )
+
+    def test_compute_when_is_large(self):
+        probabilities = RankSumNullDistribution.compute(
+            100,
+            80
+        ).probabilities
+        assert np.all(probabilities >= 0.)
+        assert np.sum(probabilities) == pytest.approx(1.)
+        u = np.arange(probabilities.size)
+        assert np.sum(u * probabilities) == pytest.approx(100 * 80 / 2.)
+        assert np.sum((u - 4000.) ** 2 * probabilities) == pytest.approx(
+            100 * 80 * 181 / 12.
+        )
+        # the tails are accurate relatively, eg. U = 0 and U = 1 have a
+        # single assignment of ranks each, of probability 1 / C(180, 80)
+        assert probabilities[-1] == probabilities[0]
+        assert probabilities[1] == pytest.approx(probabilities[0])
+        assert np.log(probabilities[0]) == pytest.approx(
+            -np.sum(np.log(np.arange(101, 181) / np.arange(1, 81)))
+        )
+
+    @pytest.mark.parametrize('size_a, size_b', [(0, 3), (3, -1)])
+    def test_compute_when_is_invalid(self, size_a: int, size_b: int):
+        with pytest.raises(ValueError, match='sizes must be strictly'):
+            RankSumNullDistribution.compute(size_a, size_b)
+
+    def test_p_value(self):
+        distribution = RankSumNullDistribution.compute(2, 2)
+        # U is 0, 1, 2, 2, 3, 4 for the six ranks of the first sample
+        assert distribution.p_value(4.) == 0.
+        assert distribution.p_value(3.) == pytest.approx(1. / 6.)
+        assert distribution.p_value(1.5) == pytest.approx(4. / 6.)
+        assert distribution.p_value(-1.) == pytest.approx(1.)
+
+    def test_lower_p_value(self):
+        distribution = RankSumNullDistribution.compute(2, 2)
+        assert distribution.lower_p_value(0.) == 0.
+        assert distribution.lower_p_value(1.) == pytest.approx(1. / 6.)
+        assert distribution.lower_p_value(2.5) == pytest.approx(4. / 6.)
+        assert distribution.lower_p_value(5.) == pytest.approx(1.)
+
+
+class TestRankSumNullCache:
+
+    def test_get(self):
+        cache = RankSumNullCache()
+        first = cache.get(3, 5)
+        second = cache.get(5, 3)  # symmetric!
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert second.probabilities is first.probabilities
+        assert (second.size_a, second.size_b) == (5, 3)
+
+    def test_get_when_is_full(self):
+        cache = RankSumNullCache(maxsize=2)
+        cache.get(1, 2)
+        cache.get(1, 3)
+        cache.get(1, 2)
+        cache.get(1, 4)  # evicts (1, 3)!
+        assert len(cache) == 2
+        cache.get(1, 2)
+        cache.get(1, 3)
+        assert (cache.hits, cache.misses) == (2, 4)
+
+    def test_get_when_is_persisted(self, tmp_path):
+        RankSumNullCache(directory=str(tmp_path)).get(4, 6)
+        assert [path.name for path in tmp_path.iterdir()] == [
+            'rank_sum_4_6.npy'
+        ]
+        cache = RankSumNullCache(directory=str(tmp_path))
+        np.testing.assert_array_equal(
+            cache.get(6, 4).probabilities,
+            RankSumNullDistribution.compute(4, 6).probabilities
+        )
+
+    def test_get_when_file_is_invalid(self, tmp_path):
+        np.save(str(tmp_path / 'rank_sum_4_6.npy'), np.ones((3,)))
+        with pytest.raises(ValueError, match='file must hold'):
+            RankSumNullCache(directory=str(tmp_path)).get(4, 6)
+
+    def test_when_maxsize_is_not_strictly_positive(self):
+        with pytest.raises(ValueError, match='maxsize must be strictly'):
+            RankSumNullCache(maxsize=0)
+
+
+class TestRankSumPValueCalculator:
+
+    @pytest.fixture(scope='function')
+    def calculator(self) -> RankSumPValueCalculator:
+        return RankSumPValueCalculator.make(cache=RankSumNullCache())
+
+    def test_make(self):
+        assert RankSumPValueCalculator.make().cache is (
+            RankSumPValueCalculator.make().cache
+        )
+
+    def test_test(self, calculator: RankSumPValueCalculator):
+        generator = np.random.default_rng(1234)
+        samples = (
+            Vector(generator.normal(0.5, 1., size=12)),
+            Vector(generator.normal(0., 1., size=9))
+        )
+        result = calculator.test(0, samples)
+        assert result.statistic == (
+            RankSumStatisticCalculator().calculate(samples)
+        )
+        assert (result.greater, result.permutations) == (0, 0)
+        # the permutation test of the same statistic converges to it
+        expected = OneSidedPermutationTestPValueCalculator.make(
+            RankSumStatisticCalculator(),
+            NumpyRandomPermutator(PCG64(seed=1234))
+        ).calculate(20000, samples)
+        assert result.p_value == pytest.approx(expected, abs=0.01)
+        assert calculator.cache.misses == 1
+
+    def test_test_alternatives(self, calculator: RankSumPValueCalculator):
+        samples = (
+            Vector.from_sequence([0.5, 4., 3.]),
+            Vector.from_sequence([1., 2.])
+        )
+        result = calculator.test_alternatives(0, samples)
+        # U = 4 of 0, ..., 6, with counts 1, 1, 2, 2, 2, 1, 1
+        assert result.statistic == 4.
+        assert result.greater == pytest.approx(2. / 10.)
+        assert result.less == pytest.approx(6. / 10.)
+        assert result.two_sided == pytest.approx(4. / 10.)
+        assert result.greater == calculator.calculate(0, samples)
+
+    def test_test_when_has_ties(self, calculator: RankSumPValueCalculator):
+        samples = (
+            Vector.from_sequence([1., 2.]),
+            Vector.from_sequence([2., 3.])
+        )
+        with pytest.raises(ValueError, match='ties'):
+            calculator.test(0, samples)
+
+    def test_test_when_is_empty(self, calculator: RankSumPValueCalculator):
+        with pytest.raises(ValueError):
+            calculator.test(0, (Vector.empty(), Vector.from_sequence([1.])))
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from core.shard import PartialResult
+from core.shard import Shard
+from core.shard import ShardQueue
+from core.shard import Study
+from core.shard import merge
+from core.shard import plan_shards
+
+
+@pytest.fixture(scope='module')
+def study() -> Study:
+    return Study(1234, 10, 50, 10, (0.5, 0.), 1., (0.01, 0.05))
+
+
+def _partial(shard: Shard, rejections=(1, 2)) -> PartialResult:
+    return PartialResult(
+        shard,
+        rejections,
+        (shard.stop - shard.start,),
+        1.,
+        'worker'
+    )
+
+
+class _Clock:
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPlanShards:
+
+    def test(self):
+        assert plan_shards(10, 4) == [
+            Shard(0, 0, 4),
+            Shard(1, 4, 8),
+            Shard(2, 8, 10)
+        ]
+
+    @pytest.mark.parametrize('number_of_simulations, shard_size', [
+        (0, 4),
+        (10, 0)
+    ])
+    def test_when_is_invalid(self, number_of_simulations, shard_size):
+        with pytest.raises(ValueError):
+            plan_shards(number_of_simulations, shard_size)
+
+
+class TestSerialization:
+
+    def test_study(self, study: Study):
+        assert Study.from_dict(study.to_dict()) == study
+
+    def test_partial_result(self):
+        partial = _partial(Shard(1, 4, 8))
+        assert PartialResult.from_dict(partial.to_dict()) == partial
+
+    @pytest.mark.parametrize('cls', [Study, PartialResult])
+    def test_when_is_invalid(self, cls):
+        with pytest.raises(ValueError):
+            cls.from_dict({'seed': 'x'})
+
+
+class TestMerge:
+
+    def test(self, study: Study):
+        result = merge(
+            study,
+            [_partial(shard) for shard in reversed(plan_shards(10, 4))]
+        )
+        assert result.powers == (0.3, 0.6)
+        assert result.number_of_simulations == 10
+        assert result.histogram == (10,)
+        assert result.seconds == 3.
+
+    @pytest.mark.parametrize('shards', [
+        [],
+        [Shard(0, 0, 4)],
+        [Shard(0, 0, 4), Shard(1, 4, 8), Shard(1, 4, 8), Shard(2, 8, 10)],
+        [Shard(0, 0, 6), Shard(1, 4, 10)]
+    ])
+    def test_when_shards_do_not_cover(self, study: Study, shards):
+        with pytest.raises(ValueError):
+            merge(study, [_partial(shard) for shard in shards])
+
+
+class TestShardQueue:
+
+    def test_when_shards_are_done(self):
+        shards = plan_shards(10, 4)
+        queue = ShardQueue(shards)
+        acquired = [queue.acquire() for _ in shards]
+        assert acquired == shards
+        assert queue.acquire() is None
+        for shard in acquired:
+            queue.complete(_partial(shard))
+        assert queue.is_done()
+        assert queue.wait(timeout=1.)
+        assert [partial.shard for partial in queue.partials] == shards
+
+    def test_when_shard_fails(self):
+        queue = ShardQueue(plan_shards(4, 4), max_attempts=2)
+        shard = queue.acquire()
+        queue.fail(shard, 'first')
+        assert queue.acquire() == shard  # retried!
+        queue.fail(shard, 'second')
+        assert queue.acquire() is None
+        assert queue.has_failed()
+        assert not queue.wait(timeout=1.)
+        assert queue.errors == {0: ['first', 'second']}
+
+    def test_when_lease_expires(self):
+        clock = _Clock()
+        queue = ShardQueue(plan_shards(8, 4), lease=10., clock=clock)
+        first = queue.acquire()
+        second = queue.acquire()
+        queue.complete(_partial(second))
+        clock.now = 11.
+        assert queue.acquire() == first  # retried!
+        assert queue.errors == {0: ['lease expired']}
+        # the late result of the expired lease is accepted once
+        queue.complete(_partial(first))
+        queue.complete(_partial(first, rejections=(4, 4)))
+        assert queue.is_done()
+        assert queue.partials[0].rejections == (1, 2)
+
+    def test_when_shard_is_unknown(self):
+        queue = ShardQueue(plan_shards(8, 4))
+        with pytest.raises(ValueError):
+            queue.complete(_partial(Shard(0, 0, 3)))
+
+    def test_when_times_out(self):
+        queue = ShardQueue(plan_shards(8, 4))
+        queue.acquire()
+        with pytest.raises(TimeoutError):
+            queue.wait(timeout=0.2)
+
+    @pytest.mark.parametrize('max_attempts, lease', [(0, 1.), (1, 0.)])
+    def test_when_is_invalid(self, max_attempts, lease):
+        with pytest.raises(ValueError):
+            ShardQueue([], max_attempts=max_attempts, lease=lease)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from core.storage import SimulationStore
+
+
+class TestSimulationStore:
+
+    @pytest.fixture(scope='function')
+    def path(self, tmp_path) -> str:
+        return str(tmp_path / 'simulations.npy')
+
+    def test_when_without_statistics(self, path: str):
+        store = SimulationStore.create(path, 4)
+        store.p_values[:] = [0.1, 0.2, 0.3, 0.4]
+        store.flush()
+        result = SimulationStore.open(path)
+        assert not result.has_statistics
+        assert result.statistics is None
+        assert np.array_equal(result.p_values, [0.1, 0.2, 0.3, 0.4])
+        assert np.array_equal(np.load(path), [0.1, 0.2, 0.3, 0.4])
+
+    def test_when_with_statistics(self, path: str):
+        store = SimulationStore.create(path, 2, statistics=True)
+        store.p_values[:] = [0.1, 0.2]
+        store.statistics[:] = [1.5, -0.5]
+        store.flush()
+        result = SimulationStore.open(path)
+        assert result.has_statistics
+        assert np.array_equal(result.p_values, [0.1, 0.2])
+        assert np.array_equal(result.statistics, [1.5, -0.5])
+
+    def test_when_is_not_a_store(self, path: str):
+        np.save(path, np.zeros((2, 2)))
+        with pytest.raises(ValueError, match='one-dimensional array'):
+            SimulationStore.open(path)
+
+    def test_powers(self, path: str):
+        store = SimulationStore.create(path, 4)
+        store.p_values[:] = [0.01, 0.04, 0.05, 0.5]
+        assert store.powers((0., 0.05, 0.1, 1.)) == (0., 0.5, 0.75, 1.)
+        assert store.power(0.05) == 0.5
+
+    @pytest.mark.parametrize('alpha', [-0.1, 1.1, np.nan])
+    def test_when_alpha_is_not_between_zero_and_one(
+            self,
+            path: str,
+            alpha: float
+    ):
+        store = SimulationStore.create(path, 1)
+        with pytest.raises(ValueError, match='alpha must be in'):
+            store.power(alpha)
+
+    def test_histogram(self, path: str):
+        store = SimulationStore.create(path, 4)
+        store.p_values[:] = [0.01, 0.3, 0.7, 1.]
+        counts, edges = store.histogram(bins=2)
+        assert np.array_equal(counts, [2, 2])
+        assert np.array_equal(edges, [0., .5, 1.])
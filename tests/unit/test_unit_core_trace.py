@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+
+import pytest
+
+from core.trace import ChromeTracer
+from core.trace import NullTracer
+from core.trace import current_tracer
+from core.trace import tracing
+
+
+class TestNullTracer:
+
+    def test_span(self):
+        tracer = NullTracer()
+        # a shared span, nothing is recorded
+        assert tracer.span('a', category='chunk') is (
+            tracer.span('b', category='test', start=0)
+        )
+        with tracer.span('a', category='chunk'):
+            pass
+        assert not tracer.is_enabled
+
+
+class TestChromeTracer:
+
+    def test_span(self):
+        tracer = ChromeTracer()
+        with tracer.span('outer', category='simulate', size=3):
+            with tracer.span('inner', category='chunk'):
+                pass
+        inner, outer, thread = tracer.events
+        assert (inner['name'], inner['cat'], inner['ph']) == (
+            'inner', 'chunk', 'X'
+        )
+        assert outer['args'] == {'size': 3}
+        assert 'args' not in inner
+        assert outer['ts'] <= inner['ts']
+        assert inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+        assert thread == {
+            'name': 'thread_name',
+            'ph': 'M',
+            'pid': outer['pid'],
+            'tid': 0,
+            'args': {'name': threading.current_thread().name}
+        }
+
+    def test_span_when_raises(self):
+        tracer = ChromeTracer()
+        with pytest.raises(RuntimeError):
+            with tracer.span('failed', category='chunk'):
+                raise RuntimeError
+        assert tracer.events[0]['name'] == 'failed'
+
+    def test_span_when_has_many_threads(self):
+        tracer = ChromeTracer()
+
+        def work():
+            with tracer.span('work', category='chunk'):
+                pass
+
+        threads = [
+            threading.Thread(target=work, name=f'worker-{i}')
+            for i in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        names = {
+            event['args']['name'] for event in tracer.events
+            if event['ph'] == 'M'
+        }
+        assert names == {'worker-0', 'worker-1', 'worker-2'}
+
+    def test_write(self, tmp_path):
+        tracer = ChromeTracer()
+        with tracer.span('a', category='chunk', start=0, stop=10):
+            pass
+        tracer.write(str(tmp_path / 'trace.json'))
+        with open(tmp_path / 'trace.json') as file:
+            loaded = json.load(file)
+        assert loaded == tracer.to_dict()
+        assert loaded['traceEvents'][0]['args'] == {'start': 0, 'stop': 10}
+
+
+class TestTracing:
+
+    def test(self):
+        assert not current_tracer().is_enabled
+        with tracing() as tracer:
+            assert current_tracer() is tracer
+            assert isinstance(tracer, ChromeTracer)
+            with tracing(NullTracer()):
+                assert not current_tracer().is_enabled
+            assert current_tracer() is tracer
+        assert not current_tracer().is_enabled
@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 
-from typing import Iterable
+from math import isnan
+from typing import Iterable, Tuple
 
+import numpy as np
 import pytest
 
+from core.ttest import DifferenceInMeansStatisticCalculator
+from core.ttest import ITwoSampleTTestStatisticCalculator
 from core.ttest import UnpairedSimilarVarTTestStatisticCalculator
+from core.ttest import UnpairedWelchTTestStatisticCalculator
+from core.ttest import t_statistic_from_sums
 from core.variance import IPooledVarianceCalculator
 from core.variance import UnbiasedPooledVarianceCalculator
 from core.vector import Vector
@@ -82,3 +88,226 @@ class TestUnpairedSimilarVarTTestStatisticCalculatorCalculate:
             Vector.from_sequence([2., 2.])
         ))
         assert result == 1.5
+
+
+class TestTStatisticFromSums:
+
+    @pytest.mark.parametrize(
+        'a, b',
+        [
+            ([1., 2., 3.], [4., 5., 6.]),
+            ([1., 2., 3.], [4., 5.]),
+            ([1.], [3., -2., 5.])
+        ]
+    )
+    def test_when_compared_to_calculator(self, a, b):
+        expected = UnpairedSimilarVarTTestStatisticCalculator.make().calculate(
+            (Vector.from_sequence(a), Vector.from_sequence(b))
+        )
+        result = t_statistic_from_sums(
+            sum(a),
+            sum(x * x for x in a),
+            sum(a) + sum(b),
+            sum(x * x for x in a + b),
+            len(a),
+            len(b)
+        )
+        assert abs(result - expected) <= 1e-12 * abs(expected)
+
+    @pytest.mark.parametrize(
+        'a, b',
+        [([1.], [2.]), ([2., 2.], [2.]), ([], [1., 2.])]
+    )
+    def test_when_cannot_be_computed(self, a, b):
+        result = t_statistic_from_sums(
+            sum(a),
+            sum(x * x for x in a),
+            sum(a) + sum(b),
+            sum(x * x for x in a + b),
+            len(a),
+            len(b)
+        )
+        assert isnan(result)
+
+
+class _DifferenceOfFirstElementsStub(ITwoSampleTTestStatisticCalculator):
+
+    def calculate(self, samples: Tuple[Vector, Vector]) -> float:
+        a, b = samples
+        if a.data[0] == b.data[0]:
+            raise ValueError('cannot compute statistic')
+        return a.data[0] - b.data[0]
+
+
+class TestITwoSampleTTestStatisticCalculatorCalculateBatch:
+
+    def test_falls_back_to_calculate(self):
+        calculator = _DifferenceOfFirstElementsStub()
+        concatenated = Vector.from_sequence([1., 2., 2., 5.])
+        assignments = np.array([[0, 1, 2, 3], [3, 2, 1, 0], [1, 0, 2, 3]])
+        result = calculator.calculate_batch(concatenated, 2, assignments)
+        assert np.array_equal(result, [-1., 3., np.nan], equal_nan=True)
+
+
+class TestUnpairedSimilarVarTTestStatisticCalculatorCalculateBatch:
+
+    @pytest.fixture(scope='class')
+    def calculator(self) -> UnpairedSimilarVarTTestStatisticCalculator:
+        return UnpairedSimilarVarTTestStatisticCalculator.make()
+
+    def test_when_compared_to_calculate(
+            self,
+            calculator: UnpairedSimilarVarTTestStatisticCalculator
+    ):
+        concatenated = Vector.from_sequence([1., 2., 3., 4., 5.])
+        assignments = np.array([[0, 1, 2, 3, 4], [4, 2, 0, 1, 3]])
+        result = calculator.calculate_batch(concatenated, 3, assignments)
+        expected = [
+            calculator.calculate(
+                Vector(concatenated.data[assignment]).split(3)
+            )
+            for assignment in assignments
+        ]
+        assert np.allclose(result, expected, rtol=1e-12, atol=0.)
+
+    @pytest.mark.parametrize('size', [1, 7, 19])
+    def test_when_compared_to_permuted_data(
+            self,
+            calculator: UnpairedSimilarVarTTestStatisticCalculator,
+            size: int
+    ):
+        generator = np.random.default_rng(1234)
+        concatenated = Vector(np.round(generator.normal(3., 2., 20), 1))
+        assignments = np.array(
+            [generator.permutation(20) for _ in range(50)]
+        )
+        result = calculator.calculate_batch(concatenated, size, assignments)
+        permuted = concatenated.data[assignments]
+        a, b = permuted[:, :size], permuted[:, size:]
+        variance = (
+                size * np.var(a, axis=1) + (20 - size) * np.var(b, axis=1)
+        ) / 18
+        expected = (
+                (np.mean(a, axis=1) - np.mean(b, axis=1))
+                / np.sqrt(variance * (1. / size + 1. / (20 - size)))
+        )
+        assert np.allclose(result, expected, rtol=1e-10, atol=1e-12)
+
+    @pytest.mark.parametrize('size', [0, 2])
+    def test_when_sample_is_empty(
+            self,
+            calculator: UnpairedSimilarVarTTestStatisticCalculator,
+            size: int
+    ):
+        with pytest.raises(ValueError):
+            calculator.calculate_batch(
+                Vector.from_sequence([1., 2.]),
+                size,
+                np.array([[0, 1]])
+            )
+
+    def test_when_variance_is_zero(
+            self,
+            calculator: UnpairedSimilarVarTTestStatisticCalculator
+    ):
+        concatenated = Vector.from_sequence([1., 2.])
+        assignments = np.array([[0, 1], [1, 0]])
+        result = calculator.calculate_batch(concatenated, 1, assignments)
+        assert np.all(np.isnan(result))
+
+
+class TestUnpairedWelchTTestStatisticCalculator:
+
+    @pytest.fixture(scope='function')
+    def calculator(self) -> UnpairedWelchTTestStatisticCalculator:
+        return UnpairedWelchTTestStatisticCalculator()
+
+    def test_calculate(
+            self,
+            calculator: UnpairedWelchTTestStatisticCalculator
+    ):
+        samples = (
+            Vector.from_sequence([1., 2., 3.]),
+            Vector.from_sequence([0., 4.])
+        )
+        # (2 - 2) / sqrt(1 / 3 + 8 / 2)
+        assert calculator.calculate(samples) == 0.
+        samples = (
+            Vector.from_sequence([2., 4., 6.]),
+            Vector.from_sequence([0., 2.])
+        )
+        assert calculator.calculate(samples) == pytest.approx(
+            3. / np.sqrt(4. / 3. + 2. / 2.)
+        )
+
+    def test_calculate_when_has_equal_sizes(
+            self,
+            calculator: UnpairedWelchTTestStatisticCalculator
+    ):
+        # the statistic assuming similar variances then
+        samples = (
+            Vector.from_sequence([1., 3., 2.5, 7.]),
+            Vector.from_sequence([0., 4., -1., 2.])
+        )
+        assert calculator.calculate(samples) == pytest.approx(
+            UnpairedSimilarVarTTestStatisticCalculator.make().calculate(
+                samples
+            )
+        )
+
+    @pytest.mark.parametrize('samples', [
+        (Vector.from_sequence([1.]), Vector.from_sequence([1., 2.])),
+        (Vector.from_sequence([1., 1.]), Vector.from_sequence([2., 2.]))
+    ])
+    def test_calculate_when_cannot_be_computed(
+            self,
+            calculator: UnpairedWelchTTestStatisticCalculator,
+            samples: Tuple[Vector, Vector]
+    ):
+        with pytest.raises(ValueError, match='Welch'):
+            calculator.calculate(samples)
+
+    def test_calculate_batch(
+            self,
+            calculator: UnpairedWelchTTestStatisticCalculator
+    ):
+        concatenated = Vector.from_sequence([1., 1., 1., 4., 4.])
+        assignments = np.array([[0, 1, 2, 3, 4], [4, 2, 0, 1, 3]])
+        result = calculator.calculate_batch(concatenated, 3, assignments)
+        expected = calculator.calculate(
+            Vector(concatenated.data[assignments[1]]).split(3)
+        )
+        # the variances of the first permutation are zero
+        assert np.isnan(result[0])
+        assert result[1] == pytest.approx(expected, rel=1e-12)
+
+
+class TestDifferenceInMeansStatisticCalculator:
+
+    @pytest.fixture(scope='function')
+    def calculator(self) -> DifferenceInMeansStatisticCalculator:
+        return DifferenceInMeansStatisticCalculator()
+
+    def test_calculate(self, calculator: DifferenceInMeansStatisticCalculator):
+        samples = (
+            Vector.from_sequence([1., 2., 3.]),
+            Vector.from_sequence([0., 1.])
+        )
+        assert calculator.calculate(samples) == 1.5
+        assert calculator.is_increasing_in_first_sum
+
+    def test_calculate_when_is_empty(
+            self,
+            calculator: DifferenceInMeansStatisticCalculator
+    ):
+        with pytest.raises(ValueError, match='sample is empty'):
+            calculator.calculate((Vector.empty(), Vector.from_sequence([1.])))
+
+    def test_calculate_batch(
+            self,
+            calculator: DifferenceInMeansStatisticCalculator
+    ):
+        concatenated = Vector.from_sequence([1., 2., 3., 4., 5.])
+        assignments = np.array([[0, 1, 2, 3, 4], [4, 2, 0, 1, 3]])
+        result = calculator.calculate_batch(concatenated, 3, assignments)
+        assert np.allclose(result, [2. - 4.5, 3. - 3.], rtol=1e-12, atol=0.)
@@ -3,6 +3,7 @@
 import numpy as np
 import pytest
 
+from core.vector import MappedVector
 from core.vector import Vector
 
 
@@ -324,3 +325,54 @@ class TestVectorSplit:
             Vector.empty()
         )
         assert result == expected
+
+
+class TestVectorChunks:
+
+    def test(self):
+        vector = Vector.from_sequence([1., 2., 3., 4., 5.])
+        result = [chunk.tolist() for chunk in vector.chunks(2)]
+        assert result == [[1., 2.], [3., 4.], [5.]]
+
+    def test_when_chunk_size_is_not_strictly_positive(self):
+        with pytest.raises(ValueError, match='chunk_size'):
+            list(Vector.from_sequence([1.]).chunks(0))
+
+
+class TestMappedVector:
+
+    def test_when_is_loaded(self, tmp_path):
+        path = str(tmp_path / 'sample.npy')
+        np.save(path, np.array([1., 2., 3.]))
+        vector = MappedVector.load(path)
+        assert isinstance(vector.data, np.memmap)
+        assert vector == Vector.from_sequence([1., 2., 3.])
+
+    def test_when_is_binary(self, tmp_path):
+        path = str(tmp_path / 'sample.bin')
+        np.array([0., 1., 2., 3.]).tofile(path)
+        vector = MappedVector.from_binary(path, offset=8)
+        assert vector == Vector.from_sequence([1., 2., 3.])
+
+    def test_when_is_not_copied(self):
+        data = np.array([1., 2., 3.])
+        vector = MappedVector(data)
+        assert np.shares_memory(vector.data, data)
+        assert not vector.data.flags.writeable
+
+    def test_when_is_not_float(self, tmp_path):
+        path = str(tmp_path / 'sample.npy')
+        np.save(path, np.array([1, 2, 3]))
+        with pytest.raises(ValueError, match='float elements'):
+            MappedVector.load(path)
+
+    def test_when_last_chunk_is_not_finite(self, monkeypatch):
+        monkeypatch.setattr(MappedVector, '_CHUNK_SIZE', 2)
+        with pytest.raises(ValueError, match='finite elements'):
+            MappedVector(np.array([1., 2., 3., 4., np.nan]))
+
+    def test_split(self):
+        a, b = MappedVector(np.array([1., 2., 3.])).split(1)
+        assert isinstance(a, MappedVector)
+        assert a == Vector.from_sequence([1.])
+        assert b == Vector.from_sequence([2., 3.])